@@ -0,0 +1,179 @@
+import logging
+import time
+from collections import namedtuple
+
+import pandas as pd
+from pandas import DataFrame
+
+from semconstmining.checking.constraintchecking.declare_checker import get_constraint_strings, \
+    get_object_constraint_strings
+from semconstmining.declare.monitoring import ModelMonitor
+from semconstmining.declare.parsers import parse_decl
+from semconstmining.mining.model.parsed_label import get_dummy
+from semconstmining.parsing.label_parser.nlp_helper import NlpHelper
+
+_logger = logging.getLogger(__name__)
+
+# Violation of a constraint by a case, the object is the business object of object-level constraints (empty otherwise)
+Violation = namedtuple("Violation", ["case_id", "level", "object", "constraint", "record_id"])
+
+
+class _RunningCase:
+    __slots__ = ("cases", "last_object", "last_seen")
+
+    def __init__(self):
+        # monitoring state of the case per level and business object
+        self.cases = {}
+        # main object of the last event with a (string) object, consecutive events of the same object are merged
+        self.last_object = None
+        # time of the last event in seconds since the epoch
+        self.last_seen = None
+
+
+def to_epoch_seconds(timestamp):
+    """
+    Converts a timestamp (seconds since the epoch, datetime, pandas or numpy timestamp) into seconds since the epoch,
+    missing timestamps are the current time. Timestamps without time zone are taken as UTC.
+    """
+    if timestamp is None or pd.isna(timestamp):
+        return time.time()
+    if isinstance(timestamp, (int, float)):
+        return float(timestamp)
+    return pd.Timestamp(timestamp).timestamp()
+
+
+class ConformanceMonitor:
+    """
+    Checks the constraints of all levels against running cases, event by event, whereas the DeclareChecker checks
+    completed logs. Every event is projected as in the checked logs (clean label, action of its business object, its
+    object and clean label with role) and fed to the monitor of the level, which reports a violation as soon as it is
+    permanent. The remaining violations of a case are reported when it is finished or expires. Unlike the
+    DeclareChecker, violations are reported per case, so violations occurring in more than 90% of the cases are not
+    discarded, and cases with loops are not filtered.
+    """
+
+    def __init__(self, config, constraints: DataFrame, nlp_helper: NlpHelper, with_roles=True, consider_vacuity=True):
+        self.config = config
+        self.constraints = DataFrame() if constraints is None else constraints
+        self.nlp_helper = nlp_helper
+        self.with_roles = with_roles
+        self.consider_vacuity = consider_vacuity
+        self.missing = set(self.config.TERMS_FOR_MISSING)
+        self.activities_to_parsed = {}
+        # monitor and constraint strings per level and business object, created once they are needed
+        self.monitors = {}
+        self.cases = {}
+
+    def get_parsed_label(self, activity):
+        if activity not in self.activities_to_parsed:
+            self.activities_to_parsed[activity] = self.nlp_helper.parse_label(activity) if type(activity) == str \
+                else get_dummy(self.config, activity, self.config.EN)
+        return self.activities_to_parsed[activity]
+
+    def get_monitor(self, level, bo=""):
+        if (level, bo) not in self.monitors:
+            if level == self.config.OBJECT:
+                constraint_strings = get_object_constraint_strings(self.config, self.constraints, bo)
+            else:
+                constraint_strings = get_constraint_strings(self.config, self.constraints, level)
+            model = parse_decl(constraint_strings.keys())
+            self.monitors[(level, bo)] = ModelMonitor(model, self.consider_vacuity), constraint_strings
+        return self.monitors[(level, bo)]
+
+    def add_event(self, case_id, activity, role=None, timestamp=None):
+        """
+        Feeds the next event of a case to the monitors.
+
+        :param case_id: the id of the case
+        :param activity: the activity label of the event
+        :param role: the role of the event
+        :param timestamp: the time of the event (see to_epoch_seconds), used to expire idle cases, defaults to the
+            current time
+        :return: the violations that became permanent with this event
+        """
+        running = self.cases.get(case_id)
+        if running is None:
+            running = self.cases[case_id] = _RunningCase()
+            # as in the checked logs, every case has a (possibly empty) sequence of objects
+            self._get_case(running, self.config.MULTI_OBJECT, "")
+        running.last_seen = to_epoch_seconds(timestamp)
+        parsed = self.get_parsed_label(activity)
+        attributes = {self.config.DICTIONARY: parsed.dictionary_entries, self.config.DATA_OBJECT: parsed.data_objects}
+        violations = []
+        if parsed.label not in self.missing:
+            event = {self.config.XES_NAME: parsed.label, **attributes}
+            violations += self._step(case_id, running, self.config.ACTIVITY, "", event)
+            if self.with_roles:
+                event = dict(event)
+                event[self.config.XES_ROLE] = role.replace(" and ", " & ") if type(role) == str else "unknown"
+                violations += self._step(case_id, running, self.config.RESOURCE, "", event)
+        obj = parsed.main_object
+        if type(obj) != str:
+            # events without a (valid) object are not part of the object and multi-object levels
+            return violations
+        if obj != running.last_object and obj not in self.missing:
+            violations += self._step(case_id, running, self.config.MULTI_OBJECT, "",
+                                     {self.config.XES_NAME: obj, **attributes})
+        running.last_object = obj
+        if parsed.main_action != "" and obj not in self.missing:
+            violations += self._step(case_id, running, self.config.OBJECT, obj,
+                                     {self.config.XES_NAME: parsed.main_action, **attributes})
+        return violations
+
+    def add_events(self, events: DataFrame):
+        """
+        Feeds a micro-batch of events (in the order of the rows) to the monitors.
+
+        :return: the violations that became permanent with these events
+        """
+        roles = events[self.config.XES_ROLE] if self.config.XES_ROLE in events.columns else [None] * len(events)
+        timestamps = events[self.config.XES_TIME] if self.config.XES_TIME in events.columns \
+            else [None] * len(events)
+        violations = []
+        for case_id, activity, role, timestamp in zip(events[self.config.XES_CASE], events[self.config.XES_NAME],
+                                                      roles, timestamps):
+            violations += self.add_event(case_id, activity, role=role, timestamp=timestamp)
+        return violations
+
+    def finish_case(self, case_id):
+        """
+        Completes a case and discards its state.
+
+        :return: the violations of the completed case that were not reported before
+        """
+        running = self.cases.pop(case_id, None)
+        if running is None:
+            return []
+        violations = []
+        for (level, bo), case in running.cases.items():
+            monitor, constraint_strings = self.get_monitor(level, bo)
+            reported = {monitor.model.serialized_constraints[idx] for idx in case.emitted}
+            for constraint in sorted(monitor.finish(case) - reported):
+                violations.append(Violation(case_id, level, bo, constraint, constraint_strings[constraint][1]))
+        return violations
+
+    def expire_cases(self, before):
+        """
+        Completes all cases without events since the given time.
+
+        :param before: the time in seconds since the epoch (e.g., time.time()), or a timestamp that is converted as
+            the ones of the events
+        :return: the violations of the expired cases that were not reported before
+        """
+        before = to_epoch_seconds(before)
+        expired = [case_id for case_id, running in self.cases.items() if running.last_seen < before]
+        violations = []
+        for case_id in expired:
+            violations += self.finish_case(case_id)
+        return violations
+
+    def _get_case(self, running, level, bo):
+        if (level, bo) not in running.cases:
+            running.cases[(level, bo)] = self.get_monitor(level, bo)[0].start_case()
+        return running.cases[(level, bo)]
+
+    def _step(self, case_id, running, level, bo, event):
+        monitor, constraint_strings = self.get_monitor(level, bo)
+        case = self._get_case(running, level, bo)
+        return [Violation(case_id, level, bo, constraint, constraint_strings[constraint][1])
+                for constraint in monitor.step(case, event)]
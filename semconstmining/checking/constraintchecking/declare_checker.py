@@ -1,27 +1,197 @@
+import logging
+import os
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 
 from pandas import DataFrame
-from pm4py.objects.log.obj import EventLog, Trace, Event
 
+from semconstmining.checking.constraintchecking.outcome_cache import canonical_constraint, get_outcome_cache
+from semconstmining.declare.enums import TraceState
+from semconstmining.log.columnar_log import ColumnarLog, SharedColumnarLog
 from semconstmining.log.loghandler import LogHandler
 from semconstmining.parsing.conversion.petrinetanalysis import is_relevant_label
 from semconstmining.mining.model.parsed_label import get_dummy
 from semconstmining.declare.declare import Declare
 from semconstmining.declare.parsers import parse_decl
+from semconstmining.declare.vectorized_checking import condition_attributes
 import pm4py
 
 from semconstmining.parsing.label_parser.nlp_helper import NlpHelper
 
+_logger = logging.getLogger(__name__)
 
-def verify_violations(tmp_res, log):
-    counts = Counter(const for vals in tmp_res.values() for const in vals)
-    res = {key: {val for val in vals if counts[val] <= 0.9 * len(log)} for key, vals in tmp_res.items()}
+# Rough memory needed to check one event against one constraint (columnar log, projections and checking results)
+BYTES_PER_EVENT_AND_CONSTRAINT = 16
+
+
+def verify_violations(tmp_res, log, frequencies=None):
+    if frequencies is None:
+        counts = Counter(const for vals in tmp_res.values() for const in vals)
+        num_cases = len(log)
+    else:
+        # the results are the ones of variants, their violations count once per case of the variant
+        counts = Counter()
+        for key, vals in tmp_res.items():
+            for const in vals:
+                counts[const] += frequencies[key]
+        num_cases = frequencies.sum()
+    res = {key: {val for val in vals if counts[val] <= 0.9 * num_cases} for key, vals in tmp_res.items()}
     return res
 
 
+def get_constraint_strings(config, constraints: DataFrame, level: str, mask=None):
+    """
+    The constraint strings of the given level (and mask) mapped to their template and (fitted) record id.
+    """
+    constraint_strings = {}
+    if len(constraints) == 0:
+        return constraint_strings
+    selected = constraints[config.LEVEL] == level
+    if mask is not None:
+        selected &= mask
+    for idx, row in constraints[selected].iterrows():
+        const_str = row[config.CONSTRAINT_STR]
+        if level == config.RESOURCE and " and " in row[config.CONSTRAINT_STR]:
+            if len(row[config.CONSTRAINT_STR].split("A.org:role is not ")) > 1:
+                res = row[config.CONSTRAINT_STR].split("A.org:role is not ")[1]
+                const_str = const_str.replace(res, res.replace(" and ", " & "))
+        if config.FITTED_RECORD_ID in constraints.columns:
+            constraint_strings[const_str] = row[config.TEMPLATE], row[config.FITTED_RECORD_ID]
+        else:
+            constraint_strings[const_str] = row[config.TEMPLATE], 0
+    return constraint_strings
+
+
+def get_object_constraint_strings(config, constraints: DataFrame, bo):
+    """
+    The object-level constraint strings of a business object, i.e., the ones whose object is the business object.
+    Constraints without object apply to all business objects.
+    """
+    if len(constraints) == 0 or config.OBJECT not in constraints.columns:
+        return get_constraint_strings(config, constraints, config.OBJECT)
+    objects = constraints[config.OBJECT]
+    return get_constraint_strings(config, constraints, config.OBJECT,
+                                  mask=objects.isna() | (objects == "") | (objects == bo))
+
+
+def run_conformance_checking(config, d4py: Declare):
+    if config.CHECKING_ENGINE == config.VECTORIZED_CHECKING:
+        return d4py.vectorized_conformance_checking(consider_vacuity=True)
+    return d4py.conformance_checking(consider_vacuity=True)
+
+
+def check_with_outcome_cache(config, d4py: Declare, outcome_cache):
+    """
+    Checks the (variant) log against the constraints whose outcome is not cached for all of its variants, and caches
+    their outcomes. The outcomes of the other constraints are taken from the cache.
+    """
+    model = d4py.model
+    trace_names = d4py.log.trace_names
+    # the hash of a variant covers the attributes the conditions of a constraint refer to
+    hashes = {}
+    keys = []
+    for idx, constraint_str in enumerate(model.serialized_constraints):
+        attributes = frozenset(condition_attributes(model.select([idx])))
+        if attributes not in hashes:
+            hashes[attributes] = d4py.log.content_hashes(attributes)
+        keys.append([(variant_hash, canonical_constraint(constraint_str)) for variant_hash in hashes[attributes]])
+    outcomes = [[outcome_cache.get(key) for key in constraint_keys] for constraint_keys in keys]
+    missing = [idx for idx, constraint_outcomes in enumerate(outcomes) if None in constraint_outcomes]
+    if len(missing) > 0:
+        d4py.model = model.select(missing)
+        res = run_conformance_checking(config, d4py)
+        d4py.model = model
+        for idx in missing:
+            constraint_str = model.serialized_constraints[idx]
+            outcomes[idx] = [TraceState.VIOLATED if constraint_str in res[name] else TraceState.SATISFIED
+                             for name in trace_names]
+            for key, outcome in zip(keys[idx], outcomes[idx]):
+                outcome_cache.put(key, outcome)
+    res = {name: set() for name in trace_names}
+    for constraint_str, constraint_outcomes in zip(model.serialized_constraints, outcomes):
+        for name, outcome in zip(trace_names, constraint_outcomes):
+            if outcome == TraceState.VIOLATED:
+                res[name].add(constraint_str)
+    return res
+
+
+def get_verified_violations(config, d4py: Declare, outcome_cache=None, verify=True):
+    """
+    Checks the log and keeps the violations that do not occur in more than 90% of the cases (unless verify is unset).
+    If variant checking is enabled, every variant of the log is checked once and its violations are fanned out to its
+    cases, the outcomes of the variants are looked up in (and added to) the outcome cache, if any.
+    """
+    log = d4py.log
+    attribute_keys = condition_attributes(d4py.model)
+    if not config.VARIANT_CHECKING or attribute_keys is None:
+        res = run_conformance_checking(config, d4py)
+        return verify_violations(res, log) if verify else res
+    d4py.log, variant_of_case, frequencies = log.variants(attribute_keys)
+    if outcome_cache is None:
+        variant_res = run_conformance_checking(config, d4py)
+    else:
+        variant_res = check_with_outcome_cache(config, d4py, outcome_cache)
+    if verify:
+        variant_res = verify_violations(variant_res, d4py.log, frequencies=frequencies)
+    d4py.log = log
+    return {case_id: set(variant_res[variant]) for case_id, variant in zip(log.trace_names, variant_of_case)}
+
+
+def check_business_object(config, columnar_log: ColumnarLog, model, bo, outcome_cache=None, verify=True):
+    """
+    Checks the object-level constraints of a business object on the projection of the log on its actions.
+    """
+    d4py = Declare(config)
+    d4py.log = columnar_log.object_action_log_projection(bo)
+    d4py.model = model
+    return get_verified_violations(config, d4py, outcome_cache=outcome_cache, verify=verify)
+
+
+def format_violations(res, constraint_strings, with_aggregates=False, with_id=False):
+    """
+    Adds the (fitted) record id to the violated constraints of every case and, with aggregates, counts the cases
+    violating every constraint (record id).
+    """
+    if with_id:
+        res = {key: {(val, constraint_strings[val][1]) for val in vals} for key, vals in res.items()}
+    if not with_aggregates:
+        return res
+    violation_to_frequency = {}
+    for key, vals in res.items():
+        for val in vals:
+            violation = val[1] if with_id else val
+            if violation not in violation_to_frequency:
+                violation_to_frequency[violation] = 0
+            violation_to_frequency[violation] += 1
+    return res, violation_to_frequency
+
+
+# Log, object-level model, config and outcome cache (the cached outcomes of the model's constraints) of a checking
+# worker process, set once by _init_worker
+_worker_log = None
+_worker_model = None
+_worker_config = None
+_worker_outcome_cache = None
+
+
+def _init_worker(config, shared_log, model, outcome_cache):
+    global _worker_log, _worker_model, _worker_config, _worker_outcome_cache
+    _worker_log, _worker_model, _worker_config = shared_log.attach(), model, config
+    _worker_outcome_cache = outcome_cache
+
+
+def _check_business_object(bo, positions, verify):
+    """
+    :return: the violations and the outcomes added to and keys hit in the worker's outcome cache (None without cache)
+    """
+    res = check_business_object(_worker_config, _worker_log, _worker_model.select(positions), bo,
+                                outcome_cache=_worker_outcome_cache, verify=verify)
+    return res, None if _worker_outcome_cache is None else _worker_outcome_cache.pop_changes()
+
+
 class DeclareChecker:
 
-    def __init__(self, config, lh: LogHandler, constraints: DataFrame, nlp_helper: NlpHelper):
+    def __init__(self, config, lh: LogHandler, constraints: DataFrame, nlp_helper: NlpHelper, verify=True):
         self.config = config
         self.log_handler = lh
         self.log = self.log_handler.log
@@ -31,7 +201,11 @@ class DeclareChecker:
         self.constraints = constraints
         self.activities = pm4py.get_event_attribute_values(self.log, self.config.XES_NAME,
                                                            case_id_key=self.config.XES_CASE)
-        self.activities_to_parsed = {activity: self.nlp_helper.parse_label(activity) for activity in self.activities}
+        self.activities_to_parsed = dict(zip(self.activities, self.nlp_helper.parse_labels_bulk(list(self.activities))))
+        self.columnar_log = None
+        self.outcome_cache = get_outcome_cache(self.config)
+        # whether violations occurring in more than 90% of the cases are discarded
+        self.verify = verify
 
     def check_constraints(self, with_aggregates=False, with_id=False):
         res = {
@@ -45,250 +219,163 @@ class DeclareChecker:
             , self.config.RESOURCE: self.check_resource_level_constraints(with_aggregates=with_aggregates, with_id=with_id)
             if self.config.XES_ROLE in self.log.columns else {}
         }
+        if self.outcome_cache is not None:
+            self.outcome_cache.save()
         return res
 
-    def get_constraint_strings(self, level: str):
-        constraint_strings = {}
-        if len(self.constraints) == 0:
-            return constraint_strings
-        for idx, row in self.constraints[self.constraints[self.config.LEVEL] == level].iterrows():
-            const_str = row[self.config.CONSTRAINT_STR]
-            if level == self.config.RESOURCE and " and " in row[self.config.CONSTRAINT_STR]:
-                if len(row[self.config.CONSTRAINT_STR].split("A.org:role is not ")) > 1:
-                    res = row[self.config.CONSTRAINT_STR].split("A.org:role is not ")[1]
-                    const_str = const_str.replace(res, res.replace(" and ", " & "))
-            if self.config.FITTED_RECORD_ID in self.constraints.columns:
-                constraint_strings[const_str] = row[self.config.TEMPLATE], row[self.config.FITTED_RECORD_ID]
-            else:
-                constraint_strings[const_str] = row[self.config.TEMPLATE], 0
-        return constraint_strings
+    def get_constraint_strings(self, level: str, mask=None):
+        return get_constraint_strings(self.config, self.constraints, level, mask=mask)
+
+    def get_object_constraint_strings(self, business_objects):
+        return {bo: get_object_constraint_strings(self.config, self.constraints, bo) for bo in business_objects}
+
+    def check_business_objects(self, columnar_log: ColumnarLog, constraint_strings):
+        """
+        Checks the object-level constraints of every business object, possibly sharded across a pool of worker
+        processes. All constraints are parsed once, each business object is checked against the ones of its object.
+        """
+        model = parse_decl({const: None for strings in constraint_strings.values() for const in strings}.keys())
+        position = {const: i for i, const in enumerate(model.serialized_constraints)}
+        positions = {bo: [position[const] for const in strings if const in position]
+                     for bo, strings in constraint_strings.items()}
+        workers = self.config.CHECKING_WORKERS or os.cpu_count()
+        if workers <= 1 or len(positions) <= 1:
+            return {bo: check_business_object(self.config, columnar_log, model.select(bo_positions), bo,
+                                              outcome_cache=self.outcome_cache, verify=self.verify)
+                    for bo, bo_positions in positions.items()}
+        shared_log = SharedColumnarLog(columnar_log)
+        # the workers get the cached outcomes of the constraints, the outcomes they add are merged into the cache
+        worker_cache = None if self.outcome_cache is None else \
+            self.outcome_cache.subset({canonical_constraint(const) for const in model.serialized_constraints})
+        try:
+            with ProcessPoolExecutor(max_workers=min(workers, len(positions)), initializer=_init_worker,
+                                     initargs=(self.config, shared_log, model, worker_cache)) as executor:
+                futures = {bo: executor.submit(_check_business_object, bo, bo_positions, self.verify)
+                           for bo, bo_positions in positions.items()}
+                _logger.info("Checking " + str(len(futures)) + " business objects with " +
+                             str(min(workers, len(positions))) + " processes.")
+                res = {}
+                for bo, future in futures.items():
+                    res[bo], changes = future.result()
+                    if changes is not None:
+                        self.outcome_cache.update(*changes)
+                return res
+        finally:
+            shared_log.release()
 
     def check_object_level_constraints(self, with_aggregates=False, with_id=False):
-        filtered_traces = self.get_filtered_traces(self.log, parsed_tasks=self.activities_to_parsed,
-                                                   with_loops=self.config.LOOPS)
-        res = {}
+        columnar_log = self.get_columnar_log()
+        business_objects = columnar_log.business_objects
+        constraint_strings = self.get_object_constraint_strings(business_objects)
+        res = self.check_business_objects(columnar_log, constraint_strings)
         # aggregate results and provide frequencies
         agg_res = {}
-        bos = set([x.main_object for trace in filtered_traces.values() for x in trace if
-                   x.main_object not in self.config.TERMS_FOR_MISSING])
-        for bo in bos:
-            d4py = Declare(self.config)
-            d4py.log = self.object_action_log_projection(bo, filtered_traces)
-            constraint_strings = self.get_constraint_strings(level=self.config.OBJECT)
-            d4py.model = parse_decl(constraint_strings.keys())
-            tmp_res = d4py.conformance_checking(consider_vacuity=True)
-            res[bo] = verify_violations(tmp_res, d4py.log)
-            if with_id:
-                res[bo] = {key: {(val, constraint_strings[val][1]) for val in vals} for key, vals in res[bo].items()}
-                if with_aggregates:
-                    violation_to_frequency = {}
-                    for key, vals in res[bo].items():
-                        for val in vals:
-                            if val[1] not in violation_to_frequency:
-                                violation_to_frequency[val[1]] = 0
-                            violation_to_frequency[val[1]] += 1
-                    agg_res[bo] = violation_to_frequency
+        for bo in business_objects:
+            if with_aggregates:
+                res[bo], agg_res[bo] = format_violations(res[bo], constraint_strings[bo], with_aggregates=True,
+                                                         with_id=with_id)
             else:
-                if with_aggregates:
-                    violation_to_frequency = {}
-                    for key, vals in res[bo].items():
-                        for val in vals:
-                            if val not in violation_to_frequency:
-                                violation_to_frequency[val] = 0
-                            violation_to_frequency[val] += 1
-                    agg_res[bo] = violation_to_frequency
+                res[bo] = format_violations(res[bo], constraint_strings[bo], with_id=with_id)
         if with_aggregates:
             return res, agg_res
         return res
 
     def check_multi_object_constraints(self, with_aggregates=False, with_id=False):
-        filtered_traces = self.get_filtered_traces(self.log, parsed_tasks=self.activities_to_parsed,
-                                                   with_loops=self.config.LOOPS)
         d4py = Declare(self.config)
-        d4py.log = self.object_log_projection(filtered_traces)
+        d4py.log = self.get_columnar_log().object_log_projection()
         constraint_strings = self.get_constraint_strings(level=self.config.MULTI_OBJECT)
         d4py.model = parse_decl(constraint_strings.keys())
-        tmp_res = d4py.conformance_checking(consider_vacuity=True)
-        res = verify_violations(tmp_res, d4py.log)
-        if with_id:
-            res = {key: {(val, constraint_strings[val][1]) for val in vals} for key, vals in res.items()}
-            if with_aggregates:
-                violation_to_frequency = {}
-                for key, vals in res.items():
-                    for val in vals:
-                        if val[1] not in violation_to_frequency:
-                            violation_to_frequency[val[1]] = 0
-                        violation_to_frequency[val[1]] += 1
-                return res, violation_to_frequency
-        else:
-            if with_aggregates:
-                violation_to_frequency = {}
-                for key, vals in res.items():
-                    for val in vals:
-                        if val not in violation_to_frequency:
-                            violation_to_frequency[val] = 0
-                        violation_to_frequency[val] += 1
-                return res, violation_to_frequency
-        return res
+        res = get_verified_violations(self.config, d4py, outcome_cache=self.outcome_cache, verify=self.verify)
+        return format_violations(res, constraint_strings, with_aggregates=with_aggregates, with_id=with_id)
 
     def check_activity_level_constraints(self, with_aggregates=False, with_id=False):
-        filtered_traces = self.get_filtered_traces(self.log, parsed_tasks=self.activities_to_parsed,
-                                                   with_loops=self.config.LOOPS)
         d4py = Declare(self.config)
-        d4py.log = self.clean_log_projection(filtered_traces)
+        d4py.log = self.get_columnar_log().clean_log_projection()
         constraint_strings = self.get_constraint_strings(level=self.config.ACTIVITY)
         d4py.model = parse_decl(constraint_strings.keys())
-        tmp_res = d4py.conformance_checking(consider_vacuity=True)
-        res = verify_violations(tmp_res, d4py.log)
-        if with_id:
-            res = {key: {(val, constraint_strings[val][1]) for val in vals} for key, vals in res.items()}
-            if with_aggregates:
-                violation_to_frequency = {}
-                for key, vals in res.items():
-                    for val in vals:
-                        if val[1] not in violation_to_frequency:
-                            violation_to_frequency[val[1]] = 0
-                        violation_to_frequency[val[1]] += 1
-                return res, violation_to_frequency
-        else:
-            if with_aggregates:
-                violation_to_frequency = {}
-                for key, vals in res.items():
-                    for val in vals:
-                        if val not in violation_to_frequency:
-                            violation_to_frequency[val] = 0
-                        violation_to_frequency[val] += 1
-                return res, violation_to_frequency
-        return res
+        res = get_verified_violations(self.config, d4py, outcome_cache=self.outcome_cache, verify=self.verify)
+        return format_violations(res, constraint_strings, with_aggregates=with_aggregates, with_id=with_id)
 
     def check_resource_level_constraints(self, with_aggregates=False, with_id=False):
-        filtered_traces = self.get_filtered_traces(self.log, parsed_tasks=self.activities_to_parsed,
-                                                   with_loops=self.config.LOOPS, with_resources=True)
         d4py = Declare(self.config)
-        d4py.log = self.clean_log_projection(filtered_traces, with_resources=True)
+        d4py.log = self.get_columnar_log().clean_log_projection(with_roles=True)
         constraint_strings = self.get_constraint_strings(level=self.config.RESOURCE)
         d4py.model = parse_decl(constraint_strings.keys())
-        tmp_res = d4py.conformance_checking(consider_vacuity=True)
-        res = verify_violations(tmp_res, d4py.log)
-        if with_id:
-            res = {key: {(val, constraint_strings[val][1]) for val in vals} for key, vals in res.items()}
-            if with_aggregates:
-                violation_to_frequency = {}
-                for key, vals in res.items():
-                    for val in vals:
-                        if val[1] not in violation_to_frequency:
-                            violation_to_frequency[val[1]] = 0
-                        violation_to_frequency[val[1]] += 1
-                return res, violation_to_frequency
-        else:
-            if with_aggregates:
-                violation_to_frequency = {}
-                for key, vals in res.items():
-                    for val in vals:
-                        if val not in violation_to_frequency:
-                            violation_to_frequency[val] = 0
-                        violation_to_frequency[val] += 1
-                return res, violation_to_frequency
-        return res
-
-    def has_loop(self, trace):
-        return trace[self.config.XES_NAME].nunique() > len(trace)
-
-    def get_filtered_traces(self, log: DataFrame, parsed_tasks=None, with_loops=False, with_resources=False):
-        if parsed_tasks is not None:
-            if with_resources:
-                res = {trace_id: [(parsed_tasks[event[self.config.XES_NAME]], event[self.config.XES_ROLE]) if event[
-                                                                                                                  self.config.XES_NAME] in parsed_tasks else get_dummy(
-                    self.config, event[self.config.XES_NAME], self.config.EN)
-                                  for event_index, event in
-                                  trace.iterrows()] for trace_id, trace in log.groupby(self.config.XES_CASE) if
-                       with_loops or not self.has_loop(trace)}
-                return res
-            else:
-                res = {trace_id: [parsed_tasks[event[self.config.XES_NAME]] if event[
-                                                                                   self.config.XES_NAME] in parsed_tasks else get_dummy(
-                    self.config, event[self.config.XES_NAME], self.config.EN)
-                                  for event_index, event in
-                                  trace.iterrows()] for trace_id, trace in log.groupby(self.config.XES_CASE) if
-                       with_loops or not self.has_loop(trace)}
-                return res
-        else:
-            res = {trace_id: [event[self.config.XES_NAME] for event_idx, event in trace.iterrows()] for trace_id, trace
-                   in
-                   log.groupby(self.config.XES_CASE)
-                   if with_loops or not self.has_loop(trace)}
-            return res
-
-    def object_action_log_projection(self, obj, traces):
-        """
-        Return for each trace a time-ordered list of the actions for a given object type.
+        res = get_verified_violations(self.config, d4py, outcome_cache=self.outcome_cache, verify=self.verify)
+        return format_violations(res, constraint_strings, with_aggregates=with_aggregates, with_id=with_id)
 
-        Returns
-        -------
-        projection
-            traces containing only actions applied to the same obj.
+    def get_columnar_log(self):
         """
-        projection = EventLog()
-        if traces is None:
-            raise RuntimeError("You must load a log before.")
-        for trace_id, trace in traces.items():
-            tmp_trace = Trace()
-            tmp_trace.attributes[self.config.XES_NAME] = trace_id
-            for parsed in trace:
-                if parsed.main_object == obj:
-                    if parsed.main_action != "":
-                        event = Event({self.config.XES_NAME: parsed.main_action})
-                        tmp_trace.append(event)
-            if len(tmp_trace) > 0:
-                projection.append(tmp_trace)
-        return projection
-
-    def object_log_projection(self, traces):
+        The (loop-filtered) log of parsed labels, computed once and shared by the checks of all levels.
         """
-        Return for each trace a time-ordered list of the actions for a given object type.
+        if self.columnar_log is None:
+            self.columnar_log = ColumnarLog.from_dataframe(self.config, self.log, self.get_parsed_label,
+                                                           with_loops=self.config.LOOPS,
+                                                           with_roles=self.config.XES_ROLE in self.log.columns)
+        return self.columnar_log
 
-        Returns
-        -------
-        projection
-            traces containing only actions applied to the same obj.
-        """
-        projection = EventLog()
-        if traces is None:
-            raise RuntimeError("You must load a log before.")
-        for trace_id, trace in traces.items():
-            tmp_trace = Trace()
-            tmp_trace.attributes[self.config.XES_NAME] = trace_id
-            last = ""
-            for parsed in trace:
-                if parsed.main_object not in self.config.TERMS_FOR_MISSING and parsed.main_object != last:
-                    event = Event({self.config.XES_NAME: parsed.main_object})
-                    tmp_trace.append(event)
-                last = parsed.main_object
-            projection.append(tmp_trace)
-        return projection
-
-    def clean_log_projection(self, traces, with_resources=False):
-        """
-        Same log, just with clean labels.
-        """
-        projection = EventLog()
-        if traces is None:
-            raise RuntimeError("You must load a log before.")
-        for trace_id, trace in traces.items():
-            tmp_trace = Trace()
-            tmp_trace.attributes[self.config.XES_NAME] = trace_id
-            if with_resources:
-                for parsed, res in trace:
-                    if parsed.label not in self.config.TERMS_FOR_MISSING:
-                        event = Event({self.config.XES_NAME: parsed.label})
-                        event[self.config.XES_ROLE] = res.replace(" and ", " & ") if type(
-                            res) == str else "unknown"  # self.task_to_res[parsed.label]
-                        tmp_trace.append(event)
-            else:
-                for parsed in trace:
-                    if parsed.label not in self.config.TERMS_FOR_MISSING:
-                        event = Event({self.config.XES_NAME: parsed.label})
-                        tmp_trace.append(event)
-            if len(tmp_trace) > 0:
-                projection.append(tmp_trace)
-        return projection
+    def get_parsed_label(self, activity):
+        if activity in self.activities_to_parsed:
+            return self.activities_to_parsed[activity]
+        return get_dummy(self.config, activity, self.config.EN)
+
+
+def get_chunk_size(config, constraints: DataFrame):
+    """
+    The number of events of the chunks of a log that is checked in chunks, such that checking a chunk against the
+    constraints roughly fits into the memory budget for checking.
+    """
+    num_constraints = max(1, 0 if constraints is None else len(constraints))
+    return max(1, int(config.CHECKING_MEMORY_BUDGET // (BYTES_PER_EVENT_AND_CONSTRAINT * num_constraints)))
+
+
+def check_constraints_in_chunks(config, chunks, constraints: DataFrame, nlp_helper: NlpHelper, with_aggregates=False,
+                                with_id=False):
+    """
+    Checks a log given as case-complete chunks, i.e., no case spans two chunks, so that only one chunk has to be in
+    memory at a time. The violations of the cases of all chunks are merged before the ones occurring in more than 90%
+    of the cases are discarded, the result is the same as the one of DeclareChecker.check_constraints on the whole log.
+
+    :param config: the config
+    :param chunks: iterable of the chunks as event data frames
+    :param constraints: the constraints to check
+    :param nlp_helper: the NLP helper parsing the activity labels
+    :return: the violations per level, as returned by DeclareChecker.check_constraints
+    """
+    levels = [config.OBJECT, config.MULTI_OBJECT, config.ACTIVITY, config.RESOURCE]
+    merged = {level: {} for level in levels}
+    with_roles = False
+    num_chunks = 0
+    for chunk in chunks:
+        lh = LogHandler(config)
+        lh.log = chunk
+        chunk_res = DeclareChecker(config, lh, constraints, nlp_helper, verify=False).check_constraints()
+        for bo, bo_res in chunk_res[config.OBJECT].items():
+            merged[config.OBJECT].setdefault(bo, {}).update(bo_res)
+        for level in levels[1:]:
+            merged[level].update(chunk_res[level])
+        # as in logs read at once, roles are only checked if some event has a role
+        with_roles |= config.XES_ROLE in chunk.columns and chunk[config.XES_ROLE].notna().any()
+        num_chunks += 1
+    _logger.info("Checked " + str(num_chunks) + " chunks.")
+    constraints = DataFrame() if constraints is None else constraints
+    res = {}
+    # every checked case has an entry in the violations of a level, so their number is the number of cases
+    object_res, object_agg_res = {}, {}
+    for bo, bo_res in merged[config.OBJECT].items():
+        formatted = format_violations(verify_violations(bo_res, bo_res),
+                                      get_object_constraint_strings(config, constraints, bo),
+                                      with_aggregates=with_aggregates, with_id=with_id)
+        if with_aggregates:
+            object_res[bo], object_agg_res[bo] = formatted
+        else:
+            object_res[bo] = formatted
+    res[config.OBJECT] = (object_res, object_agg_res) if with_aggregates else object_res
+    for level in levels[1:]:
+        if level == config.RESOURCE and not with_roles:
+            res[level] = {}
+            continue
+        res[level] = format_violations(verify_violations(merged[level], merged[level]),
+                                       get_constraint_strings(config, constraints, level),
+                                       with_aggregates=with_aggregates, with_id=with_id)
+    return res
@@ -0,0 +1,133 @@
+import logging
+import os
+import re
+from collections import OrderedDict
+from os.path import exists
+
+from semconstmining.util.io import read_pickle, write_pickle
+
+_logger = logging.getLogger(__name__)
+
+# Bump whenever the outcome of checking a constraint may change, the cached outcomes are discarded afterwards
+OUTCOME_CACHE_VERSION = "1"
+
+# One cache per file, shared by all checkers of the process
+_caches = {}
+
+
+def canonical_constraint(constraint_str):
+    """
+    Canonical form of a constraint string, constraints that only differ in whitespace share their outcomes.
+    """
+    return re.sub(r"\s+", " ", constraint_str).strip()
+
+
+def get_outcome_cache(config):
+    """
+    The outcome cache of the config, loaded once per process (None if the cache is disabled).
+    """
+    if config.OUTCOME_CACHE is None:
+        return None
+    path = str(config.OUTCOME_CACHE)
+    if path not in _caches:
+        _caches[path] = OutcomeCache(path, max_entries=config.OUTCOME_CACHE_MAX_ENTRIES)
+    return _caches[path]
+
+
+class OutcomeCache:
+    """
+    Persistent cache of the outcomes (TraceState) of constraints checked against trace variants, keyed by the content
+    hash of the (projected) variant and the canonical constraint string. The entries are kept in order of their last
+    access, the least recently used ones are evicted once the cache exceeds its maximal number of entries. Lookups
+    alone do not make the cache be written again, the access order they change is saved with the next new outcome.
+    """
+
+    def __init__(self, path=None, max_entries=None, entries=None, track_added=False):
+        self.path = path
+        self.max_entries = max_entries
+        self.entries = OrderedDict() if entries is None else OrderedDict(entries)
+        if path is not None and exists(path):
+            stored = read_pickle(path)
+            if isinstance(stored, dict) and stored.get("version") == OUTCOME_CACHE_VERSION:
+                self.entries = stored["entries"]
+                _logger.info("Loaded %d cached outcomes" % len(self.entries))
+            else:
+                _logger.info("Discarding cached outcomes of another version")
+        # outcomes put and keys hit since the last call of pop_changes (only tracked on request)
+        self.added = {} if track_added else None
+        self.used = {} if track_added else None
+        self.hits = 0
+        self.misses = 0
+        self._changed = False
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def get(self, key):
+        """
+        Returns the cached outcome of a (variant hash, constraint) key, or None if it is unknown.
+        """
+        outcome = self.entries.get(key)
+        if outcome is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        if self.used is not None:
+            self.used[key] = None
+        return outcome
+
+    def put(self, key, outcome):
+        if self.added is not None:
+            self.added[key] = outcome
+        self.entries[key] = outcome
+        self.entries.move_to_end(key)
+        self._changed = True
+        if self.max_entries is not None:
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def subset(self, constraints):
+        """
+        An in-memory copy of the outcomes of the given (canonical) constraints that tracks the outcomes put to it and
+        the keys hit, e.g., for a worker process whose changes are merged back with update.
+        """
+        return OutcomeCache(entries=((key, outcome) for key, outcome in self.entries.items() if key[1] in constraints),
+                            track_added=True)
+
+    def pop_changes(self):
+        """
+        The outcomes put and the keys hit since the last call.
+        """
+        added, used = self.added, list(self.used)
+        self.added, self.used = {}, {}
+        return added, used
+
+    def update(self, outcomes, used=()):
+        """
+        Merges the changes of a subset, the keys hit become the most recently used ones before the new outcomes.
+        """
+        for key in used:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+        for key, outcome in outcomes.items():
+            self.put(key, outcome)
+
+    @property
+    def hit_rate(self):
+        return self.hits / (self.hits + self.misses) if self.hits + self.misses > 0 else 0.0
+
+    def save(self):
+        """
+        Writes the cache to its file if it changed since it was loaded or saved.
+        """
+        if self.path is None or not self._changed:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        write_pickle({"version": OUTCOME_CACHE_VERSION, "entries": self.entries}, self.path + ".tmp")
+        os.replace(self.path + ".tmp", self.path)
+        self._changed = False
+        _logger.info("Saved %d cached outcomes (%d hits, %d misses)" % (len(self.entries), self.hits, self.misses))
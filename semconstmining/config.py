@@ -136,6 +136,12 @@ class Config:
         self.PETRI_LOGS_DIR = self.DATA_INTERIM / "bpmn_logs"
 
         self.MODEL_PATH = self.DATA_ROOT / "bert"
+        # Tag labels on the CPU fast path (batches of labels of similar length, inference mode)
+        self.PARSER_CPU_INFERENCE = True
+        # Quantize the linear layers of the tagging model to int8 on the fast path (faster, may change a few tags)
+        self.PARSER_QUANTIZE = False
+        # Number of threads used by torch within an operation (None keeps torch's default)
+        self.PARSER_THREADS = None
 
         self.ELEMENTS_SER_FILE = "bpmn_elements.pkl"
         self.LANG_SER_FILE = "bpmn_languages.pkl"
@@ -152,10 +158,31 @@ class Config:
         self.MODEL_META_SER_FILE = "model_meta.pkl"
         # Known constraints
         self.DECLARE_CONST = "bpmn_declare_const.pkl"
-        # Known similarities
-        self.SIM_MAP = "sim_map.pkl"
-        # Known embeddings
+        # Known embeddings (memory-mapped matrix and the index mapping sentences to its rows)
+        self.EMB_STORE = "emb_store.npy"
+        self.EMB_STORE_INDEX = "emb_store_index.jsonl"
+        # Type of the stored embeddings ("float32" or "float16")
+        self.EMB_STORE_DTYPE = "float32"
+        # Known embeddings of former versions, imported into the embedding store if it is empty
         self.EMB_MAP = "emb_map.pkl"
+        # Parsed labels of all model collections and logs, reused as long as the parsing model does not change
+        self.PARSED_LABELS = "parsed_labels.pkl"
+        # Content-addressed cache of the artifacts of the pipeline stages (parsed models, logs, constraints, ...)
+        self.STAGE_CACHE_DIR = self.DATA_INTERIM / "stage_cache"
+        # Bump to invalidate all cached artifacts after changing code that affects them
+        self.STAGE_CACHE_CODE_VERSION = "0.1.25"
+        # Least recently used artifacts are evicted once the cache exceeds this size (None means unbounded)
+        self.STAGE_CACHE_MAX_BYTES = 50 * 1024 ** 3
+        # Adopt the pickles written by former versions instead of recomputing them (only if they are up-to-date)
+        self.STAGE_CACHE_ADOPT_LEGACY = False
+        # Similarity indexes over the constraint operands (one per operand kind), reused across logs
+        self.SIM_INDEX = "sim_index.npz"
+        # Only log terms whose similarity to an operand reaches this threshold are kept (see ConstraintFitter)
+        self.SIM_INDEX_THRESHOLD = 0.5
+        # Maximal number of operands kept per log term (None keeps all operands above the threshold)
+        self.SIM_INDEX_TOP_K = None
+        # Number of index partitions searched per log term, more partitions give a better recall
+        self.SIM_INDEX_N_PROBE = 8
 
         self.NON_TASKS = (
             "SequenceFlow", "MessageFlow", "DataObject", "Pool", "Lane", "TextAnnotation", "Association_Undirected",
@@ -198,6 +225,10 @@ class Config:
 
         # Timeout for soundness check and Petri net play-out
         self.TIMEOUT = 10
+        # Number of processes converting models to logs (1 converts them in the current process, None uses all cores)
+        self.LOG_GENERATION_WORKERS = 1
+        # Number of chunks the models are split into for log generation, each chunk is checkpointed separately
+        self.LOG_GENERATION_CHUNKS = 100
 
         # XES ATTRIBUTE NAMES
         self.XES_NAME = "concept:name"
@@ -207,6 +238,12 @@ class Config:
         self.XES_GROUP = "org:group"
         self.XES_ROLE = "org:role"
         self.XES_CASE = "case:" + self.XES_NAME
+        # Attributes of the events that are read from the logs
+        self.LOG_COLUMNS = [self.XES_CASE, self.XES_NAME, self.XES_TIME, self.XES_ROLE]
+        # Logs that were read are cached here, keyed by their size and modification time (None disables the cache)
+        self.LOG_CACHE_DIR = self.DATA_INTERIM / "log_cache"
+        # Format of the cached logs ("pickle", or "parquet" and "feather" if pyarrow is installed)
+        self.LOG_CACHE_FORMAT = "pickle"
         self.XES_INST = "concept:instance"
         self.VIOLATION_TYPE = "violation_type"
 
@@ -370,13 +407,61 @@ class Config:
 
         # Language models used in the project
         self.SPACY_MODEL = "en_core_web_sm"
+        # spaCy analyses (lemma, POS, tag) of single words, kept across runs
+        self.WORD_ANALYSES = "word_analyses.pkl"
+        # Least recently used word analyses are evicted once there are more (None means unbounded)
+        self.WORD_ANALYSES_MAX_ENTRIES = 1_000_000
+        # Number of words spaCy analyzes per batch
+        self.WORD_ANALYSES_BATCH_SIZE = 1000
         self.SENTENCE_TRANSFORMER = "all-MiniLM-L6-v2"
         self.WORD_EMBEDDINGS = "glove-wiki-gigaword-50"
+        # Local copy of the word embeddings, memory-mapped when loaded (downloaded once if missing)
+        self.GLOVE_PATH = self.DATA_ROOT / "glove" / (self.WORD_EMBEDDINGS + ".kv")
+        # Number of words whose nearest neighbours in the word embeddings are computed with one matrix product
+        self.GLOVE_NEIGHBOUR_BATCH_SIZE = 64
+        # Words of the word embeddings that are verbs, similar actions are taken from them
+        self.VERB_VOCABULARY = "verb_vocabulary.pkl"
+        # Similar actions (nearest verbs in the word embeddings) per action, kept across runs
+        self.SIMILAR_ACTIONS = "similar_actions.pkl"
+        # Number of nearest verbs of an action considered, and the similarity they need to exceed
+        self.SIMILAR_ACTIONS_TOP_N = 100
+        self.SIMILAR_ACTIONS_THRESHOLD = 0.8
+        # Categories (upper level actions of the MIT process handbook taxonomy) per action, kept across runs
+        self.ACTION_CATEGORIES_TABLE = "action_categories.pkl"
 
         # Do we consider loops when mining constraints?
         self.LOOPS = True
 
         self.DECLARE_SUPPORT = 0.99
+        # Number of processes discovering DECLARE constraints (1 discovers them in the current process, None uses all
+        # cores)
+        self.DECLARE_EXTRACTION_WORKERS = 1
+        # Number of chunks the logs are split into for discovery, the results of each chunk are checkpointed
+        self.DECLARE_EXTRACTION_CHUNKS = 100
+        # Checkpoints of running discoveries (one directory per discovery input)
+        self.DECLARE_CHUNKS_DIR = self.DATA_INTERIM / "declare_chunks"
+
+        # CONFORMANCE CHECKING ENGINES
+        # Runs the checker of every constraint on every trace
+        self.PLAIN_CHECKING = "plain"
+        # Evaluates every constraint on all traces at once using an integer-encoded log
+        self.VECTORIZED_CHECKING = "vectorized"
+
+        # The engine used to check constraints against logs
+        self.CHECKING_ENGINE = self.VECTORIZED_CHECKING
+
+        # Whether cases with the same (projected) sequence of events are checked only once, as a variant
+        self.VARIANT_CHECKING = True
+        # Number of processes checking the object-level constraints of the business objects (1 checks them in the
+        # current process, None uses all cores)
+        self.CHECKING_WORKERS = 1
+        # Memory (in bytes) that checking a log may take, logs are checked in case-complete chunks sized accordingly
+        # (None checks the whole log at once)
+        self.CHECKING_MEMORY_BUDGET = None
+        # Persistent cache of the outcomes of constraints checked against trace variants (None disables it)
+        self.OUTCOME_CACHE = self.DATA_INTERIM / "outcome_cache.pkl"
+        # Least recently used outcomes are evicted once the cache holds more entries (None means unbounded)
+        self.OUTCOME_CACHE_MAX_ENTRIES = 2_000_000
 
         # Server for MQI sets
         self.MQI_SERVER = "http://141.26.82.70:3000/"
@@ -2,152 +2,188 @@ from math import ceil
 
 from .checkers import *
 from .models import DeclModel
+from .parsers import compile_conditions
 
 
-def check_trace_conformance(trace, model, consider_vacuity):
+def check_constraint(trace, constraint, consider_vacuity, done=True):
+    """
+    Checks a single constraint against a trace, which is completed unless done is False, returns None for templates
+    without a checker. Raises a SyntaxError if the conditions of the constraint are not properly formatted.
+    """
     rules = {"vacuous_satisfaction": consider_vacuity}
+    if constraint['template'].supports_cardinality:
+        rules["n"] = constraint['n']
 
-    # Set containing all constraints that raised SyntaxError in checker functions
-    error_constraint_set = set()
+    # conditions are compiled once per constraint, None stands for a trivially true condition
+    conditions = compile_conditions(constraint)
+    rules["activation"] = conditions["activation"]
+    if constraint['template'].is_binary:
+        rules["correlation"] = conditions["correlation"]
+    rules["time"] = conditions["time"]  # time condition is always at last position
 
-    trace_results = {}
+    if constraint['template'] is Template.EXISTENCE:
+        return mp_existence(trace, done, constraint['activities'][0], rules)
 
-    for idx, constraint in enumerate(model.constraints):
-        constraint_str = model.serialized_constraints[idx]
-        rules["activation"] = constraint['condition'][0]
+    elif constraint['template'] is Template.ABSENCE:
+        return mp_absence(trace, done, constraint['activities'][0], rules)
 
-        if constraint['template'].supports_cardinality:
-            rules["n"] = constraint['n']
-        if constraint['template'].is_binary:
-            rules["correlation"] = constraint['condition'][1]
+    elif constraint['template'] is Template.INIT:
+        return mp_init(trace, done, constraint['activities'][0], rules)
 
-        rules["time"] = constraint['condition'][-1]  # time condition is always at last position
+    elif constraint['template'] is Template.END:
+        return mp_end(trace, done, constraint['activities'][0], rules)
 
-        try:
-            if constraint['template'] is Template.EXISTENCE:
-                trace_results[constraint_str] = mp_existence(trace, True, constraint['activities'][0], rules)
-
-            elif constraint['template'] is Template.ABSENCE:
-                trace_results[constraint_str] = mp_absence(trace, True, constraint['activities'][0], rules)
-
-            elif constraint['template'] is Template.INIT:
-                trace_results[constraint_str] = mp_init(trace, True, constraint['activities'][0], rules)
-
-            elif constraint['template'] is Template.END:
-                trace_results[constraint_str] = mp_end(trace, True, constraint['activities'][0], rules)
-
-            elif constraint['template'] is Template.EXACTLY:
-                trace_results[constraint_str] = mp_exactly(trace, True, constraint['activities'][0], rules)
-
-            elif constraint['template'] is Template.CHOICE:
-                trace_results[constraint_str] = mp_choice(trace, True, constraint['activities'][0],
-                                                          constraint['activities'][1], rules)
-
-            elif constraint['template'] is Template.EXCLUSIVE_CHOICE:
-                trace_results[constraint_str] = mp_exclusive_choice(trace, True,
-                                                                    constraint['activities'][0],
-                                                                    constraint['activities'][1], rules)
-
-            elif constraint['template'] is Template.RESPONDED_EXISTENCE:
-                trace_results[constraint_str] = mp_responded_existence(trace, True,
-                                                                       constraint['activities'][0],
-                                                                       constraint['activities'][1], rules)
-
-            elif constraint['template'] is Template.RESPONSE:
-                trace_results[constraint_str] = mp_response(trace, True, constraint['activities'][0],
-                                                            constraint['activities'][1], rules)
-
-            elif constraint['template'] is Template.ALTERNATE_RESPONSE:
-                trace_results[constraint_str] = mp_alternate_response(trace, True,
-                                                                      constraint['activities'][0],
-                                                                      constraint['activities'][1], rules)
-
-            elif constraint['template'] is Template.CHAIN_RESPONSE:
-                trace_results[constraint_str] = mp_chain_response(trace, True,
-                                                                  constraint['activities'][0],
-                                                                  constraint['activities'][1], rules)
-
-            elif constraint['template'] is Template.PRECEDENCE:
-                trace_results[constraint_str] = mp_precedence(trace, True, constraint['activities'][0],
-                                                              constraint['activities'][1], rules)
-
-            elif constraint['template'] is Template.ALTERNATE_PRECEDENCE:
-                trace_results[constraint_str] = mp_alternate_precedence(trace, True,
-                                                                        constraint['activities'][0],
-                                                                        constraint['activities'][1], rules)
-
-            elif constraint['template'] is Template.CHAIN_PRECEDENCE:
-                trace_results[constraint_str] = mp_chain_precedence(trace, True,
-                                                                    constraint['activities'][0],
-                                                                    constraint['activities'][1], rules)
-            elif constraint['template'] is Template.SUCCESSION:
-                trace_results_response = mp_response(trace, True, constraint['activities'][0],
-                                                     constraint['activities'][1], rules)
-                trace_results_precedence = mp_precedence(trace, True, constraint['activities'][0],
-                                                         constraint['activities'][1], rules)
-                res = CheckerResult(num_fulfillments=trace_results_response.num_fulfillments,
-                                    num_violations=trace_results_response.num_violations,
-                                    num_pendings=None, num_activations=trace_results_response.num_activations,
-                                    state=TraceState.VIOLATED if trace_results_response.state == TraceState.VIOLATED or \
-                                                                 trace_results_precedence.state == TraceState.VIOLATED else
-                                    TraceState.SATISFIED)
-                trace_results[constraint_str] = res
+    elif constraint['template'] is Template.EXACTLY:
+        return mp_exactly(trace, done, constraint['activities'][0], rules)
 
-            elif constraint['template'] is Template.ALTERNATE_SUCCESSION:
-                trace_results_response = mp_alternate_response(trace, True, constraint['activities'][0],
-                                                               constraint['activities'][1], rules)
-                trace_results_precedence = mp_alternate_precedence(trace, True, constraint['activities'][0],
-                                                                   constraint['activities'][1], rules)
-                res = CheckerResult(num_fulfillments=trace_results_response.num_fulfillments,
-                                    num_violations=trace_results_response.num_violations,
-                                    num_pendings=None, num_activations=trace_results_response.num_activations,
-                                    state=TraceState.VIOLATED if trace_results_response.state == TraceState.VIOLATED or \
-                                                                 trace_results_precedence.state == TraceState.VIOLATED else
-                                    TraceState.SATISFIED)
-                trace_results[constraint_str] = res
+    elif constraint['template'] is Template.CHOICE:
+        return mp_choice(trace, done, constraint['activities'][0], constraint['activities'][1], rules)
+
+    elif constraint['template'] is Template.EXCLUSIVE_CHOICE:
+        return mp_exclusive_choice(trace, done, constraint['activities'][0], constraint['activities'][1], rules)
+
+    elif constraint['template'] is Template.RESPONDED_EXISTENCE:
+        return mp_responded_existence(trace, done, constraint['activities'][0], constraint['activities'][1], rules)
+
+    elif constraint['template'] is Template.RESPONSE:
+        return mp_response(trace, done, constraint['activities'][0], constraint['activities'][1], rules)
+
+    elif constraint['template'] is Template.ALTERNATE_RESPONSE:
+        return mp_alternate_response(trace, done, constraint['activities'][0], constraint['activities'][1], rules)
+
+    elif constraint['template'] is Template.CHAIN_RESPONSE:
+        return mp_chain_response(trace, done, constraint['activities'][0], constraint['activities'][1], rules)
+
+    elif constraint['template'] is Template.PRECEDENCE:
+        return mp_precedence(trace, done, constraint['activities'][0], constraint['activities'][1], rules)
+
+    elif constraint['template'] is Template.ALTERNATE_PRECEDENCE:
+        return mp_alternate_precedence(trace, done, constraint['activities'][0], constraint['activities'][1], rules)
 
-            elif constraint['template'] is Template.CHAIN_SUCCESSION:
-                trace_results_response = mp_chain_response(trace, True, constraint['activities'][0],
+    elif constraint['template'] is Template.CHAIN_PRECEDENCE:
+        return mp_chain_precedence(trace, done, constraint['activities'][0], constraint['activities'][1], rules)
+
+    elif constraint['template'] is Template.SUCCESSION:
+        trace_results_response = mp_response(trace, done, constraint['activities'][0],
+                                             constraint['activities'][1], rules)
+        trace_results_precedence = mp_precedence(trace, done, constraint['activities'][0],
+                                                 constraint['activities'][1], rules)
+        res = CheckerResult(num_fulfillments=trace_results_response.num_fulfillments,
+                            num_violations=trace_results_response.num_violations,
+                            num_pendings=None, num_activations=trace_results_response.num_activations,
+                            state=TraceState.VIOLATED if trace_results_response.state == TraceState.VIOLATED or \
+                                                         trace_results_precedence.state == TraceState.VIOLATED else
+                            TraceState.SATISFIED)
+        return res
+
+    elif constraint['template'] is Template.ALTERNATE_SUCCESSION:
+        trace_results_response = mp_alternate_response(trace, done, constraint['activities'][0],
+                                                       constraint['activities'][1], rules)
+        trace_results_precedence = mp_alternate_precedence(trace, done, constraint['activities'][0],
                                                            constraint['activities'][1], rules)
-                trace_results_precedence = mp_chain_precedence(trace, True, constraint['activities'][0],
-                                                               constraint['activities'][1], rules)
-                res = CheckerResult(num_fulfillments=trace_results_response.num_fulfillments,
-                                    num_violations=trace_results_response.num_violations,
-                                    num_pendings=None, num_activations=trace_results_response.num_activations,
-                                    state=TraceState.VIOLATED if trace_results_response.state == TraceState.VIOLATED or \
-                                                                 trace_results_precedence.state == TraceState.VIOLATED else
-                                    TraceState.SATISFIED)
-                trace_results[constraint_str] = res
+        res = CheckerResult(num_fulfillments=trace_results_response.num_fulfillments,
+                            num_violations=trace_results_response.num_violations,
+                            num_pendings=None, num_activations=trace_results_response.num_activations,
+                            state=TraceState.VIOLATED if trace_results_response.state == TraceState.VIOLATED or \
+                                                         trace_results_precedence.state == TraceState.VIOLATED else
+                            TraceState.SATISFIED)
+        return res
+
+    elif constraint['template'] is Template.CHAIN_SUCCESSION:
+        trace_results_response = mp_chain_response(trace, done, constraint['activities'][0],
+                                                   constraint['activities'][1], rules)
+        trace_results_precedence = mp_chain_precedence(trace, done, constraint['activities'][0],
+                                                       constraint['activities'][1], rules)
+        res = CheckerResult(num_fulfillments=trace_results_response.num_fulfillments,
+                            num_violations=trace_results_response.num_violations,
+                            num_pendings=None, num_activations=trace_results_response.num_activations,
+                            state=TraceState.VIOLATED if trace_results_response.state == TraceState.VIOLATED or \
+                                                         trace_results_precedence.state == TraceState.VIOLATED else
+                            TraceState.SATISFIED)
+        return res
+
+    elif constraint['template'] is Template.NOT_RESPONDED_EXISTENCE:
+        return mp_not_responded_existence(trace, done, constraint['activities'][0], constraint['activities'][1], rules)
+
+    elif constraint['template'] is Template.NOT_RESPONSE:
+        return mp_not_response(trace, done, constraint['activities'][0], constraint['activities'][1], rules)
+
+    elif constraint['template'] is Template.NOT_CHAIN_RESPONSE:
+        return mp_not_chain_response(trace, done, constraint['activities'][0], constraint['activities'][1], rules)
+
+    elif constraint['template'] is Template.NOT_PRECEDENCE:
+        return mp_not_precedence(trace, done, constraint['activities'][0], constraint['activities'][1], rules)
+
+    elif constraint['template'] is Template.NOT_CHAIN_PRECEDENCE:
+        return mp_not_chain_precedence(trace, done, constraint['activities'][0], constraint['activities'][1], rules)
+    # elif constraint['template'] is Template.NOT_SUCCESSION:
+    #     return mp_not_succession(trace, done, constraint['activities'][0], constraint['activities'][1], rules)
+    return None
 
-            elif constraint['template'] is Template.NOT_RESPONDED_EXISTENCE:
-                trace_results[constraint_str] = mp_not_responded_existence(trace, True,
-                                                                           constraint['activities'][0],
-                                                                           constraint['activities'][1],
-                                                                           rules)
-
-            elif constraint['template'] is Template.NOT_RESPONSE:
-                trace_results[constraint_str] = mp_not_response(trace, True, constraint['activities'][0],
-                                                                constraint['activities'][1], rules)
-
-            elif constraint['template'] is Template.NOT_CHAIN_RESPONSE:
-                trace_results[constraint_str] = mp_not_chain_response(trace, True,
-                                                                      constraint['activities'][0],
-                                                                      constraint['activities'][1], rules)
-
-            elif constraint['template'] is Template.NOT_PRECEDENCE:
-                trace_results[constraint_str] = mp_not_precedence(trace, True,
-                                                                  constraint['activities'][0],
-                                                                  constraint['activities'][1], rules)
-
-            elif constraint['template'] is Template.NOT_CHAIN_PRECEDENCE:
-                trace_results[constraint_str] = mp_not_chain_precedence(trace, True,
-                                                                        constraint['activities'][0],
-                                                                        constraint['activities'][1], rules)
-            # elif constraint['template'] is Template.NOT_SUCCESSION:
-            #     trace_results[constraint_str] = mp_not_succession(trace, True,
-            #                                                       constraint['activities'][0],
-            #                                                       constraint['activities'][1], rules)
 
+class ConstraintIndex:
+    """
+    Inverted index from the activities to the constraints of a model. A constraint can only have an outcome other
+    than its vacuous one in traces that contain one of its activities, its vacuous outcome is the one for a
+    non-empty trace without its activities.
+    """
+
+    def __init__(self, model, consider_vacuity):
+        # the constraints the index was built for, it is stale once the model's constraints differ
+        self.serialized_constraints = list(model.serialized_constraints)
+        self.constraints_per_activity = {}
+        for idx, constraint in enumerate(model.constraints):
+            for activity in constraint['activities']:
+                self.constraints_per_activity.setdefault(activity, []).append(idx)
+        # a trace whose only event is of an activity that no constraint refers to
+        absent_trace = [{"concept:name": object()}]
+        self.vacuous_results = {}
+        for idx, constraint in enumerate(model.constraints):
+            try:
+                res = check_constraint(absent_trace, constraint, consider_vacuity)
+            except SyntaxError:
+                continue
+            if res is not None:
+                self.vacuous_results[model.serialized_constraints[idx]] = res
+
+    def get_candidates(self, trace):
+        """
+        Returns the positions (in model order) of the constraints that refer to an activity of the trace.
+        """
+        candidates = set()
+        for activity in {event["concept:name"] for event in trace}:
+            candidates.update(self.constraints_per_activity.get(activity, ()))
+        return sorted(candidates)
+
+
+def get_constraint_index(model, consider_vacuity):
+    index = model.constraint_indices.get(consider_vacuity)
+    if index is None or index.serialized_constraints != model.serialized_constraints:
+        index = ConstraintIndex(model, consider_vacuity)
+        model.constraint_indices[consider_vacuity] = index
+    return index
+
+
+def check_trace_conformance(trace, model, consider_vacuity):
+    # Set containing all constraints that raised SyntaxError in checker functions
+    error_constraint_set = set()
+
+    if len(trace) == 0:
+        candidates = range(len(model.constraints))
+        trace_results = {}
+    else:
+        # only constraints referring to activities of the trace are checked, the others have their vacuous outcome
+        index = get_constraint_index(model, consider_vacuity)
+        candidates = index.get_candidates(trace)
+        trace_results = dict(index.vacuous_results)
+
+    for idx in candidates:
+        constraint = model.constraints[idx]
+        constraint_str = model.serialized_constraints[idx]
+        try:
+            res = check_constraint(trace, constraint, consider_vacuity)
+            if res is not None:
+                trace_results[constraint_str] = res
         except SyntaxError:
             if constraint_str not in error_constraint_set:
                 error_constraint_set.add(constraint_str)
@@ -1,23 +1,18 @@
 from ..enums import TraceState
 from ..models import CheckerResult
-from ..parsers import parse_data_cond, parse_time_cond
-from datetime import timedelta
-
-# Defining global and local functions/variables to use within eval() to prevent code injection
-glob = {'__builtins__': None}
 
 
 # mp-choice constraint checker
 # Description:
 def mp_choice(trace, done, a, b, rules):
-    activation_rules = parse_data_cond(rules["activation"])
-    time_rule = parse_time_cond(rules["time"])
+    activation_rules = rules["activation"]
+    time_rule = rules["time"]
 
     a_or_b_occurs = False
     for A in trace:
         if A["concept:name"] == a or A["concept:name"] == b:
-            locl = {'A': A, 'T': trace[0], 'timedelta': timedelta, 'abs': abs, 'float': float}
-            if eval(activation_rules, glob, locl) and eval(time_rule, glob, locl):
+            if (activation_rules is None or activation_rules.evaluate(A, trace[0])) and \
+                    (time_rule is None or time_rule.evaluate(A, trace[0])):
                 a_or_b_occurs = True
                 break
 
@@ -36,18 +31,19 @@ def mp_choice(trace, done, a, b, rules):
 # mp-exclusive-choice constraint checker
 # Description:
 def mp_exclusive_choice(trace, done, a, b, rules):
-    activation_rules = parse_data_cond(rules["activation"])
-    time_rule = parse_time_cond(rules["time"])
+    activation_rules = rules["activation"]
+    time_rule = rules["time"]
 
     a_occurs = False
     b_occurs = False
     for A in trace:
-        locl = {'A': A, 'T': trace[0], 'timedelta': timedelta, 'abs': abs, 'float': float}
         if not a_occurs and A["concept:name"] == a:
-            if eval(activation_rules, glob, locl) and eval(time_rule, glob, locl):
+            if (activation_rules is None or activation_rules.evaluate(A, trace[0])) and \
+                    (time_rule is None or time_rule.evaluate(A, trace[0])):
                 a_occurs = True
         if not b_occurs and A["concept:name"] == b:
-            if eval(activation_rules, glob, locl) and eval(time_rule, glob, locl):
+            if (activation_rules is None or activation_rules.evaluate(A, trace[0])) and \
+                    (time_rule is None or time_rule.evaluate(A, trace[0])):
                 b_occurs = True
         if a_occurs and b_occurs:
             break
@@ -1,10 +1,5 @@
 from ..enums import *
 from ..models import CheckerResult
-from ..parsers import parse_data_cond, parse_time_cond
-from datetime import timedelta
-
-# Defining global and local functions/variables to use within eval() to prevent code injection
-glob = {'__builtins__': None}
 
 
 # mp-existence constraint checker
@@ -12,14 +7,14 @@ glob = {'__builtins__': None}
 # The future constraining constraint existence(n, a) indicates that
 # event a must occur at least n-times in the trace.
 def mp_existence(trace, done, a, rules):
-    activation_rules = parse_data_cond(rules["activation"])
-    time_rule = parse_time_cond(rules["time"])
+    activation_rules = rules["activation"]
+    time_rule = rules["time"]
 
     num_activations = 0
     for A in trace:
         if A["concept:name"] == a:
-            locl = {'A': A, 'T': trace[0], 'timedelta': timedelta, 'abs': abs, 'float': float}
-            if eval(activation_rules, glob, locl) and eval(time_rule, glob, locl):
+            if (activation_rules is None or activation_rules.evaluate(A, trace[0])) and \
+                    (time_rule is None or time_rule.evaluate(A, trace[0])):
                 num_activations += 1
 
     n = rules["n"]
@@ -40,14 +35,14 @@ def mp_existence(trace, done, a, rules):
 # The future constraining constraint absence(n + 1, a) indicates that
 # event a may occur at most n − times in the trace.
 def mp_absence(trace, done, a, rules):
-    activation_rules = parse_data_cond(rules["activation"])
-    time_rule = parse_time_cond(rules["time"])
+    activation_rules = rules["activation"]
+    time_rule = rules["time"]
 
     num_activations = 0
     for A in trace:
         if A["concept:name"] == a:
-            locl = {'A': A, 'T': trace[0], 'timedelta': timedelta, 'abs': abs, 'float': float}
-            if eval(activation_rules, glob, locl) and eval(time_rule, glob, locl):
+            if (activation_rules is None or activation_rules.evaluate(A, trace[0])) and \
+                    (time_rule is None or time_rule.evaluate(A, trace[0])):
                 num_activations += 1
 
     n = rules["n"]
@@ -68,24 +63,22 @@ def mp_absence(trace, done, a, rules):
 # The future constraining constraint init(e) indicates that
 # event e is the first event that occurs in the trace.
 def mp_init(trace, done, a, rules):
-    activation_rules = parse_data_cond(rules["activation"])
+    activation_rules = rules["activation"]
 
     state = TraceState.VIOLATED
     if trace[0]["concept:name"] == a:
-        locl = {'A': trace[0]}
-        if eval(activation_rules, glob, locl):
+        if activation_rules is None or activation_rules.evaluate(trace[0]):
             state = TraceState.SATISFIED
 
     return CheckerResult(num_fulfillments=None, num_violations=None, num_pendings=None, num_activations=None,
                          state=state)
 
 def mp_end(trace, done, a, rules):
-    activation_rules = parse_data_cond(rules["activation"])
+    activation_rules = rules["activation"]
 
     state = TraceState.VIOLATED
     if trace[-1]["concept:name"] == a:
-        locl = {'A': trace[0]}
-        if eval(activation_rules, glob, locl):
+        if activation_rules is None or activation_rules.evaluate(trace[0]):
             state = TraceState.SATISFIED
 
     return CheckerResult(num_fulfillments=None, num_violations=None, num_pendings=None, num_activations=None,
@@ -95,14 +88,14 @@ def mp_end(trace, done, a, rules):
 # mp-exactly constraint checker
 # Description:
 def mp_exactly(trace, done, a, rules):
-    activation_rules = parse_data_cond(rules["activation"])
-    time_rule = parse_time_cond(rules["time"])
+    activation_rules = rules["activation"]
+    time_rule = rules["time"]
 
     num_activations = 0
     for A in trace:
         if A["concept:name"] == a:
-            locl = {'A': A, 'T': trace[0], 'timedelta': timedelta, 'abs': abs, 'float': float}
-            if eval(activation_rules, glob, locl) and eval(time_rule, glob, locl):
+            if (activation_rules is None or activation_rules.evaluate(A, trace[0])) and \
+                    (time_rule is None or time_rule.evaluate(A, trace[0])):
                 num_activations += 1
 
     n = rules["n"]
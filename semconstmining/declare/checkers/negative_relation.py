@@ -1,18 +1,13 @@
 from ..enums import TraceState
 from ..models import CheckerResult
-from ..parsers import parse_data_cond, parse_time_cond
-from datetime import timedelta
-
-# Defining global and local functions/variables to use within eval() to prevent code injection
-glob = {'__builtins__': None}
 
 
 # mp-not-responded-existence constraint checker
 # Description:
 def mp_not_responded_existence(trace, done, a, b, rules):
-    activation_rules = parse_data_cond(rules["activation"])
-    correlation_rules = parse_data_cond(rules["correlation"])
-    time_rule = parse_time_cond(rules["time"])
+    activation_rules = rules["activation"]
+    correlation_rules = rules["correlation"]
+    time_rule = rules["time"]
 
     pendings = []
     num_fulfillments = 0
@@ -21,8 +16,7 @@ def mp_not_responded_existence(trace, done, a, b, rules):
 
     for event in trace:
         if event["concept:name"] == a:
-            locl = {'A': event}
-            if eval(activation_rules, glob, locl):
+            if activation_rules is None or activation_rules.evaluate(event):
                 pendings.append(event)
 
     for event in trace:
@@ -31,8 +25,8 @@ def mp_not_responded_existence(trace, done, a, b, rules):
 
         if event["concept:name"] == b:
             for A in reversed(pendings):
-                locl = {'A': A, 'T': event, 'timedelta': timedelta, 'abs': abs, 'float': float}
-                if eval(correlation_rules, glob, locl) and eval(time_rule, glob, locl):
+                if (correlation_rules is None or correlation_rules.evaluate(A, event)) and \
+                        (time_rule is None or time_rule.evaluate(A, event)):
                     pendings.remove(A)
                     num_violations += 1
 
@@ -64,9 +58,9 @@ def mp_not_responded_existence(trace, done, a, b, rules):
 # mp-not-response constraint checker
 # Description:
 def mp_not_response(trace, done, a, b, rules):
-    activation_rules = parse_data_cond(rules["activation"])
-    correlation_rules = parse_data_cond(rules["correlation"])
-    time_rule = parse_time_cond(rules["time"])
+    activation_rules = rules["activation"]
+    correlation_rules = rules["correlation"]
+    time_rule = rules["time"]
 
     pendings = []
     num_fulfillments = 0
@@ -75,14 +69,13 @@ def mp_not_response(trace, done, a, b, rules):
 
     for event in trace:
         if event["concept:name"] == a:
-            locl = {'A': event}
-            if eval(activation_rules, glob, locl):
+            if activation_rules is None or activation_rules.evaluate(event):
                 pendings.append(event)
 
         if pendings and event["concept:name"] == b:
             for A in reversed(pendings):
-                locl = {'A': A, 'T': event, 'timedelta': timedelta, 'abs': abs, 'float': float}
-                if eval(correlation_rules, glob, locl) and eval(time_rule, glob, locl):
+                if (correlation_rules is None or correlation_rules.evaluate(A, event)) and \
+                        (time_rule is None or time_rule.evaluate(A, event)):
                     pendings.remove(A)
                     num_violations += 1
 
@@ -114,9 +107,9 @@ def mp_not_response(trace, done, a, b, rules):
 # mp-not-chain-response constraint checker
 # Description:
 def mp_not_chain_response(trace, done, a, b, rules):
-    activation_rules = parse_data_cond(rules["activation"])
-    correlation_rules = parse_data_cond(rules["correlation"])
-    time_rule = parse_time_cond(rules["time"])
+    activation_rules = rules["activation"]
+    correlation_rules = rules["correlation"]
+    time_rule = rules["time"]
 
     num_activations = 0
     num_violations = 0
@@ -125,15 +118,13 @@ def mp_not_chain_response(trace, done, a, b, rules):
     for index, event in enumerate(trace):
 
         if event["concept:name"] == a:
-            locl = {'A': event}
-
-            if eval(activation_rules, glob, locl):
+            if activation_rules is None or activation_rules.evaluate(event):
                 num_activations += 1
 
                 if index < len(trace) - 1:
                     if trace[index + 1]["concept:name"] == b:
-                        locl = {'A': event, 'T': trace[index + 1], 'timedelta': timedelta, 'abs': abs, 'float': float}
-                        if eval(correlation_rules, glob, locl) and eval(time_rule, glob, locl):
+                        if (correlation_rules is None or correlation_rules.evaluate(event, trace[index + 1])) and \
+                                (time_rule is None or time_rule.evaluate(event, trace[index + 1])):
                             num_violations += 1
                 else:
                     if not done:
@@ -162,9 +153,9 @@ def mp_not_chain_response(trace, done, a, b, rules):
 # mp-not-precedence constraint checker
 # Description:
 def mp_not_precedence(trace, done, a, b, rules):
-    activation_rules = parse_data_cond(rules["activation"])
-    correlation_rules = parse_data_cond(rules["correlation"])
-    time_rule = parse_time_cond(rules["time"])
+    activation_rules = rules["activation"]
+    correlation_rules = rules["correlation"]
+    time_rule = rules["time"]
 
     num_activations = 0
     num_violations = 0
@@ -175,14 +166,12 @@ def mp_not_precedence(trace, done, a, b, rules):
             Ts.append(event)
 
         if event["concept:name"] == b:
-            locl = {'A': event}
-
-            if eval(activation_rules, glob, locl):
+            if activation_rules is None or activation_rules.evaluate(event):
                 num_activations += 1
 
                 for T in Ts:
-                    locl = {'A': event, 'T': T, 'timedelta': timedelta, 'abs': abs, 'float': float}
-                    if eval(correlation_rules, glob, locl) and eval(time_rule, glob, locl):
+                    if (correlation_rules is None or correlation_rules.evaluate(event, T)) and \
+                            (time_rule is None or time_rule.evaluate(event, T)):
                         num_violations += 1
                         break
 
@@ -209,9 +198,9 @@ def mp_not_precedence(trace, done, a, b, rules):
 # mp-not-chain-precedence constraint checker
 # Description:
 def mp_not_chain_precedence(trace, done, a, b, rules):
-    activation_rules = parse_data_cond(rules["activation"])
-    correlation_rules = parse_data_cond(rules["correlation"])
-    time_rule = parse_time_cond(rules["time"])
+    activation_rules = rules["activation"]
+    correlation_rules = rules["correlation"]
+    time_rule = rules["time"]
 
     num_activations = 0
     num_violations = 0
@@ -219,14 +208,12 @@ def mp_not_chain_precedence(trace, done, a, b, rules):
     for index, event in enumerate(trace):
 
         if event["concept:name"] == b:
-            locl = {'A': event}
-
-            if eval(activation_rules, glob, locl):
+            if activation_rules is None or activation_rules.evaluate(event):
                 num_activations += 1
 
                 if index != 0 and trace[index - 1]["concept:name"] == a:
-                    locl = {'A': event, 'T': trace[index - 1], 'timedelta': timedelta, 'abs': abs, 'float': float}
-                    if eval(correlation_rules, glob, locl) and eval(time_rule, glob, locl):
+                    if (correlation_rules is None or correlation_rules.evaluate(event, trace[index - 1])) and \
+                            (time_rule is None or time_rule.evaluate(event, trace[index - 1])):
                         num_violations += 1
 
     num_fulfillments = num_activations - num_violations
@@ -250,9 +237,9 @@ def mp_not_chain_precedence(trace, done, a, b, rules):
 
 
 def mp_not_succession(trace, done, a, b, rules):
-    activation_rules = parse_data_cond(rules["activation"])
-    correlation_rules = parse_data_cond(rules["correlation"])
-    time_rule = parse_time_cond(rules["time"])
+    activation_rules = rules["activation"]
+    correlation_rules = rules["correlation"]
+    time_rule = rules["time"]
 
     num_fulfillments = 0
     num_violations = 0
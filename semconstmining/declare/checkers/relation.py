@@ -1,10 +1,5 @@
 from ..enums import TraceState
 from ..models import CheckerResult
-from ..parsers import parse_data_cond, parse_time_cond
-from datetime import timedelta
-
-# Defining global and local functions/variables to use within eval() to prevent code injection
-glob = {'__builtins__': None}
 
 
 # mp-responded-existence constraint checker
@@ -14,9 +9,9 @@ glob = {'__builtins__': None}
 # then event b occurs in the trace as well.
 # Event a activates the constraint.
 def mp_responded_existence(trace, done, a, b, rules):
-    activation_rules = parse_data_cond(rules["activation"])
-    correlation_rules = parse_data_cond(rules["correlation"])
-    time_rule = parse_time_cond(rules["time"])
+    activation_rules = rules["activation"]
+    correlation_rules = rules["correlation"]
+    time_rule = rules["time"]
 
     pendings = []
     num_fulfillments = 0
@@ -25,8 +20,7 @@ def mp_responded_existence(trace, done, a, b, rules):
 
     for event in trace:
         if event["concept:name"] == a:
-            locl = {'A': event}
-            if eval(activation_rules, glob, locl):
+            if activation_rules is None or activation_rules.evaluate(event):
                 pendings.append(event)
 
     for event in trace:
@@ -35,8 +29,8 @@ def mp_responded_existence(trace, done, a, b, rules):
 
         if event["concept:name"] == b:
             for A in reversed(pendings):
-                locl = {'A': A, 'T': event, 'timedelta': timedelta, 'abs': abs, 'float': float}
-                if eval(correlation_rules, glob, locl) and eval(time_rule, glob, locl):
+                if (correlation_rules is None or correlation_rules.evaluate(A, event)) and \
+                        (time_rule is None or time_rule.evaluate(A, event)):
                     pendings.remove(A)
                     num_fulfillments += 1
 
@@ -73,9 +67,9 @@ def mp_responded_existence(trace, done, a, b, rules):
 # if event a occurs in the trace, then event b occurs after a.
 # Event a activates the constraint.
 def mp_response(trace, done, a, b, rules):
-    activation_rules = parse_data_cond(rules["activation"])
-    correlation_rules = parse_data_cond(rules["correlation"])
-    time_rule = parse_time_cond(rules["time"])
+    activation_rules = rules["activation"]
+    correlation_rules = rules["correlation"]
+    time_rule = rules["time"]
 
     pendings = []
     num_fulfillments = 0
@@ -84,14 +78,13 @@ def mp_response(trace, done, a, b, rules):
 
     for event in trace:
         if event["concept:name"] == a:
-            locl = {'A': event}
-            if eval(activation_rules, glob, locl):
+            if activation_rules is None or activation_rules.evaluate(event):
                 pendings.append(event)
 
         if pendings and event["concept:name"] == b:
             for A in reversed(pendings):
-                locl = {'A': A, 'T': event, 'timedelta': timedelta, 'abs': abs, 'float': float}
-                if eval(correlation_rules, glob, locl) and eval(time_rule, glob, locl):
+                if (correlation_rules is None or correlation_rules.evaluate(A, event)) and \
+                        (time_rule is None or time_rule.evaluate(A, event)):
                     pendings.remove(A)
                     num_fulfillments += 1
 
@@ -129,9 +122,9 @@ def mp_response(trace, done, a, b, rules):
 # before event a recurs.
 # Event a activates the constraint.
 def mp_alternate_response(trace, done, a, b, rules):
-    activation_rules = parse_data_cond(rules["activation"])
-    correlation_rules = parse_data_cond(rules["correlation"])
-    time_rule = parse_time_cond(rules["time"])
+    activation_rules = rules["activation"]
+    correlation_rules = rules["correlation"]
+    time_rule = rules["time"]
 
     pending = None
     num_activations = 0
@@ -140,14 +133,13 @@ def mp_alternate_response(trace, done, a, b, rules):
 
     for event in trace:
         if event["concept:name"] == a:
-            locl = {'A': event}
-            if eval(activation_rules, glob, locl):
+            if activation_rules is None or activation_rules.evaluate(event):
                 pending = event
                 num_activations += 1
 
         if event["concept:name"] == b and pending is not None:
-            locl = {'A': pending, 'T': event, 'timedelta': timedelta, 'abs': abs, 'float': float}
-            if eval(correlation_rules, glob, locl) and eval(time_rule, glob, locl):
+            if (correlation_rules is None or correlation_rules.evaluate(pending, event)) and \
+                    (time_rule is None or time_rule.evaluate(pending, event)):
                 pending = None
                 num_fulfillments += 1
 
@@ -182,9 +174,9 @@ def mp_alternate_response(trace, done, a, b, rules):
 # each time event a occurs in the trace, event b occurs immediately afterwards.
 # Event a activates the constraint.
 def mp_chain_response(trace, done, a, b, rules):
-    activation_rules = parse_data_cond(rules["activation"])
-    correlation_rules = parse_data_cond(rules["correlation"])
-    time_rule = parse_time_cond(rules["time"])
+    activation_rules = rules["activation"]
+    correlation_rules = rules["correlation"]
+    time_rule = rules["time"]
 
     num_activations = 0
     num_fulfillments = 0
@@ -193,15 +185,13 @@ def mp_chain_response(trace, done, a, b, rules):
     for index, event in enumerate(trace):
 
         if event["concept:name"] == a:
-            locl = {'A': event}
-
-            if eval(activation_rules, glob, locl):
+            if activation_rules is None or activation_rules.evaluate(event):
                 num_activations += 1
 
                 if index < len(trace) - 1:
                     if trace[index+1]["concept:name"] == b:
-                        locl = {'A': event, 'T': trace[index+1], 'timedelta': timedelta, 'abs': abs, 'float': float}
-                        if eval(correlation_rules, glob, locl) and eval(time_rule, glob, locl):
+                        if (correlation_rules is None or correlation_rules.evaluate(event, trace[index+1])) and \
+                                (time_rule is None or time_rule.evaluate(event, trace[index+1])):
                             num_fulfillments += 1
                 else:
                     if not done:
@@ -234,9 +224,9 @@ def mp_chain_response(trace, done, a, b, rules):
 # The history-based constraint precedence(a,b) indicates that event b occurs
 # only in the trace, if preceded by a. Event b activates the constraint.
 def mp_precedence(trace, done, a, b, rules):
-    activation_rules = parse_data_cond(rules["activation"])
-    correlation_rules = parse_data_cond(rules["correlation"])
-    time_rule = parse_time_cond(rules["time"])
+    activation_rules = rules["activation"]
+    correlation_rules = rules["correlation"]
+    time_rule = rules["time"]
 
     num_activations = 0
     num_fulfillments = 0
@@ -247,14 +237,12 @@ def mp_precedence(trace, done, a, b, rules):
             Ts.append(event)
 
         if event["concept:name"] == b:
-            locl = {'A': event}
-
-            if eval(activation_rules, glob, locl):
+            if activation_rules is None or activation_rules.evaluate(event):
                 num_activations += 1
 
                 for T in Ts:
-                    locl = {'A': event, 'T': T, 'timedelta': timedelta, 'abs': abs, 'float': float}
-                    if eval(correlation_rules, glob, locl) and eval(time_rule, glob, locl):
+                    if (correlation_rules is None or correlation_rules.evaluate(event, T)) and \
+                            (time_rule is None or time_rule.evaluate(event, T)):
                         num_fulfillments += 1
                         break
 
@@ -285,9 +273,9 @@ def mp_precedence(trace, done, a, b, rules):
 # it is preceded by event a and no other event b can recur in between.
 # Event b activates the constraint.
 def mp_alternate_precedence(trace, done, a, b, rules):
-    activation_rules = parse_data_cond(rules["activation"])
-    correlation_rules = parse_data_cond(rules["correlation"])
-    time_rule = parse_time_cond(rules["time"])
+    activation_rules = rules["activation"]
+    correlation_rules = rules["correlation"]
+    time_rule = rules["time"]
 
     num_activations = 0
     num_fulfillments = 0
@@ -298,12 +286,11 @@ def mp_alternate_precedence(trace, done, a, b, rules):
             Ts.append(event)
 
         if event["concept:name"] == b:
-            locl = {'A': event}
-            if eval(activation_rules, glob, locl):
+            if activation_rules is None or activation_rules.evaluate(event):
                 num_activations += 1
                 for T in Ts:
-                    locl = {'A': event, 'T': T, 'timedelta': timedelta, 'abs': abs, 'float': float}
-                    if eval(correlation_rules, glob, locl) and eval(time_rule, glob, locl):
+                    if (correlation_rules is None or correlation_rules.evaluate(event, T)) and \
+                            (time_rule is None or time_rule.evaluate(event, T)):
                         num_fulfillments += 1
                         break
                 Ts = []
@@ -334,23 +321,21 @@ def mp_alternate_precedence(trace, done, a, b, rules):
 # each time event b occurs in the trace, event a occurs immediately beforehand.
 # Event b activates the constraint.
 def mp_chain_precedence(trace, done, a, b, rules):
-    activation_rules = parse_data_cond(rules["activation"])
-    correlation_rules = parse_data_cond(rules["correlation"])
-    time_rule = parse_time_cond(rules["time"])
+    activation_rules = rules["activation"]
+    correlation_rules = rules["correlation"]
+    time_rule = rules["time"]
 
     num_activations = 0
     num_fulfillments = 0
 
     for index, event in enumerate(trace):
         if event["concept:name"] == b:
-            locl = {'A': event}
-
-            if eval(activation_rules, glob, locl):
+            if activation_rules is None or activation_rules.evaluate(event):
                 num_activations += 1
 
                 if index != 0 and trace[index-1]["concept:name"] == a:
-                    locl = {'A': event, 'T': trace[index-1], 'timedelta': timedelta, 'abs': abs, 'float': float}
-                    if eval(correlation_rules, glob, locl) and eval(time_rule, glob, locl):
+                    if (correlation_rules is None or correlation_rules.evaluate(event, trace[index-1])) and \
+                            (time_rule is None or time_rule.evaluate(event, trace[index-1])):
                         num_fulfillments += 1
 
     num_violations = num_activations - num_fulfillments
@@ -6,11 +6,12 @@ from typing import List
 
 from .parsers import *
 from .api_functions import *
+from .models import EncodedLog
+from .vectorized_checking import check_log_conformance, discover_constraints
 import sys
 import pm4py
+import numpy as np
 import pandas as pd
-from mlxtend.preprocessing import TransactionEncoder
-from mlxtend.frequent_patterns import fpgrowth, apriori
 from itertools import product
 from itertools import combinations
 warnings.filterwarnings("ignore", category=DeprecationWarning)
@@ -91,6 +92,8 @@ class Declare:
         projection = []
         if self.log is None:
             raise RuntimeError("You must load a log before.")
+        if isinstance(self.log, EncodedLog):
+            return self.log.activity_lists()
         for trace in self.log:
             tmp_trace = []
             for event in trace:
@@ -134,6 +137,7 @@ class Declare:
         """
         if self.log is None:
             raise RuntimeError("You must load a log before.")
+        from mlxtend.preprocessing import TransactionEncoder
         te = TransactionEncoder()
         if dimension == 'act':
             dataset = self.activities_log_projection()
@@ -183,6 +187,7 @@ class Declare:
             # calculate all item sets up to the given length
 
         self.log_encoding(dimension)
+        from mlxtend.frequent_patterns import fpgrowth, apriori
         if algorithm == 'fpgrowth':
             frequent_itemsets = fpgrowth(self.binary_encoded_log, min_support=min_support, use_colnames=True)
         elif algorithm == 'apriori':
@@ -206,6 +211,8 @@ class Declare:
         """
         if self.log is None:
             raise RuntimeError("You must load a log before.")
+        if isinstance(self.log, EncodedLog):
+            return list(enumerate(self.log.trace_names))
         trace_ids = []
         for trace_id, trace in enumerate(self.log):
             trace_ids.append((trace_id, trace.attributes["concept:name"]))
@@ -265,6 +272,8 @@ class Declare:
         """
         if self.log is None:
             raise RuntimeError("You must load a log before.")
+        if isinstance(self.log, EncodedLog):
+            return [self.log.activities[code] for code in np.unique(self.log.codes)]
         activities = set()
         for trace in self.log:
             for event in trace:
@@ -379,13 +388,39 @@ class Declare:
             raise RuntimeError("You must load the DECLARE model before checking the model.")
 
         self.conformance_checking_results = {}
-        for i, trace in enumerate(self.log):
+        traces = self.log.traces if isinstance(self.log, EncodedLog) else self.log
+        for i, trace in enumerate(traces):
             trc_res = check_trace_conformance(trace, self.model, consider_vacuity)
             self.conformance_checking_results[trace.attributes["concept:name"]] = {const for const, res in
                                                                                    trc_res.items() if
                                                                                    res.state == TraceState.VIOLATED}
         return self.conformance_checking_results
 
+    def vectorized_conformance_checking(self, consider_vacuity: bool) -> dict[str: set[str]]:
+        """
+        Performs checking for the provided event log and DECLARE model by evaluating every constraint on all traces
+        at once. The results are the same as the ones of conformance_checking().
+
+        Parameters
+        ----------
+        consider_vacuity : bool
+            True means that vacuously satisfied traces are considered as satisfied, violated otherwise.
+
+        Returns
+        -------
+        conformance_checking_results
+            dictionary where the key is the trace name and the value is the set of constraints violated by the trace.
+        """
+        _logger.debug("Checking (vectorized) ...")
+        if self.log is None:
+            raise RuntimeError("You must load the log before checking the model.")
+        if self.model is None:
+            raise RuntimeError("You must load the DECLARE model before checking the model.")
+
+        encoded_log = self.log if isinstance(self.log, EncodedLog) else EncodedLog.from_event_log(self.log)
+        self.conformance_checking_results = check_log_conformance(encoded_log, self.model, consider_vacuity)
+        return self.conformance_checking_results
+
     def discovery(self, consider_vacuity: bool, max_declare_cardinality: int = 3, output_path: str = None,
                   do_unary=True, plain=False) \
             -> dict[str: dict[tuple[int, str]: CheckerResult]]:
@@ -421,8 +456,7 @@ class Declare:
         if max_declare_cardinality <= 0:
             raise RuntimeError("Cardinality must be greater than 0.")
 
-        self.discovery_results = {}
-        self.associated_entities = {}
+        candidates = []
         for item_set in self.frequent_item_sets['itemsets']:
             length = len(item_set)
             if do_unary and length == 1:
@@ -431,38 +465,97 @@ class Declare:
                         continue
                     constraint = {"template": templ, "activities": list(item_set), "condition": ("", "")}
                     if not templ.supports_cardinality:
-                        self.discovery_results |= discover_constraint(self.log, constraint, consider_vacuity)
+                        candidates.append(constraint)
                     else:
                         for i in range(max_declare_cardinality):
-                            constraint['n'] = i+1
-                            self.discovery_results |= discover_constraint(self.log, constraint, consider_vacuity)
+                            candidates.append(constraint | {"n": i + 1})
 
             elif length == 2:
                 for templ in Template.get_binary_templates():
                     if templ.templ_str in self.config.CONSTRAINT_TYPES_TO_IGNORE:
                         continue
-                    constraint = {"template": templ, "activities": list(item_set), "condition": ("", "", "")}
-                    self.discovery_results |= discover_constraint(self.log, constraint, consider_vacuity)
+                    candidates.append({"template": templ, "activities": list(item_set), "condition": ("", "", "")})
+                    candidates.append({"template": templ, "activities": list(reversed(list(item_set))),
+                                       "condition": ("", "", "")})
 
-                    constraint['activities'] = list(reversed(list(item_set)))
-                    self.discovery_results |= discover_constraint(self.log, constraint, consider_vacuity)
+        if self.config.CHECKING_ENGINE == self.config.VECTORIZED_CHECKING:
+            encoded_log = self.log if isinstance(self.log, EncodedLog) else EncodedLog.from_event_log(self.log)
+            self.discovery_results = discover_constraints(encoded_log, candidates, consider_vacuity)
+        else:
+            self.discovery_results = {}
+            traces = self.log.traces if isinstance(self.log, EncodedLog) else self.log
+            for constraint in candidates:
+                self.discovery_results |= discover_constraint(traces, constraint, consider_vacuity)
 
         activities_decl_format = "activity " + "\nactivity ".join(self.get_log_alphabet_activities()) + "\n"
         if output_path is not None:
             with open(output_path, 'w') as f:
                 f.write(activities_decl_format)
                 f.write('\n'.join(self.discovery_results.keys()))
-        if not plain:
-            for key in self.discovery_results:
-                for trace in self.log:
-                    for event in trace:
-                        if event[self.config.XES_NAME] in key:
-                            if key not in self.associated_entities:
-                                self.associated_entities[key] = {self.config.DICTIONARY: set(), self.config.DATA_OBJECT: set()}
-                            self.associated_entities[key][self.config.DICTIONARY].update(event[self.config.DICTIONARY])
-                            self.associated_entities[key][self.config.DATA_OBJECT].update(event[self.config.DATA_OBJECT])
+        self.associated_entities = {} if plain else self.get_associated_entities(self.discovery_results.keys())
         return self.discovery_results, self.associated_entities
 
+    def get_associated_entities(self, constraint_strs) -> dict[str: dict[str: set]]:
+        """
+        Collects the dictionary entries and data objects of the events whose activity name occurs in each of the given
+        constraint strings. The entities are first collected per activity, in a single pass over the log.
+
+        Parameters
+        ----------
+        constraint_strs : iterable[str]
+            the constraint strings.
+
+        Returns
+        -------
+        associated_entities
+            dictionary with keys the constraint strings that contain the name of at least one event, and values the
+            collected dictionary entries and data objects.
+        """
+        constraint_strs = list(constraint_strs)
+        if isinstance(self.log, EncodedLog):
+            per_activity = self.get_encoded_entities_per_activity(constraint_strs)
+        else:
+            per_activity = self.get_entities_per_activity(constraint_strs)
+        associated_entities = {}
+        for key in constraint_strs:
+            for activity, entities in per_activity.items():
+                if activity in key:
+                    if key not in associated_entities:
+                        associated_entities[key] = {self.config.DICTIONARY: set(), self.config.DATA_OBJECT: set()}
+                    associated_entities[key][self.config.DICTIONARY].update(entities[self.config.DICTIONARY])
+                    associated_entities[key][self.config.DATA_OBJECT].update(entities[self.config.DATA_OBJECT])
+        return associated_entities
+
+    def get_entities_per_activity(self, constraint_strs):
+        # entities per activity, None for activities that do not occur in any of the constraint strings
+        per_activity = {}
+        for trace in self.log:
+            for event in trace:
+                activity = event[self.config.XES_NAME]
+                if activity not in per_activity:
+                    per_activity[activity] = {self.config.DICTIONARY: set(), self.config.DATA_OBJECT: set()} \
+                        if any(activity in key for key in constraint_strs) else None
+                if per_activity[activity] is not None:
+                    per_activity[activity][self.config.DICTIONARY].update(event[self.config.DICTIONARY])
+                    per_activity[activity][self.config.DATA_OBJECT].update(event[self.config.DATA_OBJECT])
+        return {activity: entities for activity, entities in per_activity.items() if entities is not None}
+
+    def get_encoded_entities_per_activity(self, constraint_strs):
+        # the entities of an activity are collected once per distinct attribute value of its events
+        per_activity = {}
+        for code in np.unique(self.log.codes):
+            activity = self.log.activities[code]
+            if any(activity in key for key in constraint_strs):
+                per_activity[activity] = {self.config.DICTIONARY: set(), self.config.DATA_OBJECT: set()}
+        for attribute in [self.config.DICTIONARY, self.config.DATA_OBJECT]:
+            value_ids, values = self.log.attributes[attribute]
+            pairs = np.unique(np.stack([self.log.codes, value_ids], axis=1), axis=0)
+            for code, value_id in pairs:
+                activity = self.log.activities[code]
+                if activity in per_activity and value_id >= 0:
+                    per_activity[activity][attribute].update(values[value_id])
+        return per_activity
+
     def filter_discovery(self, min_support: float = 0, output_path: str = None, plain=False) \
             -> dict[str: dict[tuple[int, str]: CheckerResult]]:
         """
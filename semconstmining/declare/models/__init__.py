@@ -2,3 +2,4 @@ from .log_result import *
 from .checker_result import *
 from .trace_result import *
 from .decl_model import *
+from .encoded_log import *
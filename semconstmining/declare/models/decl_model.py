@@ -3,8 +3,11 @@ class DeclModel(object):
         self.activities = []
         self.serialized_constraints = []
         self.constraints = []
-        
+        # activity indices of the constraints, per vacuity setting
+        self.constraint_indices = {}
+
     def set_constraints(self):
+        self.constraint_indices = {}
         if len(self.constraints) > 0:
             for constraint in self.constraints:
 
@@ -14,5 +17,15 @@ class DeclModel(object):
                 constraint_str += '[' + ", ".join(constraint["activities"]) + '] |' + ' |'.join(constraint["condition"])
                 self.serialized_constraints.append(constraint_str)
                 
+    def select(self, positions):
+        """
+        Returns the model of the constraints at the given positions, without parsing them again.
+        """
+        model = DeclModel()
+        model.activities = list(self.activities)
+        model.constraints = [self.constraints[i] for i in positions]
+        model.serialized_constraints = [self.serialized_constraints[i] for i in positions]
+        return model
+
     def get_decl_model_constraints(self):
         return self.serialized_constraints
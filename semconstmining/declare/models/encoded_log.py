@@ -0,0 +1,250 @@
+import hashlib
+
+import numpy as np
+from pm4py.objects.log.obj import Event, Trace
+
+
+class EncodedLog(object):
+    """
+    Flat, integer-encoded representation of an event log. The activities of all traces are stored one after the
+    other in a single array of activity ids, trace i spans the events offsets[i] to offsets[i + 1].
+
+    Attributes
+    ----------
+    trace_names : list[str]
+        the concept:name of every trace, in log order
+    activities : list[str]
+        the activity label of every activity id
+    activity_to_id : dict[str: int]
+        the activity id of every activity label
+    codes : ndarray
+        the activity id of every event
+    offsets : ndarray
+        start position of every trace in codes, followed by the total number of events
+    trace_index : ndarray
+        the position of the trace every event belongs to
+    events : list
+        the original events, aligned with codes (used to evaluate data conditions)
+    attributes : dict[str: tuple[ndarray, list]]
+        further event attributes as columns, i.e., the value id of every event (-1 if the event has no value) and the
+        values, used instead of the original events if there are none
+    activity_key : str
+        the attribute holding the activity label of an event
+    """
+
+    def __init__(self, trace_names, activities, codes, offsets, events=None, traces=None, attributes=None,
+                 activity_key="concept:name"):
+        self.trace_names = trace_names
+        self.activities = activities
+        self.activity_to_id = {activity: idx for idx, activity in enumerate(activities)}
+        self.codes = codes
+        self.offsets = offsets
+        self.trace_index = np.repeat(np.arange(len(trace_names)), np.diff(offsets))
+        self.events = events
+        self.attributes = {} if attributes is None else attributes
+        self.activity_key = activity_key
+        self._traces = traces
+        self._occurrences = None
+        self._bounds = None
+
+    def __len__(self):
+        return self.num_traces
+
+    @classmethod
+    def from_event_log(cls, log, activity_key="concept:name"):
+        activity_to_id = {}
+        codes = []
+        offsets = [0]
+        trace_names = []
+        events = []
+        for trace in log:
+            trace_names.append(trace.attributes["concept:name"])
+            for event in trace:
+                codes.append(activity_to_id.setdefault(event[activity_key], len(activity_to_id)))
+                events.append(event)
+            offsets.append(len(codes))
+        return cls(trace_names, list(activity_to_id.keys()), np.asarray(codes, dtype=np.int32),
+                   np.asarray(offsets, dtype=np.int64), events=events, traces=list(log))
+
+    @property
+    def traces(self):
+        """
+        The traces of the log as pm4py traces, they are only built on demand if the log was encoded from columns.
+        """
+        if self._traces is None:
+            self._traces = []
+            for trace_name, start, end in zip(self.trace_names, self.starts, self.ends):
+                trace = Trace()
+                trace.attributes["concept:name"] = trace_name
+                for pos in range(start, end):
+                    trace.append(Event(self.event(pos)))
+                self._traces.append(trace)
+        return self._traces
+
+    def event(self, pos):
+        """
+        Returns the event at the given position, it is built from the columns if the log has no original events.
+        """
+        if self.events is not None:
+            return self.events[pos]
+        event = {self.activity_key: self.activities[self.codes[pos]]}
+        for key, (value_ids, values) in self.attributes.items():
+            if value_ids[pos] >= 0:
+                event[key] = values[value_ids[pos]]
+        return event
+
+    def activity_lists(self):
+        """
+        Returns for each trace the list of its activity labels.
+        """
+        labels = np.asarray(self.activities, dtype=object)[self.codes]
+        return [list(labels[start:end]) for start, end in zip(self.starts, self.ends)]
+
+    def select(self, traces, trace_names=None):
+        """
+        Returns the log of the given traces (in the given order).
+
+        Parameters
+        ----------
+        traces : ndarray
+            the positions of the selected traces
+        trace_names : list, optional
+            the names of the selected traces, by default they keep their names
+        """
+        traces = np.asarray(traces, dtype=np.int64)
+        lengths = self.ends[traces] - self.starts[traces]
+        offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+        positions = np.repeat(self.starts[traces] - offsets[:-1], lengths) + np.arange(offsets[-1])
+        if trace_names is None:
+            trace_names = [self.trace_names[i] for i in traces]
+        return EncodedLog(trace_names, self.activities, self.codes[positions], offsets,
+                          events=[self.events[pos] for pos in positions] if self.events is not None else None,
+                          traces=[self._traces[i] for i in traces] if self._traces is not None else None,
+                          attributes={key: (value_ids[positions], values)
+                                      for key, (value_ids, values) in self.attributes.items()},
+                          activity_key=self.activity_key)
+
+    def variants(self, attribute_keys=()):
+        """
+        Groups the traces by their sequence of activities (and of values of the given attributes).
+
+        Parameters
+        ----------
+        attribute_keys : iterable[str], optional
+            the attributes whose values distinguish variants in addition to the activities.
+
+        Returns
+        -------
+        variant_log
+            log containing the first trace of every variant, named by the position of the variant
+        variant_of_trace
+            the position of the variant of every trace
+        frequencies
+            the number of traces of every variant
+        """
+        try:
+            columns = [self.codes] + [self._attribute_ids(key) for key in attribute_keys]
+        except TypeError:
+            # values that cannot be compared by hashing, every trace is a variant of its own
+            columns = [np.arange(self.num_events)]
+        variant_ids = {}
+        variant_of_trace = np.empty(self.num_traces, dtype=np.int64)
+        for i, (start, end) in enumerate(zip(self.starts, self.ends)):
+            key = tuple(column[start:end].tobytes() for column in columns)
+            variant_of_trace[i] = variant_ids.setdefault(key, len(variant_ids))
+        frequencies = np.bincount(variant_of_trace, minlength=len(variant_ids))
+        # variants are numbered in order of appearance, hence the first trace of each variant is in variant order
+        _, firsts = np.unique(variant_of_trace, return_index=True)
+        return self.select(firsts, trace_names=list(range(len(firsts)))), variant_of_trace, frequencies
+
+    def content_hashes(self, attribute_keys=()):
+        """
+        Hashes every trace by its activities (and the values of the given attributes). Unlike variant positions, the
+        hashes do not depend on the log, traces with the same content have the same hash in every log.
+
+        Parameters
+        ----------
+        attribute_keys : iterable[str], optional
+            the attributes whose values are part of the content of a trace in addition to the activities.
+
+        Returns
+        -------
+        hashes
+            the hex digest of every trace
+        """
+        attribute_keys = sorted(attribute_keys)
+        hashes = []
+        for start, end in zip(self.starts, self.ends):
+            content = [self.activities[code] for code in self.codes[start:end]]
+            if attribute_keys:
+                events = [self.event(pos) for pos in range(start, end)]
+                content.append([[(key in event, event.get(key)) for key in attribute_keys] for event in events])
+            hashes.append(hashlib.sha1(repr(content).encode("utf-8")).hexdigest())
+        return hashes
+
+    def _attribute_ids(self, key):
+        if key in self.attributes:
+            return self.attributes[key][0]
+        if self.events is None:
+            return np.full(self.num_events, -1, dtype=np.int64)
+        value_to_id = {}
+        return np.fromiter((value_to_id.setdefault(event[key], len(value_to_id)) if key in event else -1
+                            for event in self.events), dtype=np.int64, count=self.num_events)
+
+    @property
+    def num_traces(self):
+        return len(self.trace_names)
+
+    @property
+    def num_events(self):
+        return len(self.codes)
+
+    @property
+    def starts(self):
+        return self.offsets[:-1]
+
+    @property
+    def ends(self):
+        return self.offsets[1:]
+
+    def occurrences(self, activity):
+        """
+        Returns the sorted positions (in codes) of all events of the given activity.
+        """
+        if activity not in self.activity_to_id:
+            return np.empty(0, dtype=np.int64)
+        if self._occurrences is None:
+            self._occurrences = np.argsort(self.codes, kind="stable")
+            self._bounds = np.searchsorted(self.codes[self._occurrences], np.arange(len(self.activities) + 1))
+        idx = self.activity_to_id[activity]
+        return self._occurrences[self._bounds[idx]:self._bounds[idx + 1]]
+
+    def count_per_trace(self, positions):
+        return np.bincount(self.trace_index[positions], minlength=self.num_traces)
+
+    def any_per_trace(self, positions):
+        res = np.zeros(self.num_traces, dtype=bool)
+        res[self.trace_index[positions]] = True
+        return res
+
+    def first_per_trace(self, positions):
+        """
+        Returns the first of the given (sorted) positions in every trace, num_events if there is none.
+        """
+        res = np.full(self.num_traces, self.num_events, dtype=np.int64)
+        traces = self.trace_index[positions]
+        keep = np.ones(len(positions), dtype=bool)
+        keep[1:] = traces[1:] != traces[:-1]
+        res[traces[keep]] = positions[keep]
+        return res
+
+    def last_per_trace(self, positions):
+        """
+        Returns the last of the given (sorted) positions in every trace, -1 if there is none.
+        """
+        res = np.full(self.num_traces, -1, dtype=np.int64)
+        traces = self.trace_index[positions]
+        keep = np.ones(len(positions), dtype=bool)
+        keep[:-1] = traces[:-1] != traces[1:]
+        res[traces[keep]] = positions[keep]
+        return res
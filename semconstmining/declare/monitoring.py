@@ -0,0 +1,310 @@
+"""
+Streaming conformance checking. Instead of checking completed traces, the events of running cases are fed to a
+ModelMonitor one at a time. Every constraint is monitored by a small automaton whose state (a few counters per case
+and constraint) is updated with the events that concern it, so that the trace prefix never has to be scanned again
+(except for constraints with correlation or time conditions, see ModelMonitor).
+Violations are reported as soon as no continuation of the case can satisfy the constraint anymore, the violations of a
+case that is finished are the same as the ones of check_log_conformance (and Declare.conformance_checking).
+"""
+from .api_functions import check_constraint
+from .enums import Template, TraceState
+from .models import DeclModel
+from .parsers import compile_conditions
+from .vectorized_checking import COUNTING_TEMPLATES, RESPONSE_TEMPLATES, SUCCESSION_TEMPLATES, SUPPORTED_TEMPLATES
+
+# Positions of the state of a part: permanently violated, activated, and two template-specific counters
+_DEAD, _ACTIVATED, _X, _Y = range(4)
+
+# Templates whose outcome depends on the event following an activation
+_FOLLOWER_TEMPLATES = {Template.CHAIN_RESPONSE.templ_str, Template.NOT_CHAIN_RESPONSE.templ_str}
+# Templates that are violated at the end of a case with a pending activation
+_PENDING_TEMPLATES = {Template.RESPONSE.templ_str, Template.ALTERNATE_RESPONSE.templ_str,
+                      Template.CHAIN_RESPONSE.templ_str}
+
+
+class _Part:
+    """
+    A monitored template of a constraint, succession constraints consist of a response and a precedence part.
+    """
+    __slots__ = ("constraint", "template", "counting", "response", "a", "b", "n", "activation")
+
+    def __init__(self, constraint, template, activities, n, activation):
+        self.constraint = constraint
+        self.template = template
+        self.counting = template.templ_str in COUNTING_TEMPLATES
+        self.response = template.templ_str in RESPONSE_TEMPLATES
+        self.a = activities[0]
+        self.b = activities[1] if len(activities) > 1 else None
+        self.n = n
+        self.activation = activation
+
+    def activated(self, event, first=None):
+        return self.activation is None or self.activation.evaluate(event, first)
+
+
+class MonitoredCase:
+    """
+    Monitoring state of a running case.
+    """
+    __slots__ = ("states", "first", "previous", "events", "emitted")
+
+    def __init__(self, keep_events):
+        # states of the parts that were concerned by an event of the case
+        self.states = {}
+        self.first = None
+        self.previous = None
+        # the events of the case, only kept for constraints that are checked on the whole prefix
+        self.events = [] if keep_events else None
+        # constraints whose violation was already reported
+        self.emitted = set()
+
+
+class ModelMonitor:
+    """
+    Monitors the constraints of a model on running cases.
+
+    Constraints with correlation conditions (except the ones of counting templates) or time conditions are not
+    monitored incrementally: the events of the case are kept and these constraints are checked on the whole prefix
+    with every event (until they are violated), so their cost grows with the length of the case.
+
+    Parameters
+    ----------
+    model : DeclModel
+        the DECLARE model
+    consider_vacuity : bool
+        True means that vacuously satisfied traces are considered as satisfied, violated otherwise.
+    """
+
+    def __init__(self, model: DeclModel, consider_vacuity: bool):
+        self.model = model
+        self.consider_vacuity = consider_vacuity
+        self.parts = []
+        # constraints with correlation or time conditions, they are checked on the trace prefix
+        self.prefix_constraints = []
+        for idx, constraint in enumerate(model.constraints):
+            template = constraint['template']
+            if template.templ_str not in SUPPORTED_TEMPLATES:
+                continue
+            try:
+                conditions = compile_conditions(constraint)
+            except SyntaxError:
+                # badly formatted conditions are never checked
+                continue
+            activation = conditions["activation"]
+            if template is not Template.INIT and template is not Template.END and (
+                    conditions["time"] is not None or (template.templ_str not in COUNTING_TEMPLATES and
+                                                       conditions["correlation"] is not None)):
+                self.prefix_constraints.append(idx)
+            elif template.templ_str in SUCCESSION_TEMPLATES:
+                for part_template in SUCCESSION_TEMPLATES[template.templ_str]:
+                    self.parts.append(_Part(idx, part_template, constraint['activities'], None, activation))
+            else:
+                self.parts.append(_Part(idx, template, constraint['activities'], constraint.get('n'), activation))
+
+        self.parts_per_activity = {}
+        self.followers_per_activity = {}
+        self.end_parts_per_activity = {}
+        self.init_parts = []
+        self.parts_per_constraint = {}
+        for i, part in enumerate(self.parts):
+            self.parts_per_constraint.setdefault(part.constraint, []).append(i)
+            if part.template is Template.INIT:
+                self.init_parts.append(i)
+            elif part.template is Template.END:
+                self.end_parts_per_activity.setdefault(part.a, []).append(i)
+            else:
+                for activity in {part.a, part.b} - {None}:
+                    self.parts_per_activity.setdefault(activity, []).append(i)
+                if part.template.templ_str in _FOLLOWER_TEMPLATES:
+                    self.followers_per_activity.setdefault(part.a, []).append(i)
+        # outcome of the constraints in cases without events that concern them
+        self.default_violations = {c for c, parts in self.parts_per_constraint.items()
+                                   if any(self._violated(self.parts[i], [0, 0, 0, 0]) for i in parts)}
+
+    def start_case(self):
+        return MonitoredCase(len(self.prefix_constraints) > 0)
+
+    def step(self, case: MonitoredCase, event):
+        """
+        Updates the state of the case with its next event.
+
+        Returns
+        -------
+        violations
+            list of the constraint strings that the case violates permanently since this event
+        """
+        newly_dead = []
+        name = event["concept:name"]
+        previous = case.previous
+        if case.first is None:
+            case.first = event
+            for i in self.init_parts:
+                part = self.parts[i]
+                state = case.states[i] = [0, 0, 0, 0]
+                if name == part.a and part.activated(event):
+                    state[_X] = 1
+                else:
+                    state[_DEAD] = 1
+                    newly_dead.append(part.constraint)
+        # the activations of the previous event that had to be followed by this event
+        if previous is not None:
+            for i in self.followers_per_activity.get(previous["concept:name"], ()):
+                state = case.states.get(i)
+                if state is None or not state[_X]:
+                    continue
+                state[_X] = 0
+                part = self.parts[i]
+                if not state[_DEAD] and (name != part.b) == (part.template is Template.CHAIN_RESPONSE):
+                    state[_DEAD] = 1
+                    newly_dead.append(part.constraint)
+        for i in self.parts_per_activity.get(name, ()):
+            state = case.states.get(i)
+            if state is None:
+                state = case.states[i] = [0, 0, 0, 0]
+            if not state[_DEAD] and self._update(self.parts[i], state, event, name, previous, case.first):
+                state[_DEAD] = 1
+                newly_dead.append(self.parts[i].constraint)
+        case.previous = event
+
+        violations = []
+        for idx in newly_dead:
+            if idx not in case.emitted:
+                case.emitted.add(idx)
+                violations.append(self.model.serialized_constraints[idx])
+        if case.events is not None:
+            case.events.append(event)
+            for idx in self.prefix_constraints:
+                if idx in case.emitted:
+                    continue
+                res = check_constraint(case.events, self.model.constraints[idx], self.consider_vacuity, done=False)
+                if res is not None and res.state == TraceState.VIOLATED:
+                    case.emitted.add(idx)
+                    violations.append(self.model.serialized_constraints[idx])
+        return violations
+
+    def finish(self, case: MonitoredCase):
+        """
+        Completes the case.
+
+        Returns
+        -------
+        violations
+            set of all constraint strings that the completed case violates, including the ones reported before
+        """
+        states = case.states
+        if case.previous is not None:
+            for i in self.end_parts_per_activity.get(case.previous["concept:name"], ()):
+                if self.parts[i].activated(case.first):
+                    states[i] = [0, 0, 1, 0]
+        touched = {self.parts[i].constraint for i in states}
+        violated = self.default_violations - touched
+        for idx in touched:
+            if any(self._violated(self.parts[i], states.get(i, [0, 0, 0, 0]))
+                   for i in self.parts_per_constraint[idx]):
+                violated.add(idx)
+        res = {self.model.serialized_constraints[idx] for idx in violated}
+        for idx in self.prefix_constraints:
+            checked = check_constraint(case.events, self.model.constraints[idx], self.consider_vacuity)
+            if checked is not None and checked.state == TraceState.VIOLATED:
+                res.add(self.model.serialized_constraints[idx])
+        return res
+
+    @staticmethod
+    def _update(part, state, event, name, previous, first):
+        """
+        Updates the state of a part with an event of one of its activities, returns whether the part is violated
+        permanently.
+        """
+        template = part.template
+        if part.counting:
+            if template is Template.CHOICE:
+                if part.activated(event, first):
+                    state[_X] = 1
+                return False
+            if template is Template.EXCLUSIVE_CHOICE:
+                if part.activated(event, first):
+                    if name == part.a:
+                        state[_X] = 1
+                    if name == part.b:
+                        state[_Y] = 1
+                return state[_X] and state[_Y]
+            if name == part.a and part.activated(event, first):
+                state[_X] += 1
+            return (template is Template.ABSENCE and state[_X] >= part.n) or \
+                (template is Template.EXACTLY and state[_X] > part.n)
+
+        if part.response:
+            act = name == part.a and part.activated(event)
+            if act:
+                state[_ACTIVATED] = 1
+            if template is Template.RESPONDED_EXISTENCE:
+                if name == part.b:
+                    state[_X] = 1
+            elif template is Template.RESPONSE:
+                if act:
+                    state[_X] = 1
+                if name == part.b:
+                    state[_X] = 0
+            elif template is Template.ALTERNATE_RESPONSE:
+                if act:
+                    if state[_X]:
+                        return True
+                    state[_X] = 1
+                if name == part.b:
+                    state[_X] = 0
+            elif template is Template.CHAIN_RESPONSE or template is Template.NOT_CHAIN_RESPONSE:
+                if act:
+                    state[_X] = 1
+            elif template is Template.NOT_RESPONDED_EXISTENCE:
+                if name == part.b:
+                    state[_X] = 1
+                return state[_ACTIVATED] and state[_X]
+            else:  # Template.NOT_RESPONSE
+                return name == part.b and state[_ACTIVATED]
+            return False
+
+        # precedence templates are activated by the second activity
+        if name == part.a:
+            state[_X] = 1
+        if name != part.b or not part.activated(event):
+            return False
+        state[_ACTIVATED] = 1
+        if template is Template.PRECEDENCE:
+            return not state[_X]
+        if template is Template.ALTERNATE_PRECEDENCE:
+            violated = not state[_X]
+            state[_X] = 0
+            return violated
+        if template is Template.CHAIN_PRECEDENCE:
+            return previous is None or previous["concept:name"] != part.a
+        if template is Template.NOT_PRECEDENCE:
+            return state[_X]
+        # Template.NOT_CHAIN_PRECEDENCE
+        return previous is not None and previous["concept:name"] == part.a
+
+    def _violated(self, part, state):
+        """
+        Whether the part is violated by a completed case with the given state.
+        """
+        if state[_DEAD]:
+            return True
+        template = part.template
+        if part.counting:
+            if template is Template.EXISTENCE:
+                return state[_X] < part.n
+            if template is Template.ABSENCE:
+                return state[_X] >= part.n
+            if template is Template.EXACTLY:
+                return state[_X] != part.n
+            if template is Template.CHOICE:
+                return not state[_X]
+            return state[_X] == state[_Y]
+        if template is Template.INIT or template is Template.END:
+            return not state[_X]
+        if not self.consider_vacuity and not state[_ACTIVATED]:
+            return True
+        if template is Template.RESPONDED_EXISTENCE:
+            return state[_ACTIVATED] and not state[_X]
+        if template.templ_str in _PENDING_TEMPLATES:
+            return bool(state[_X])
+        return False
@@ -1,7 +1,15 @@
 from ..enums import Template
 from ..models import DeclModel
+from datetime import timedelta
+import operator
 import re
 
+# Defining global and local functions/variables to use within eval() to prevent code injection
+glob = {'__builtins__': None}
+
+# Conditions of the form "attr" in A and A["attr"] != "value", e.g., resulting from A.org:role is not value
+_ATTRIBUTE_COMPARISON = re.compile(r'^"([^"]+)" in ([AT]) and \2\["\1"\] (==|!=) "([^"]*)"$')
+
 
 def parse_data_cond(cond):
     try:
@@ -125,6 +133,60 @@ def parse_time_cond(condition):
         raise SyntaxError
 
 
+class CompiledCondition:
+    """
+    A condition translated to python and compiled once. Comparisons of a single attribute with a constant are
+    evaluated directly, everything else through the compiled code object.
+    """
+
+    def __init__(self, py_cond):
+        self.py_cond = py_cond
+        self._compile()
+
+    def _compile(self):
+        match = _ATTRIBUTE_COMPARISON.match(self.py_cond)
+        if match is not None:
+            attr, event, op, value = match.groups()
+            compare = operator.eq if op == "==" else operator.ne
+            if event == "A":
+                self.evaluate = lambda A, T=None: attr in A and compare(A[attr], value)
+            else:
+                self.evaluate = lambda A, T=None: attr in T and compare(T[attr], value)
+        else:
+            code = compile(self.py_cond, "<condition>", "eval")
+            self.evaluate = lambda A, T=None: eval(code, glob, {'A': A, 'T': T, 'timedelta': timedelta, 'abs': abs,
+                                                               'float': float})
+
+    def __getstate__(self):
+        return {"py_cond": self.py_cond}
+
+    def __setstate__(self, state):
+        self.py_cond = state["py_cond"]
+        self._compile()
+
+
+def compile_cond(py_cond):
+    """
+    Compiles the python translation of a condition, trivial conditions are compiled to None.
+    """
+    if py_cond.strip() == "True":
+        return None
+    return CompiledCondition(py_cond)
+
+
+def compile_conditions(constraint):
+    """
+    Compiles the activation, correlation and time conditions of a parsed constraint and caches them on it.
+    """
+    if "compiled_conditions" not in constraint:
+        conditions = {"activation": compile_cond(parse_data_cond(constraint['condition'][0]))}
+        if constraint['template'].is_binary:
+            conditions["correlation"] = compile_cond(parse_data_cond(constraint['condition'][1]))
+        conditions["time"] = compile_cond(parse_time_cond(constraint['condition'][-1]))
+        constraint["compiled_conditions"] = conditions
+    return constraint["compiled_conditions"]
+
+
 def parse_decl_from_file(path):
     fo = open(path, "r+")
     lines = fo.readlines()
@@ -0,0 +1,344 @@
+"""
+Vectorized conformance checking. Instead of running the checker of every constraint on every trace, each template is
+evaluated for all traces of an EncodedLog at once using the activity positions of the log. The violation sets are
+the same as the ones of Declare.conformance_checking (i.e., check_trace_conformance with done=True). Discovery
+evaluates all candidate constraints of a log the same way, instead of scanning the log once per candidate.
+"""
+import re
+
+import numpy as np
+
+from .api_functions import check_trace_conformance
+from .enums import Template, TraceState
+from .models import CheckerResult, DeclModel, EncodedLog
+from .parsers import compile_conditions
+
+_MISSING = object()
+
+# Template members compare equal as strings, hence templates are grouped by their templ_str
+# Templates that are activated by the first activity of the constraint
+RESPONSE_TEMPLATES = {t.templ_str for t in (Template.RESPONDED_EXISTENCE, Template.RESPONSE,
+                                            Template.ALTERNATE_RESPONSE, Template.CHAIN_RESPONSE,
+                                            Template.NOT_RESPONDED_EXISTENCE, Template.NOT_RESPONSE,
+                                            Template.NOT_CHAIN_RESPONSE)}
+# Templates that are activated by the second activity of the constraint
+PRECEDENCE_TEMPLATES = {t.templ_str for t in (Template.PRECEDENCE, Template.ALTERNATE_PRECEDENCE,
+                                              Template.CHAIN_PRECEDENCE, Template.NOT_PRECEDENCE,
+                                              Template.NOT_CHAIN_PRECEDENCE)}
+SUCCESSION_TEMPLATES = {Template.SUCCESSION.templ_str: (Template.RESPONSE, Template.PRECEDENCE),
+                        Template.ALTERNATE_SUCCESSION.templ_str: (Template.ALTERNATE_RESPONSE,
+                                                                  Template.ALTERNATE_PRECEDENCE),
+                        Template.CHAIN_SUCCESSION.templ_str: (Template.CHAIN_RESPONSE, Template.CHAIN_PRECEDENCE)}
+COUNTING_TEMPLATES = {t.templ_str for t in (Template.EXISTENCE, Template.ABSENCE, Template.EXACTLY, Template.CHOICE,
+                                            Template.EXCLUSIVE_CHOICE)}
+# Templates without a checker in check_trace_conformance are never reported as violated
+SUPPORTED_TEMPLATES = RESPONSE_TEMPLATES | PRECEDENCE_TEMPLATES | set(SUCCESSION_TEMPLATES.keys()) | \
+                      COUNTING_TEMPLATES | {Template.INIT.templ_str, Template.END.templ_str}
+
+
+def _condition_holds(log: EncodedLog, condition, positions):
+    """
+    Evaluates a compiled activation condition for the events at the given positions. Results are reused for events
+    that agree on all attributes the condition refers to.
+    """
+    if condition is None or len(positions) == 0:
+        return np.ones(len(positions), dtype=bool)
+    rule = condition.py_cond
+    attributes = sorted(set(re.findall(r'A\["(.*?)"\]', rule) + re.findall(r'"(.*?)" in A', rule)))
+    # the cache is only safe if the event is accessed through its attributes
+    cacheable = re.search(r'\bA\b', re.sub(r'A\[".*?"\]|".*?" in A', "", rule)) is None
+    res = np.zeros(len(positions), dtype=bool)
+    cache = {}
+    for i, pos in enumerate(positions):
+        event = log.event(pos)
+        if not cacheable:
+            res[i] = bool(condition.evaluate(event))
+            continue
+        key = tuple(event[att] if att in event else _MISSING for att in attributes)
+        try:
+            if key not in cache:
+                cache[key] = bool(condition.evaluate(event))
+            res[i] = cache[key]
+        except TypeError:
+            res[i] = bool(condition.evaluate(event))
+    return res
+
+
+def _referenced_attributes(condition):
+    """
+    Returns the attributes a compiled condition refers to, or None if it does not access the events through them only.
+    """
+    rule = condition.py_cond
+    if re.search(r'\b[AT]\b', re.sub(r'[AT]\[".*?"\]|".*?" in [AT]', "", rule)) is not None:
+        return None
+    return set(re.findall(r'[AT]\["(.*?)"\]', rule) + re.findall(r'"(.*?)" in [AT]', rule))
+
+
+def condition_attributes(model: DeclModel):
+    """
+    Returns the attributes that the conditions of the model refer to, or None if a condition accesses the events in
+    another way. Traces that agree on their activities and on these attributes have the same checking results.
+    """
+    attributes = set()
+    for constraint in model.constraints:
+        try:
+            conditions = compile_conditions(constraint)
+        except SyntaxError:
+            # badly formatted conditions are never checked
+            continue
+        for condition in conditions.values():
+            if condition is None:
+                continue
+            referenced = _referenced_attributes(condition)
+            if referenced is None:
+                return None
+            attributes |= referenced
+    return attributes
+
+
+def _next_is(log: EncodedLog, positions, activity):
+    """
+    Whether the event following each of the given positions in the same trace is of the given activity.
+    """
+    nxt = positions + 1
+    valid = nxt < log.ends[log.trace_index[positions]]
+    res = np.zeros(len(positions), dtype=bool)
+    if activity in log.activity_to_id:
+        res[valid] = log.codes[nxt[valid]] == log.activity_to_id[activity]
+    return res
+
+
+def _previous_is(log: EncodedLog, positions, activity):
+    """
+    Whether the event preceding each of the given positions in the same trace is of the given activity.
+    """
+    prev = positions - 1
+    valid = positions > log.starts[log.trace_index[positions]]
+    res = np.zeros(len(positions), dtype=bool)
+    if activity in log.activity_to_id:
+        res[valid] = log.codes[prev[valid]] == log.activity_to_id[activity]
+    return res
+
+
+def _count_between(positions, lower, upper):
+    """
+    Counts the (sorted) positions in [lower, upper) for every pair of bounds.
+    """
+    return np.searchsorted(positions, upper, side="left") - np.searchsorted(positions, lower, side="left")
+
+
+def _binary_violations(log: EncodedLog, template, a, b, activation, consider_vacuity):
+    a_pos = log.occurrences(a)
+    b_pos = log.occurrences(b)
+    if template.templ_str in RESPONSE_TEMPLATES:
+        activations = a_pos[_condition_holds(log, activation, a_pos)]
+    else:
+        activations = b_pos[_condition_holds(log, activation, b_pos)]
+    act_traces = log.trace_index[activations]
+
+    if template is Template.RESPONDED_EXISTENCE:
+        violated = log.any_per_trace(activations) & ~log.any_per_trace(b_pos)
+    elif template is Template.RESPONSE:
+        violated = log.last_per_trace(activations) > log.last_per_trace(b_pos)
+    elif template is Template.ALTERNATE_RESPONSE:
+        # every activation needs a b before the next activation (or the end of the trace)
+        upper = log.ends[act_traces]
+        if len(activations) > 1:
+            same_trace = act_traces[1:] == act_traces[:-1]
+            upper[:-1] = np.where(same_trace, activations[1:], upper[:-1])
+        violated = log.any_per_trace(activations[_count_between(b_pos, activations, upper) == 0])
+    elif template is Template.CHAIN_RESPONSE:
+        violated = log.any_per_trace(activations[~_next_is(log, activations, b)])
+    elif template is Template.PRECEDENCE:
+        violated = log.first_per_trace(activations) < log.first_per_trace(a_pos)
+    elif template is Template.ALTERNATE_PRECEDENCE:
+        # every activation needs an a since the previous activation (or the start of the trace)
+        lower = log.starts[act_traces].copy()
+        if len(activations) > 1:
+            same_trace = act_traces[1:] == act_traces[:-1]
+            lower[1:] = np.where(same_trace, activations[:-1] + 1, lower[1:])
+        violated = log.any_per_trace(activations[_count_between(a_pos, lower, activations + 1) == 0])
+    elif template is Template.CHAIN_PRECEDENCE:
+        violated = log.any_per_trace(activations[~_previous_is(log, activations, a)])
+    elif template is Template.NOT_RESPONDED_EXISTENCE:
+        violated = log.any_per_trace(activations) & log.any_per_trace(b_pos)
+    elif template is Template.NOT_RESPONSE:
+        violated = log.first_per_trace(activations) <= log.last_per_trace(b_pos)
+    elif template is Template.NOT_CHAIN_RESPONSE:
+        violated = log.any_per_trace(activations[_next_is(log, activations, b)])
+    elif template is Template.NOT_PRECEDENCE:
+        violated = log.first_per_trace(a_pos) <= log.last_per_trace(activations)
+    else:  # Template.NOT_CHAIN_PRECEDENCE
+        violated = log.any_per_trace(activations[_previous_is(log, activations, a)])
+
+    if not consider_vacuity:
+        violated |= ~log.any_per_trace(activations)
+    return violated
+
+
+def _unary_violations(log: EncodedLog, template, activities, n, activation):
+    a = activities[0]
+    if template is Template.INIT or template is Template.END:
+        non_empty = log.ends > log.starts
+        firsts = log.starts[non_empty]
+        lasts = log.ends[non_empty] - 1
+        candidates = firsts if template is Template.INIT else lasts
+        satisfied = np.zeros(log.num_traces, dtype=bool)
+        if a in log.activity_to_id:
+            matches = log.codes[candidates] == log.activity_to_id[a]
+            # the activation condition of End is checked on the first event of the trace, as in mp_end
+            satisfied[np.flatnonzero(non_empty)[matches]] = _condition_holds(log, activation, firsts[matches])
+        return ~satisfied
+
+    a_pos = log.occurrences(a)
+    a_act = a_pos[_condition_holds(log, activation, a_pos)]
+    if template is Template.EXISTENCE:
+        return log.count_per_trace(a_act) < n
+    if template is Template.ABSENCE:
+        return log.count_per_trace(a_act) >= n
+    if template is Template.EXACTLY:
+        return log.count_per_trace(a_act) != n
+    b_pos = log.occurrences(activities[1])
+    b_act = b_pos[_condition_holds(log, activation, b_pos)]
+    if template is Template.CHOICE:
+        return ~(log.any_per_trace(a_act) | log.any_per_trace(b_act))
+    # Template.EXCLUSIVE_CHOICE
+    return log.any_per_trace(a_act) == log.any_per_trace(b_act)
+
+
+def _reference_violations(log: EncodedLog, constraint, constraint_str, consider_vacuity):
+    model = DeclModel()
+    model.constraints.append(constraint)
+    model.serialized_constraints.append(constraint_str)
+    violated = np.zeros(log.num_traces, dtype=bool)
+    for i, trace in enumerate(log.traces):
+        trc_res = check_trace_conformance(trace, model, consider_vacuity)
+        violated[i] = constraint_str in trc_res and trc_res[constraint_str].state == TraceState.VIOLATED
+    return violated
+
+
+def check_constraint_violations(log: EncodedLog, constraint, constraint_str, consider_vacuity):
+    """
+    Returns a boolean array telling for every trace of the log whether it violates the constraint, or None if the
+    constraint is never checked. Constraints with correlation or time conditions, or with conditions that are not
+    properly formatted, are checked trace by trace.
+    """
+    template = constraint['template']
+    if template.templ_str not in SUPPORTED_TEMPLATES:
+        return None
+    try:
+        conditions = compile_conditions(constraint)
+    except SyntaxError:
+        return _reference_violations(log, constraint, constraint_str, consider_vacuity)
+    activation = conditions["activation"]
+    if template is Template.INIT or template is Template.END:
+        return _unary_violations(log, template, constraint['activities'], None, activation)
+    if conditions["time"] is not None or (template.templ_str not in COUNTING_TEMPLATES and
+                                          conditions["correlation"] is not None):
+        return _reference_violations(log, constraint, constraint_str, consider_vacuity)
+    if template.templ_str in COUNTING_TEMPLATES:
+        return _unary_violations(log, template, constraint['activities'], constraint.get('n'), activation)
+    a, b = constraint['activities'][0], constraint['activities'][1]
+    if template.templ_str in SUCCESSION_TEMPLATES:
+        response, precedence = SUCCESSION_TEMPLATES[template.templ_str]
+        return _binary_violations(log, response, a, b, activation, consider_vacuity) | \
+            _binary_violations(log, precedence, a, b, activation, consider_vacuity)
+    return _binary_violations(log, template, a, b, activation, consider_vacuity)
+
+
+def check_log_conformance(log: EncodedLog, model: DeclModel, consider_vacuity):
+    """
+    Checks all constraints of the model against all traces of the log.
+
+    Parameters
+    ----------
+    log : EncodedLog
+        the encoded event log
+    model : DeclModel
+        the DECLARE model
+    consider_vacuity : bool
+        True means that vacuously satisfied traces are considered as satisfied, violated otherwise.
+
+    Returns
+    -------
+    conformance_checking_results
+        dictionary where the key is the trace name and the value the set of violated constraint strings
+    """
+    checked = []
+    violations = []
+    for idx, constraint in enumerate(model.constraints):
+        constraint_str = model.serialized_constraints[idx]
+        violated = check_constraint_violations(log, constraint, constraint_str, consider_vacuity)
+        if violated is not None:
+            checked.append(constraint_str)
+            violations.append(violated)
+
+    per_trace = [set() for _ in range(log.num_traces)]
+    if violations:
+        trace_ids, constraint_ids = np.nonzero(np.stack(violations, axis=1))
+        for trace_id, constraint_id in zip(trace_ids, constraint_ids):
+            per_trace[trace_id].add(checked[constraint_id])
+    return dict(zip(log.trace_names, per_trace))
+
+
+def _activation_counts(log: EncodedLog, constraint, activation):
+    """
+    The number of activations of a binary constraint in every trace.
+    """
+    template = constraint['template']
+    activity = constraint['activities'][1] if template.templ_str in PRECEDENCE_TEMPLATES \
+        else constraint['activities'][0]
+    positions = log.occurrences(activity)
+    return log.count_per_trace(positions[_condition_holds(log, activation, positions)])
+
+
+def discover_constraints(log: EncodedLog, constraints, consider_vacuity):
+    """
+    Evaluates all candidate constraints against all traces of the log. The activity positions of the log are
+    computed once and shared by all candidates. The results are the same as the ones of calling
+    discover_constraint for every candidate.
+
+    Parameters
+    ----------
+    log : EncodedLog
+        the encoded event log
+    constraints : list[dict]
+        the candidate constraints
+    consider_vacuity : bool
+        True means that vacuously satisfied traces are considered as satisfied, violated otherwise.
+
+    Returns
+    -------
+    discovery_results
+        dictionary containing, for every constraint satisfied by at least one (non-empty) trace, a dictionary with
+        keys the tuples containing id and name of the satisfying traces and values their CheckerResult.
+    """
+    model = DeclModel()
+    model.constraints = constraints
+    model.set_constraints()
+    non_empty = log.ends > log.starts
+    discovery_results = {}
+    for constraint, constraint_str in zip(model.constraints, model.serialized_constraints):
+        template = constraint['template']
+        try:
+            conditions = compile_conditions(constraint)
+        except SyntaxError:
+            # the checkers do not return any result for badly formatted conditions
+            continue
+        violated = check_constraint_violations(log, constraint, constraint_str, consider_vacuity)
+        if violated is None:
+            continue
+        satisfied = np.flatnonzero(~violated & non_empty)
+        if len(satisfied) == 0:
+            continue
+        if template.templ_str in COUNTING_TEMPLATES or template is Template.INIT or template is Template.END:
+            results = [CheckerResult(num_fulfillments=None, num_violations=None, num_pendings=None,
+                                     num_activations=None, state=TraceState.SATISFIED) for _ in satisfied]
+        else:
+            # satisfied traces have no violations (nor pendings), every activation is fulfilled
+            num_pendings = 0 if template.templ_str in RESPONSE_TEMPLATES else None
+            activations = _activation_counts(log, constraint, conditions["activation"])[satisfied].tolist()
+            results = [CheckerResult(num_fulfillments=n, num_violations=0, num_pendings=num_pendings,
+                                     num_activations=n, state=TraceState.SATISFIED) for n in activations]
+        discovery_results[constraint_str] = {(int(i), log.trace_names[i]): res for i, res in zip(satisfied, results)}
+    return discovery_results
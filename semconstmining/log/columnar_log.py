@@ -0,0 +1,265 @@
+import logging
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from semconstmining.declare.models import EncodedLog
+
+_logger = logging.getLogger(__name__)
+
+
+def _encode(values):
+    """
+    Encodes the values as integer codes, in order of first appearance.
+    """
+    vocabulary = {}
+    codes = np.fromiter((vocabulary.setdefault(value, len(vocabulary)) for value in values), dtype=np.int32,
+                        count=len(values))
+    return codes, list(vocabulary.keys())
+
+
+class ColumnarLog:
+    """
+    Compact log of parsed labels. The events of all cases are stored one after the other as integer codes in NumPy
+    arrays, case i spans the events offsets[i] to offsets[i + 1]. Every event refers to a parsed label (and a role),
+    its label, object and action are looked up from the codes of its parsed label. The projections of the log that are
+    checked or mined are computed by masking and gathering these arrays, they are returned as EncodedLog that Declare
+    can check and discover constraints on directly.
+    """
+
+    def __init__(self, config, case_ids, offsets, parsed_codes, parsed_labels, role_codes=None, roles=None):
+        self.config = config
+        self.case_ids = case_ids
+        self.offsets = offsets
+        self.parsed_codes = parsed_codes
+        self.parsed_labels = parsed_labels
+        self.role_codes = role_codes
+        self.roles = roles
+        self.case_index = np.repeat(np.arange(len(case_ids)), np.diff(offsets))
+        # codes of the clean labels, objects and actions of every parsed label
+        self.label_codes, self.labels = _encode([parsed.label for parsed in parsed_labels])
+        self.object_codes, self.objects = _encode([parsed.main_object for parsed in parsed_labels])
+        self.action_codes, self.actions = _encode([parsed.main_action for parsed in parsed_labels])
+        missing = set(config.TERMS_FOR_MISSING)
+        self.label_missing = np.array([label in missing for label in self.labels], dtype=bool)
+        self.object_missing = np.array([type(obj) != str or obj in missing for obj in self.objects], dtype=bool)
+        self.object_invalid = np.array([type(obj) != str for obj in self.objects], dtype=bool)
+        self.action_empty = np.array([action == "" for action in self.actions], dtype=bool)
+
+    @classmethod
+    def from_parsed_traces(cls, config, traces, case_ids=None, with_roles=False):
+        """
+        Encodes the given traces.
+
+        :param config: the config
+        :param traces: the traces as lists of parsed labels, or of pairs of parsed label and role if with_roles is set
+        :param case_ids: the ids of the traces, defaults to their (string) positions
+        :param with_roles: whether the events come with roles
+        :return: the columnar log
+        """
+        parsed_to_code = {}
+        parsed_labels = []
+        parsed_codes = []
+        roles = []
+        offsets = [0]
+        for trace in traces:
+            for event in trace:
+                parsed, role = event if with_roles else (event, None)
+                if id(parsed) not in parsed_to_code:
+                    parsed_to_code[id(parsed)] = len(parsed_labels)
+                    parsed_labels.append(parsed)
+                parsed_codes.append(parsed_to_code[id(parsed)])
+                roles.append(role)
+            offsets.append(len(parsed_codes))
+        if case_ids is None:
+            case_ids = [str(i) for i in range(len(offsets) - 1)]
+        role_codes, role_values = _encode(roles) if with_roles else (None, None)
+        return cls(config, list(case_ids), np.asarray(offsets, dtype=np.int64),
+                   np.asarray(parsed_codes, dtype=np.int32), parsed_labels, role_codes=role_codes, roles=role_values)
+
+    @classmethod
+    def from_dataframe(cls, config, log, parsed_label_of, with_loops=True, with_roles=False):
+        """
+        Encodes an event log data frame without iterating over its rows. The events are ordered by case and
+        timestamp (events without a timestamp keep their order after the others), every distinct activity label is
+        parsed once.
+
+        :param config: the config
+        :param log: the event log as data frame
+        :param parsed_label_of: function returning the parsed label of an activity label
+        :param with_loops: whether cases that contain an activity more than once are kept
+        :param with_roles: whether the roles of the events are encoded as well
+        :return: the columnar log
+        """
+        case_codes, case_ids = pd.factorize(log[config.XES_CASE], sort=True)
+        has_case = case_codes >= 0
+        sort_keys = (case_codes,)
+        if config.XES_TIME in log.columns:
+            # timestamps read from CSV are strings, events without a (valid) timestamp come last in their case
+            times = pd.to_datetime(log[config.XES_TIME], utc=True, errors="coerce")
+            sort_keys = (times.dt.tz_localize(None).to_numpy().view(np.int64), times.isna().to_numpy()) + sort_keys
+        order = np.lexsort(sort_keys)
+        order = order[has_case[order]]
+        case_codes = case_codes[order]
+        label_codes, labels = pd.factorize(log[config.XES_NAME].to_numpy()[order], use_na_sentinel=False)
+        parsed_labels = [parsed_label_of(label) for label in labels]
+        lengths = np.bincount(case_codes, minlength=len(case_ids))
+        role_codes, roles = None, None
+        if with_roles:
+            role_codes, roles = pd.factorize(log[config.XES_ROLE].to_numpy()[order], use_na_sentinel=True)
+            roles = list(roles) + [None]
+            role_codes = np.where(role_codes < 0, len(roles) - 1, role_codes).astype(np.int32)
+        log = cls(config, list(case_ids), np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64),
+                  label_codes.astype(np.int32), parsed_labels, role_codes=role_codes, roles=roles)
+        if with_loops:
+            return log
+        # a case has a loop if it has fewer distinct activities than events
+        distinct = pd.DataFrame({"case": case_codes, "label": label_codes}).groupby("case")["label"].nunique()
+        has_loop = np.zeros(len(case_ids), dtype=bool)
+        has_loop[distinct.index.to_numpy()] = distinct.to_numpy() < lengths[distinct.index.to_numpy()]
+        return log.select(~has_loop)
+
+    def __len__(self):
+        return len(self.case_ids)
+
+    @property
+    def num_events(self):
+        return len(self.parsed_codes)
+
+    @property
+    def business_objects(self):
+        """
+        The (non-missing) main objects of the events.
+        """
+        present = np.zeros(len(self.objects), dtype=bool)
+        present[self.object_codes[self.parsed_codes]] = True
+        return {self.objects[code] for code in np.flatnonzero(present & ~self.object_missing)}
+
+    def select(self, case_mask, case_ids=None):
+        """
+        Returns the log of the selected cases.
+
+        :param case_mask: boolean array telling for every case whether it is selected
+        :param case_ids: new ids of the selected cases, by default they keep their ids
+        """
+        keep = case_mask[self.case_index]
+        lengths = np.diff(self.offsets)[case_mask]
+        if case_ids is None:
+            case_ids = [case_id for case_id, selected in zip(self.case_ids, case_mask) if selected]
+        return ColumnarLog(self.config, list(case_ids), np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64),
+                           self.parsed_codes[keep], self.parsed_labels,
+                           role_codes=self.role_codes[keep] if self.role_codes is not None else None, roles=self.roles)
+
+    def clean_log_projection(self, with_roles=False):
+        """
+        Same log, just with clean labels (and the roles of the events), cases without events are dropped.
+        """
+        keep = ~self.label_missing[self.label_codes[self.parsed_codes]]
+        attributes = {}
+        if with_roles:
+            roles = [role.replace(" and ", " & ") if type(role) == str else "unknown" for role in self.roles]
+            attributes[self.config.XES_ROLE] = (self.role_codes, roles)
+        return self._projection(keep, self.label_codes, self.labels, drop_empty=True, attributes=attributes)
+
+    def object_action_log_projection(self, obj):
+        """
+        Projection on the actions applied to the given object, cases without such actions are dropped.
+        """
+        keep = ~self.action_empty[self.action_codes[self.parsed_codes]]
+        if obj in self.objects:
+            keep &= self.object_codes[self.parsed_codes] == self.objects.index(obj)
+        else:
+            keep[:] = False
+        return self._projection(keep, self.action_codes, self.actions, drop_empty=True)
+
+    def object_log_projection(self):
+        """
+        Projection on the objects the cases deal with, consecutive events of the same object are merged.
+        """
+        objects = self.object_codes[self.parsed_codes]
+        valid = ~self.object_invalid[objects]
+        if not valid.all():
+            _logger.warning("%d events have a main object that is not a string" % np.count_nonzero(~valid))
+        # compare the object of every event to the one of the preceding event (with a valid object) of its case
+        positions = np.flatnonzero(valid)
+        cases = self.case_index[positions]
+        repeated = np.zeros(len(positions), dtype=bool)
+        repeated[1:] = (cases[1:] == cases[:-1]) & (objects[positions[1:]] == objects[positions[:-1]])
+        keep = np.zeros(self.num_events, dtype=bool)
+        keep[positions[~repeated]] = True
+        keep &= ~self.object_missing[objects]
+        return self._projection(keep, self.object_codes, self.objects, drop_empty=False)
+
+    def _projection(self, keep, codes, values, drop_empty, attributes=None):
+        """
+        Gathers the kept events as an EncodedLog whose activities are the given codes (per parsed label).
+        """
+        positions = np.flatnonzero(keep)
+        lengths = np.bincount(self.case_index[positions], minlength=len(self))
+        cases = np.flatnonzero(lengths > 0) if drop_empty else np.arange(len(self))
+        offsets = np.concatenate([[0], np.cumsum(lengths[cases])]).astype(np.int64)
+        parsed = self.parsed_codes[positions]
+        # attributes hold one value id per event of this log
+        attributes = {key: (value_ids[positions], vals) for key, (value_ids, vals) in (attributes or {}).items()}
+        attributes[self.config.DICTIONARY] = (parsed, [p.dictionary_entries for p in self.parsed_labels])
+        attributes[self.config.DATA_OBJECT] = (parsed, [p.data_objects for p in self.parsed_labels])
+        return EncodedLog([self.case_ids[i] for i in cases], values, codes[parsed], offsets, attributes=attributes,
+                          activity_key=self.config.XES_NAME)
+
+
+class SharedColumnarLog:
+    """
+    Handle of a columnar log whose event arrays are copied into shared memory. The handle is sent to worker processes
+    instead of the log, they attach to the shared arrays rather than receiving copies of them. The process that
+    shares the log has to release the shared memory once the workers are done.
+    """
+
+    ARRAYS = ("offsets", "parsed_codes", "role_codes")
+
+    def __init__(self, log: ColumnarLog):
+        self.config = log.config
+        self.case_ids = log.case_ids
+        self.parsed_labels = log.parsed_labels
+        self.roles = log.roles
+        # name, shape and dtype of the shared memory block of every (present) event array
+        self.arrays = {}
+        self._blocks = []
+        for name in self.ARRAYS:
+            array = getattr(log, name)
+            if array is None:
+                continue
+            block = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[:] = array
+            self._blocks.append(block)
+            self.arrays[name] = (block.name, array.shape, array.dtype.str)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_blocks"] = []
+        return state
+
+    def attach(self):
+        """
+        Returns the columnar log backed by the shared arrays.
+        """
+        arrays = {}
+        blocks = []
+        for name, (block_name, shape, dtype) in self.arrays.items():
+            block = shared_memory.SharedMemory(name=block_name)
+            blocks.append(block)
+            arrays[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+        log = ColumnarLog(self.config, self.case_ids, arrays["offsets"], arrays["parsed_codes"], self.parsed_labels,
+                          role_codes=arrays.get("role_codes"), roles=self.roles)
+        # the blocks back the arrays of the log, they have to stay attached as long as the log lives
+        log.shared_blocks = blocks
+        return log
+
+    def release(self):
+        """
+        Frees the shared memory, to be called by the process that shared the log.
+        """
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
@@ -1,7 +1,22 @@
+import glob
+import hashlib
+import json
+import logging
 import os
 
 import pandas as pd
-from pm4py.read import read_xes
+
+from semconstmining.log.logstats import LogStats
+from semconstmining.log.partitioning import iter_csv_chunks, iter_parquet_chunks
+from semconstmining.log.xes_reader import iter_xes_events, read_xes_events
+from semconstmining.util.stage_cache import fingerprint
+
+_logger = logging.getLogger(__name__)
+
+# Bump whenever the way logs are read changes, the cached logs are re-read afterwards
+LOG_CACHE_VERSION = "1"
+
+_CACHE_EXTENSIONS = {"pickle": ".pkl", "parquet": ".parquet", "feather": ".feather"}
 
 
 class LogHandler:
@@ -18,30 +33,121 @@ class LogHandler:
                           inplace=True)
 
     def read_xes_log(self, path, name):
-        pd_log = read_xes(os.path.join(path, name))
-        return pd_log
+        pd_log = read_xes_events(os.path.join(path, name), self.config.LOG_COLUMNS, time_key=self.config.XES_TIME)
+        # attributes that no event has are dropped, as by pm4py
+        return pd_log.dropna(axis=1, how="all")
 
     def read_csv_log(self, path, name):
-        pd_log = pd.read_csv(os.path.join(path, name), sep=";", engine="python")
-        """check if given column names exist in log and rename them"""
+        pd_log = pd.read_csv(os.path.join(path, name), **self.get_csv_args())
+        self.check_columns(pd_log)
+        # THIS IS OLD:
+        # pd_log = pm4py.format_dataframe(pd_log, case_id=XES_CASE, activity_key=XES_NAME, timestamp_key=XES_TIME)
+        return pd_log
+
+    def get_csv_args(self):
+        columns = set(self.config.LOG_COLUMNS)
+        return {"sep": ";", "engine": "c", "usecols": lambda col: col in columns,
+                "dtype": {col: str for col in columns if col != self.config.XES_TIME}}
+
+    def check_columns(self, pd_log):
+        """check if the case, activity and timestamp columns exist in the log"""
         must_have = [self.config.XES_CASE, self.config.XES_NAME, self.config.XES_TIME]
         not_exist_str = " does not exist as column name"
         for e in must_have:
             if e not in pd_log.columns:
                 raise ValueError(e + not_exist_str)
-        # THIS IS OLD:
-        # pd_log = pm4py.format_dataframe(pd_log, case_id=XES_CASE, activity_key=XES_NAME, timestamp_key=XES_TIME)
-        return pd_log
+
+    def iter_log_chunks(self, path, name, max_events):
+        """
+        Reads the log in case-complete chunks of about max_events events, a case never spans two chunks. Besides
+        CSV and XES files, the log can be a directory of Parquet files that each hold complete cases.
+
+        :return: iterator over the chunks as data frames, None if the log is not supported
+        """
+        full_path = os.path.join(path, name)
+        if os.path.isdir(full_path):
+            chunks = iter_parquet_chunks(full_path, self.config.XES_CASE, max_events, columns=self.config.LOG_COLUMNS)
+        elif ".csv" in name:
+            chunks = iter_csv_chunks(full_path, self.config.XES_CASE, max_events, **self.get_csv_args())
+        elif ".xes" in name:
+            chunks = iter_xes_events(full_path, self.config.LOG_COLUMNS, time_key=self.config.XES_TIME,
+                                     max_events=max_events)
+        else:
+            return None
+        return (self._checked(chunk) for chunk in chunks)
+
+    def _checked(self, chunk):
+        self.check_columns(chunk)
+        return chunk
 
     def read_log(self, path, name):
+        """
+        Reads the log from the log cache if it holds an up-to-date copy of it, from the file otherwise (and caches it).
+        """
         log = None
-        if ".csv" in name:
-            log = self.read_csv_log(path, name)
-        elif ".xes" in name:
-            log = self.read_xes_log(path, name)
+        if self.is_log(name):
+            cache_path = self.get_cache_path(path, name)
+            if cache_path is not None and os.path.exists(cache_path):
+                log = self._read_cached(cache_path)
+            else:
+                log = self.read_csv_log(path, name) if ".csv" in name else self.read_xes_log(path, name)
+                if cache_path is not None:
+                    self._write_cached(cache_path, name, log)
         self.log = log
         return self.log
 
+    def get_log_stats(self, path, name):
+        """
+        The statistics of the log, taken from the log cache if it holds an up-to-date copy of the log.
+        """
+        if not self.is_log(name):
+            return None
+        cache_path = self.get_cache_path(path, name)
+        if cache_path is None or not os.path.exists(cache_path):
+            return compute_log_stats(self.config, name, self.read_log(path, name))
+        with open(cache_path + ".json", "r", encoding="utf-8") as f:
+            return LogStats(**json.load(f))
+
+    @staticmethod
+    def is_log(name):
+        return ".csv" in name or ".xes" in name
+
+    def get_cache_path(self, path, name):
+        """
+        Path of the cached copy of the log, keyed by the file's size and modification time and the columns read
+        (None if the log cache is disabled).
+        """
+        if self.config.LOG_CACHE_DIR is None:
+            return None
+        key = hashlib.sha256(json.dumps([LOG_CACHE_VERSION, fingerprint(os.path.join(path, name)),
+                                         list(self.config.LOG_COLUMNS)]).encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.config.LOG_CACHE_DIR,
+                            name + "-" + key + _CACHE_EXTENSIONS[self.config.LOG_CACHE_FORMAT])
+
+    def _read_cached(self, cache_path):
+        _logger.info("Reading cached log " + cache_path)
+        if self.config.LOG_CACHE_FORMAT == "parquet":
+            return pd.read_parquet(cache_path)
+        if self.config.LOG_CACHE_FORMAT == "feather":
+            return pd.read_feather(cache_path)
+        return pd.read_pickle(cache_path)
+
+    def _write_cached(self, cache_path, name, log):
+        os.makedirs(self.config.LOG_CACHE_DIR, exist_ok=True)
+        # copies of former versions of the file are outdated
+        for outdated in glob.glob(os.path.join(glob.escape(str(self.config.LOG_CACHE_DIR)), glob.escape(name) + "-*")):
+            os.remove(outdated)
+        tmp_path = cache_path + ".tmp"
+        if self.config.LOG_CACHE_FORMAT == "parquet":
+            log.to_parquet(tmp_path)
+        elif self.config.LOG_CACHE_FORMAT == "feather":
+            log.reset_index(drop=True).to_feather(tmp_path)
+        else:
+            log.to_pickle(tmp_path)
+        with open(cache_path + ".json", "w", encoding="utf-8") as f:
+            json.dump(compute_log_stats(self.config, name, log).__dict__, f)
+        os.replace(tmp_path, cache_path)
+
     def get_resources_to_tasks(self):
         if self.log is None:
             raise RuntimeError("You must load a log before.")
@@ -57,3 +163,10 @@ class LogHandler:
                 res_to_tasks["unknown"].update(set(self.log[pd.isna(self.log[self.config.XES_ROLE])]
                                                    [self.config.XES_NAME].unique()))
         return res_to_tasks
+
+
+def compute_log_stats(config, name, pd_log):
+    if pd_log is None:
+        return None
+    return LogStats(name=name, num_traces=int(pd_log[config.XES_CASE].nunique()),
+                    num_activities=int(pd_log[config.XES_NAME].nunique()), num_events=len(pd_log))
@@ -15,7 +15,7 @@ class LogInfo:
         self.names = [] if names is None else names
         self.names = [sanitize_label(name) for name in self.names]
         self.nlp_helper = nlp_helper
-        self.activities_to_parsed = {label: self.nlp_helper.parse_label(label) for label in self.labels}
+        self.activities_to_parsed = dict(zip(self.labels, self.nlp_helper.parse_labels_bulk(self.labels)))
         self.objects = list(
             set([x.main_object for x in self.activities_to_parsed.values() if not pd.isna(x.main_object) and
                  x.main_object not in self.nlp_helper.config.TERMS_FOR_MISSING]))
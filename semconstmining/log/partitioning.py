@@ -0,0 +1,88 @@
+import glob
+import logging
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+_logger = logging.getLogger(__name__)
+
+
+def _case_partitions(case_sizes, max_events):
+    """
+    Assigns cases (in order) to partitions of about max_events events: a case belongs to the partition in whose
+    block of max_events events it starts, so a partition exceeds max_events by less than the size of its last case.
+
+    :param case_sizes: the number of events of every case
+    :return: the partition of every case, partitions are numbered consecutively
+    """
+    starts = np.cumsum(case_sizes) - case_sizes
+    return np.unique(starts // max_events, return_inverse=True)[1].reshape(-1)
+
+
+def iter_case_chunks(log: pd.DataFrame, case_key, max_events):
+    """
+    Splits a log into case-complete chunks of about max_events events.
+    """
+    if max_events is None or len(log) <= max_events:
+        yield log
+        return
+    case_codes, case_ids = pd.factorize(log[case_key])
+    partitions = _case_partitions(np.bincount(case_codes[case_codes >= 0], minlength=len(case_ids)), max_events)
+    event_partitions = np.where(case_codes >= 0, partitions[case_codes], -1)
+    for partition in range(partitions.max() + 1 if len(partitions) > 0 else 0):
+        yield log[event_partitions == partition]
+
+
+def iter_csv_chunks(path, case_key, max_events, sep=",", **read_args):
+    """
+    Reads a CSV log in case-complete chunks of about max_events events, the events of a case may be spread over the
+    file. The file is read twice, first only the case column to size the cases, then in blocks of max_events rows
+    whose events are spilled to temporary files per chunk.
+
+    :param path: the path of the CSV file
+    :param case_key: the column of the case ids
+    :param max_events: the number of events of a chunk
+    :param sep: the separator of the columns
+    :param read_args: further arguments of pd.read_csv
+    """
+    sizes = pd.Series(dtype=np.int64)
+    for block in pd.read_csv(path, sep=sep, usecols=[case_key], dtype={case_key: str}, chunksize=max_events):
+        sizes = sizes.add(block[case_key].value_counts(), fill_value=0)
+    if len(sizes) == 0:
+        yield pd.read_csv(path, sep=sep, **read_args)
+        return
+    partition_of = pd.Series(_case_partitions(sizes.to_numpy(dtype=np.int64), max_events), index=sizes.index)
+    num_partitions = int(partition_of.max()) + 1
+    _logger.info("Splitting %s into %d chunks" % (path, num_partitions))
+    with tempfile.TemporaryDirectory() as spill_dir:
+        for i, block in enumerate(pd.read_csv(path, sep=sep, chunksize=max_events, **read_args)):
+            partitions = partition_of.reindex(block[case_key].astype(str)).to_numpy()
+            for partition in np.unique(partitions[~np.isnan(partitions)]).astype(int):
+                block[partitions == partition].to_pickle(os.path.join(spill_dir, "%d-%d.pkl" % (partition, i)))
+        for partition in range(num_partitions):
+            files = sorted(glob.glob(os.path.join(spill_dir, "%d-*.pkl" % partition)),
+                           key=lambda f: int(os.path.basename(f)[:-4].split("-")[1]))
+            chunk = pd.concat([pd.read_pickle(f) for f in files], ignore_index=True)
+            for f in files:
+                os.remove(f)
+            yield chunk
+
+
+def iter_parquet_chunks(path, case_key, max_events, columns=None):
+    """
+    Reads a pre-partitioned Parquet dataset, i.e., a directory of Parquet files each holding complete cases, file by
+    file. Files with more than max_events events are split into case-complete chunks.
+
+    :param path: the directory of the dataset (files in subdirectories are read as well)
+    :param case_key: the column of the case ids
+    :param max_events: the number of events of a chunk
+    :param columns: the columns to read (the ones missing in the files are ignored)
+    """
+    files = sorted(glob.glob(os.path.join(glob.escape(str(path)), "**", "*.parquet"), recursive=True))
+    for file in files:
+        part = pd.read_parquet(file)
+        if columns is not None:
+            part = part[[col for col in columns if col in part.columns]]
+        yield from iter_case_chunks(part, case_key, max_events)
@@ -0,0 +1,126 @@
+import gzip
+import logging
+from xml.etree.ElementTree import iterparse
+
+import pandas as pd
+
+_logger = logging.getLogger(__name__)
+
+# Trace attributes are prefixed like this in the event table (as in pm4py)
+CASE_PREFIX = "case:"
+
+_CONVERTERS = {
+    "string": str,
+    "id": str,
+    "int": int,
+    "float": float,
+    "boolean": lambda value: value.lower() == "true",
+}
+
+
+def _local_name(tag):
+    return tag.rsplit("}", 1)[-1]
+
+
+def _open(path):
+    return gzip.open(path, "rb") if str(path).endswith(".gz") else open(path, "rb")
+
+
+def _value(element):
+    kind = _local_name(element.tag)
+    value = element.get("value")
+    if kind == "date" or value is None or kind not in _CONVERTERS:
+        return value
+    try:
+        return _CONVERTERS[kind](value)
+    except ValueError:
+        return value
+
+
+def read_xes_events(path, keys, time_key=None):
+    """
+    Reads the given attributes of all events of an XES file (optionally gzipped) into a data frame with one row per
+    event. The file is parsed incrementally, every trace is discarded as soon as its events are collected, so the
+    memory needed is the one of the resulting columns rather than the one of the XML tree.
+
+    :param path: the path of the XES file
+    :param keys: the attributes to read, trace attributes are referred to with the prefix "case:"
+    :param time_key: the attribute holding the timestamps, its values are converted to (UTC) datetimes
+    :return: the events as data frame with one column per key (None for events without the attribute)
+    """
+    log = next(iter_xes_events(path, keys, time_key=time_key))
+    _logger.info("Read %d events from %s" % (len(log), path))
+    return log
+
+
+def iter_xes_events(path, keys, time_key=None, max_events=None):
+    """
+    Same as read_xes_events, but yields the events in case-complete chunks: a chunk is yielded once the traces read
+    since the last one have at least max_events events, so a case never spans two chunks. At least one (possibly
+    empty) chunk is yielded.
+    """
+    event_keys = [key for key in keys if not key.startswith(CASE_PREFIX)]
+    trace_keys = {key[len(CASE_PREFIX):]: key for key in keys if key.startswith(CASE_PREFIX)}
+    columns = {key: [] for key in keys}
+    root = None
+    depth = 0
+    # depth of the current trace and event element, attributes are only read from their direct children
+    trace_depth = None
+    event_depth = None
+    trace_values = {}
+    num_trace_events = 0
+    event_values = {}
+    num_chunks = 0
+    for action, element in iterparse(_open(path), events=("start", "end")):
+        if action == "start":
+            depth += 1
+            if root is None:
+                root = element
+            tag = _local_name(element.tag)
+            if tag == "trace" and trace_depth is None:
+                trace_depth = depth
+                trace_values = {}
+                num_trace_events = 0
+            elif tag == "event" and event_depth is None:
+                event_depth = depth
+                event_values = {}
+            continue
+        tag = _local_name(element.tag)
+        if event_depth is not None and depth == event_depth + 1:
+            key = element.get("key")
+            if key in columns:
+                event_values[key] = _value(element)
+        elif trace_depth is not None and event_depth is None and depth == trace_depth + 1:
+            key = element.get("key")
+            if key in trace_keys:
+                trace_values[trace_keys[key]] = _value(element)
+        elif depth == event_depth:
+            for key in event_keys:
+                columns[key].append(event_values.get(key))
+            num_trace_events += 1
+            event_depth = None
+            # events outside of traces have no trace attributes
+            if trace_depth is None:
+                for key in trace_keys.values():
+                    columns[key].append(None)
+            element.clear()
+        elif depth == trace_depth:
+            for key in trace_keys.values():
+                columns[key].extend([trace_values.get(key)] * num_trace_events)
+            trace_depth = None
+            # drop the processed trace from the tree
+            root.clear()
+            if max_events is not None and len(columns[keys[0]]) >= max_events:
+                yield _to_frame(columns, keys, time_key)
+                num_chunks += 1
+                columns = {key: [] for key in keys}
+        depth -= 1
+    if num_chunks == 0 or len(columns[keys[0]]) > 0:
+        yield _to_frame(columns, keys, time_key)
+
+
+def _to_frame(columns, keys, time_key):
+    log = pd.DataFrame(columns, columns=list(keys))
+    if time_key is not None and time_key in log.columns:
+        log[time_key] = pd.to_datetime(log[time_key], utc=True, format="ISO8601")
+    return log
@@ -10,8 +10,9 @@ from pandas import DataFrame
 
 from semconstmining.log.loghandler import LogHandler
 from semconstmining.log.loginfo import LogInfo
-from semconstmining.log.logstats import LogStats
-from semconstmining.checking.constraintchecking.declare_checker import DeclareChecker
+from semconstmining.log.partitioning import iter_case_chunks
+from semconstmining.checking.constraintchecking.declare_checker import DeclareChecker, check_constraints_in_chunks, \
+    get_chunk_size
 from semconstmining.config import Config
 from semconstmining.mining.generality.contextualsimcomputer import ContextualSimilarityComputer, read_pickle, \
     write_pickle
@@ -31,7 +32,7 @@ from semconstmining.selection.relevance.relevance_computer import RelevanceCompu
 
 warnings.simplefilter('ignore')
 import logging
-from semconstmining.mining.extraction.extractionhandler import ExtractionHandler
+from semconstmining.mining.extraction.extractionhandler import ExtractionHandler, DECLARE_STAGE
 from semconstmining.parsing.resource_handler import ResourceHandler
 
 logging.basicConfig(format='[%(asctime)s] p%(process)s {%(filename)s:%(lineno)d} %(levelname)s - %(message)s',
@@ -39,6 +40,8 @@ logging.basicConfig(format='[%(asctime)s] p%(process)s {%(filename)s:%(lineno)d}
 
 _logger = logging.getLogger(__name__)
 
+PREPROCESSED_STAGE = "preprocessed_constraints"
+
 ONLY_ENGLISH = True
 
 
@@ -71,11 +74,9 @@ def get_log_info(config: Config):
             still_there.append(filename)
             print(dir_path, filename)
             if filename not in log_infos:
-                pd_log = lh.read_log(dir_path, filename)
-                if pd_log is not None:
-                    log_infos[filename] = LogStats(name=filename, num_traces=pd_log[config.XES_CASE].nunique(),
-                                                   num_activities=pd_log[config.XES_NAME].nunique(),
-                                                   num_events=pd_log.size)
+                log_stats = lh.get_log_stats(dir_path, filename)
+                if log_stats is not None:
+                    log_infos[filename] = log_stats
     for log_info in log_infos.keys():
         if log_info not in still_there:
             to_remove.append(log_info)
@@ -85,23 +86,27 @@ def get_log_info(config: Config):
     return list(log_infos.values())
 
 
-def store_preprocessed(config, constraints, min_support, dict_filter, mark_redundant, with_nat_lang):
-    constraints.to_pickle(
-        config.DATA_INTERIM / (config.MODEL_COLLECTION + "_" + "supp=" + str(min_support) +
-                               "_" + "dict=" + str(dict_filter) +
-                               "_" + "redundant=" + str(mark_redundant) +
-                               "_" + "nat_lang=" + str(with_nat_lang) +
-                               "_" + config.PREPROCESSED_CONSTRAINTS))
+def get_preprocessed_stage_key(config, resource_handler, min_support, dict_filter, mark_redundant, with_nat_lang):
+    ExtractionHandler(config, resource_handler).resolve_declare_constraints()
+    return resource_handler.stage_cache.stage(PREPROCESSED_STAGE,
+                                              params={"min_support": min_support, "dict_filter": dict_filter,
+                                                      "mark_redundant": mark_redundant,
+                                                      "with_nat_lang": with_nat_lang},
+                                              dependencies=(DECLARE_STAGE,))
+
 
+def get_legacy_preprocessed_path(config, min_support, dict_filter, mark_redundant, with_nat_lang):
+    return config.DATA_INTERIM / (config.MODEL_COLLECTION + "_" + "supp=" + str(min_support) +
+                                  "_" + "dict=" + str(dict_filter) +
+                                  "_" + "redundant=" + str(mark_redundant) +
+                                  "_" + "nat_lang=" + str(with_nat_lang) +
+                                  "_" + config.PREPROCESSED_CONSTRAINTS)
 
-def load_preprocessed(config, min_support, dict_filter, mark_redundant, with_nat_lang):
-    consts = pd.read_pickle(
-        config.DATA_INTERIM / (config.MODEL_COLLECTION + "_" + "supp=" + str(min_support) +
-                               "_" + "dict=" + str(dict_filter) +
-                               "_" + "redundant=" + str(mark_redundant) +
-                               "_" + "nat_lang=" + str(with_nat_lang) +
-                               "_" + config.PREPROCESSED_CONSTRAINTS))
-    return consts
+
+def store_preprocessed(config, resource_handler, constraints, min_support, dict_filter, mark_redundant,
+                       with_nat_lang):
+    resource_handler.stage_cache.put(get_preprocessed_stage_key(config, resource_handler, min_support, dict_filter,
+                                                                mark_redundant, with_nat_lang), constraints)
 
 
 def get_or_mine_constraints(config, resource_handler, min_support=2, dict_filter=False,
@@ -128,13 +133,7 @@ def get_or_mine_constraints(config, resource_handler, min_support=2, dict_filter
 
     eh = ExtractionHandler(config, resource_handler)
 
-    if exists(config.DATA_INTERIM / (config.MODEL_COLLECTION + "_" + "supp=" + str(min_support) +
-                                     "_" + "dict=" + str(dict_filter) +
-                                     "_" + "redundant=" + str(mark_redundant) +
-                                     "_" + "nat_lang=" + str(with_nat_lang) +
-                                     "_" + config.PREPROCESSED_CONSTRAINTS)):
-        constraints = load_preprocessed(config, min_support, dict_filter, mark_redundant, with_nat_lang)
-    else:
+    def preprocess_constraints():
         constraints = eh.aggregate_constraints(min_support=min_support)
         if dict_filter:
             dict_fil = DictionaryFilter(config, constraints)
@@ -155,8 +154,12 @@ def get_or_mine_constraints(config, resource_handler, min_support=2, dict_filter
                 lambda x: nat_lang_templates[
                     parse_single_constraint(x)["template"].templ_str if parse_single_constraint(x) is not None else
                     x.split("[")[0]])
+        return constraints
 
-        store_preprocessed(config, constraints, min_support, dict_filter, mark_redundant, with_nat_lang)
+    constraints = resource_handler.stage_cache.get_or_compute(
+        get_preprocessed_stage_key(config, resource_handler, min_support, dict_filter, mark_redundant, with_nat_lang),
+        preprocess_constraints,
+        legacy_path=get_legacy_preprocessed_path(config, min_support, dict_filter, mark_redundant, with_nat_lang))
     for to_ignore in config.CONSTRAINT_TYPES_TO_IGNORE:
         _logger.info("Ignoring constraints of type " + to_ignore)
         constraints = constraints[~(constraints[config.TEMPLATE] == to_ignore)]
@@ -177,6 +180,14 @@ def get_or_mine_constraints(config, resource_handler, min_support=2, dict_filter
 
 def check_constraints(config, process, constraints, nlp_helper, pd_log=None, with_id=False):
     lh = LogHandler(config)
+    if config.CHECKING_MEMORY_BUDGET is not None:
+        max_events = get_chunk_size(config, constraints)
+        chunks = lh.iter_log_chunks(config.DATA_LOGS, process, max_events) if pd_log is None \
+            else iter_case_chunks(pd_log, config.XES_CASE, max_events)
+        if chunks is None:
+            _logger.info("No log found for process " + process)
+            return None
+        return check_constraints_in_chunks(config, chunks, constraints, nlp_helper, with_id=with_id)
     if pd_log is None:
         pd_log = lh.read_log(config.DATA_LOGS, process)
         if pd_log is None:
@@ -226,14 +237,13 @@ def get_context_sim_computer(config, constraints, nlp_helper, resource_handler,
     resource_handler
     """
     contextual_similarity_computer = ContextualSimilarityComputer(config, constraints, nlp_helper, resource_handler)
-    nlp_helper.store_sims()
     contextual_similarity_computer.compute_object_based_contextual_dissimilarity()
     contextual_similarity_computer.compute_label_based_contextual_dissimilarity()
     contextual_similarity_computer.compute_name_based_contextual_dissimilarity()
     # nlp_helper.cluster(contextual_similarity_computer.constraints)
     _logger.info("Generality computed")
-    store_preprocessed(config, contextual_similarity_computer.constraints, min_support, dict_filter, mark_redundant,
-                       with_nat_lang)
+    store_preprocessed(config, resource_handler, contextual_similarity_computer.constraints, min_support, dict_filter,
+                       mark_redundant, with_nat_lang)
     return contextual_similarity_computer
 
 
@@ -282,7 +292,6 @@ def compute_relevance_for_log(config, constraints, nlp_helper, process, pd_log=N
     start_time = time.time()
     relevance_computer = RelevanceComputer(config, nlp_helper, log_info)
     constraints = relevance_computer.compute_relevance(constraints, pre_compute=precompute, store_sims=store_sims)
-    nlp_helper.store_sims()
     if k_most_relevant is not None:
         constraints = get_k_most_relevant(config, constraints, k_most_relevant)
     _logger.info("Relevance computation took " + str(time.time() - start_time) + " seconds")
@@ -443,6 +452,7 @@ def run_full_extraction_pipeline(config: Config, process: str, filter_config: Fi
         merged_df.to_csv(config.DATA_OUTPUT / (CURRENT_LOG_FILE + "-violations.csv"), index=False)
         consistent_recommended_constraints.to_csv(config.DATA_OUTPUT / (CURRENT_LOG_FILE + "-recommended_constraints.csv"),
                                                   index=False)
+    _logger.info("Loaded resources:\n" + nlp_helper.get_load_report())
     _logger.info("Done")
 
 
@@ -1,10 +1,16 @@
 import logging
+import os
+import shutil
 import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from os.path import exists
 
+import numpy as np
 import pandas as pd
 from pm4py.objects.log.obj import EventLog, Trace, Event
 
 from semconstmining.declare.parsers import parse_single_constraint
+from semconstmining.log.columnar_log import ColumnarLog
 from semconstmining.parsing.conversion.petrinetanalysis import is_relevant_label
 from semconstmining.mining.model.parsed_label import get_dummy
 from semconstmining.declare.declare import Declare
@@ -18,6 +24,31 @@ def _get_constraint_template(constraint):
                                                                         None else None
 
 
+class ParsedTaskTable:
+    """
+    Read-only lookup of parsed labels that stands in for the ResourceHandler in discovery worker processes.
+    """
+
+    def __init__(self, parsed_tasks):
+        self.parsed_tasks = parsed_tasks
+
+    def get_parsed_task(self, label):
+        return self.parsed_tasks[label]
+
+
+# Extractor of a discovery worker process, set once by _init_worker
+_worker_extractor = None
+
+
+def _init_worker(config):
+    global _worker_extractor
+    _worker_extractor = DeclareExtractor(config, None)
+
+
+def _discover_chunk(i, num_chunks, logs, parsed_task_table, checkpoint_dir):
+    return _worker_extractor.discover_chunk(i, num_chunks, logs, parsed_task_table, checkpoint_dir)
+
+
 class DeclareExtractor:
 
     def __init__(self, config, resource_handler: ResourceHandler):
@@ -80,29 +111,42 @@ class DeclareExtractor:
                 rec[self.config.RIGHT_OPERAND] = ops[1].strip()
         return res
 
-    def extract_declare_from_logs(self):
+    def extract_declare_from_logs(self, checkpoint_dir=None):
         """
-        Extract DECLARE-like constraints from log traces
+        Extract DECLARE-like constraints from log traces. The logs are processed in chunks, possibly by a pool of
+        worker processes, the results of each chunk are checkpointed in the checkpoint directory (if any) such that an
+        interrupted extraction resumes with the chunks that are missing. The checkpoints are named by the number of
+        chunks as well, those of a split into a different number of chunks are not picked up.
         :return: a pandas dataframe with extracted DECLARE constraints
         """
         _logger.info("Extracting DECLARE constraints from played-out logs")
-        # Discover regular declare constraints
-        dfs_reg = [self.discover_declare_constraints(t) for t in
-                   self.resource_handler.bpmn_logs.reset_index().itertuples()]
-
-        # Discover action based constraints per object
-        dfs_obj = [self.discover_object_based_declare_constraints(t) for t in
-                   self.resource_handler.bpmn_logs.reset_index().itertuples()]
-        # Discover multi-object constraints
-        dfs_multi_obj = [self.discover_multi_object_declare_constraints(t) for t in
-                         self.resource_handler.bpmn_logs.reset_index().itertuples()]
+        logs = self.resource_handler.bpmn_logs.reset_index()[["model_id", "name", "log"]]
+        chunks = [logs.iloc[positions] for positions in
+                  np.array_split(np.arange(len(logs)), max(1, min(self.config.DECLARE_EXTRACTION_CHUNKS, len(logs))))]
+        if checkpoint_dir is not None:
+            os.makedirs(checkpoint_dir, exist_ok=True)
+        results = {i: pd.read_pickle(self.chunk_file(checkpoint_dir, i, len(chunks))) for i in range(len(chunks))
+                   if checkpoint_dir is not None and exists(self.chunk_file(checkpoint_dir, i, len(chunks)))}
+        missing = [i for i in range(len(chunks)) if i not in results]
+        _logger.info(str(len(results)) + " of " + str(len(chunks)) + " chunks already done.")
+        workers = self.config.DECLARE_EXTRACTION_WORKERS or os.cpu_count()
+        if workers > 1 and len(missing) > 1:
+            with ProcessPoolExecutor(max_workers=min(workers, len(missing)), initializer=_init_worker,
+                                     initargs=(self.config,)) as executor:
+                futures = {executor.submit(_discover_chunk, i, len(chunks), chunks[i],
+                                           self.get_parsed_task_table(chunks[i]), checkpoint_dir): i for i in missing}
+                for done, future in enumerate(as_completed(futures)):
+                    results[futures[future]] = future.result()
+                    _logger.info("Chunk " + str(futures[future]) + " done (" + str(done + 1) + " of " +
+                                 str(len(missing)) + ").")
+        else:
+            for i in missing:
+                results[i] = self.discover_chunk(i, len(chunks), chunks[i], self.resource_handler, checkpoint_dir)
 
         # Combine all constraints that were extracted into a common dataframe
-        dfs = [df for df in
-               dfs_reg +  # regular declare constraints
-               dfs_obj +  # object based constraints
-               dfs_multi_obj  # multi-object constraints
-               if df is not None and len(df) > 0]
+        dfs = [df for level in range(3) for i in range(len(chunks)) for df in results[i][level]]
+        if checkpoint_dir is not None:
+            shutil.rmtree(checkpoint_dir, ignore_errors=True)
         if len(dfs) == 0:
             return pd.DataFrame(columns=[self.config.RECORD_ID,
                                          self.config.LEVEL,
@@ -117,14 +161,60 @@ class DeclareExtractor:
         new_df = pd.concat(dfs).astype({self.config.LEVEL: "category"})
         return new_df
 
-    def discover_multi_object_declare_constraints(self, row_tuple):
+    @staticmethod
+    def chunk_file(checkpoint_dir, i, num_chunks):
+        return os.path.join(checkpoint_dir, "no_" + str(i) + "_of_" + str(num_chunks) + ".pkl")
+
+    def get_parsed_task_table(self, logs):
+        """
+        The parsed labels of all relevant tasks of the given logs
+        """
+        parsed_tasks = {}
+        for log in logs["log"]:
+            if log is not None:
+                parsed_tasks.update(self.get_parsed_tasks(log, resource_handler=self.resource_handler))
+        return ParsedTaskTable(parsed_tasks)
+
+    def discover_chunk(self, i, num_chunks, logs, parsed_task_lookup, checkpoint_dir=None):
+        """
+        Discovers the constraints of all logs of a chunk.
+        :return: the non-empty results of the regular, object-based, and multi-object discovery
+        """
+        results = ([], [], [])
+        for row_tuple in logs.itertuples():
+            for level, df in enumerate(self.discover_all_declare_constraints(row_tuple, parsed_task_lookup)):
+                if df is not None and len(df) > 0:
+                    results[level].append(df)
+        if checkpoint_dir is not None:
+            # the checkpoint only appears once it is completely written
+            chunk_file = self.chunk_file(checkpoint_dir, i, num_chunks)
+            pd.to_pickle(results, chunk_file + ".tmp")
+            os.replace(chunk_file + ".tmp", chunk_file)
+        return results
+
+    def discover_all_declare_constraints(self, row_tuple, parsed_task_lookup):
+        """
+        Runs the regular, object-based, and multi-object discovery on the log of a model, the tasks are parsed and
+        the traces are filtered only once.
+        """
+        if row_tuple.log is None:
+            return None, None, None
+        columnar_log = self.get_columnar_log(row_tuple.log, parsed_task_lookup, with_loops=True)
+        without_loops = np.array([not self.has_loop(trace) for trace in row_tuple.log], dtype=bool)
+        log_without_loops = columnar_log.select(without_loops,
+                                                case_ids=[str(i) for i in range(np.count_nonzero(without_loops))])
+        return (self.discover_declare_constraints(row_tuple, columnar_log),
+                self.discover_object_based_declare_constraints(row_tuple, log_without_loops),
+                self.discover_multi_object_declare_constraints(row_tuple, log_without_loops))
+
+    def discover_multi_object_declare_constraints(self, row_tuple, columnar_log=None):
         if row_tuple.log is None:
             return None
-        parsed_tasks = self.get_parsed_tasks(row_tuple.log, resource_handler=self.resource_handler)
-        filtered_traces = self.get_filtered_traces(row_tuple.log, parsed_tasks=parsed_tasks)
+        if columnar_log is None:
+            columnar_log = self.get_columnar_log(row_tuple.log, self.resource_handler)
         res = set()
         d4py = Declare(self.config)
-        d4py.log = self.object_log_projection(filtered_traces)
+        d4py.log = columnar_log.object_log_projection()
         d4py.compute_frequent_itemsets(min_support=0.0, len_itemset=2, algorithm="apriori")
         d4py.discovery(consider_vacuity=True, max_declare_cardinality=2, do_unary=False)
         individual_res, associations = d4py.filter_discovery(min_support=self.config.DECLARE_SUPPORT)
@@ -141,19 +231,16 @@ class DeclareExtractor:
                 model_name=row_tuple.name)
         )
 
-    def discover_object_based_declare_constraints(self, row_tuple):
+    def discover_object_based_declare_constraints(self, row_tuple, columnar_log=None):
         if row_tuple.log is None:
             return None
-        parsed_tasks = self.get_parsed_tasks(row_tuple.log, resource_handler=self.resource_handler)
-        filtered_traces = self.get_filtered_traces(row_tuple.log, parsed_tasks=parsed_tasks)
+        if columnar_log is None:
+            columnar_log = self.get_columnar_log(row_tuple.log, self.resource_handler)
         res = {}
         all_associations = {}
-        bos = set([x.main_object for trace in filtered_traces for x in trace if
-                   x.main_object not in self.config.TERMS_FOR_MISSING])
-        # _logger.info(bos)
-        for bo in bos:
+        for bo in columnar_log.business_objects:
             d4py = Declare(self.config)
-            d4py.log = self.object_action_log_projection(bo, filtered_traces)
+            d4py.log = columnar_log.object_action_log_projection(bo)
             d4py.compute_frequent_itemsets(min_support=0.0, len_itemset=2, algorithm="apriori")
             individual_res, associations = d4py.discovery(consider_vacuity=True, max_declare_cardinality=2)
             d4py.filter_discovery(min_support=self.config.DECLARE_SUPPORT)
@@ -195,13 +282,13 @@ class DeclareExtractor:
                 model_name=row_tuple.name)
         )
 
-    def discover_declare_constraints(self, row_tuple):
+    def discover_declare_constraints(self, row_tuple, columnar_log=None):
         if row_tuple.log is None:
             return None
         d4py = Declare(self.config)
-        parsed_tasks = self.get_parsed_tasks(row_tuple.log, resource_handler=self.resource_handler)
-        filtered_traces = self.get_filtered_traces(row_tuple.log, parsed_tasks=parsed_tasks, with_loops=True)
-        d4py.log = self.clean_log_projection(filtered_traces)
+        if columnar_log is None:
+            columnar_log = self.get_columnar_log(row_tuple.log, self.resource_handler, with_loops=True)
+        d4py.log = columnar_log.clean_log_projection()
         d4py.compute_frequent_itemsets(min_support=0.0, len_itemset=2, algorithm="apriori")
         d4py.discovery(consider_vacuity=True, max_declare_cardinality=2)
         individual_res, associations = d4py.filter_discovery(min_support=self.config.DECLARE_SUPPORT)
@@ -225,6 +312,11 @@ class DeclareExtractor:
             [x[self.config.XES_NAME] for trace in log for x in trace])
         return {t: resource_handler.get_parsed_task(t) for t in relevant_tasks}
 
+    def get_columnar_log(self, log, resource_handler, with_loops=False):
+        parsed_tasks = self.get_parsed_tasks(log, resource_handler=resource_handler)
+        return ColumnarLog.from_parsed_traces(self.config, self.get_filtered_traces(log, parsed_tasks=parsed_tasks,
+                                                                                    with_loops=with_loops))
+
     def get_filtered_traces(self, log, parsed_tasks=None, with_loops=False):
         if parsed_tasks is not None:
             return [
@@ -235,93 +327,6 @@ class DeclareExtractor:
             return [[e[self.config.XES_NAME] for i, e in enumerate(trace)] for trace in log if
                     with_loops or not self.has_loop(trace)]
 
-    def clean_log_projection(self, traces):
-        """
-        Same log, just with clean labels.
-        """
-        projection = EventLog()
-        if traces is None:
-            raise RuntimeError("You must load a log before.")
-        for i, trace in enumerate(traces):
-            tmp_trace = Trace()
-            tmp_trace.attributes[self.config.XES_NAME] = str(i)
-            for parsed in trace:
-                if parsed.label not in self.config.TERMS_FOR_MISSING:
-                    event = Event(
-                        {
-                            self.config.XES_NAME: parsed.label,
-                            self.config.DICTIONARY: parsed.dictionary_entries,
-                            self.config.DATA_OBJECT: parsed.data_objects,
-                        }
-                    )
-                    tmp_trace.append(event)
-            if len(tmp_trace) > 0:
-                projection.append(tmp_trace)
-        return projection
-
-    def object_action_log_projection(self, obj, traces):
-        """
-        Return for each trace a time-ordered list of the actions for a given object type.
-
-        Returns
-        -------
-        projection
-            traces containing only actions applied to the same obj.
-        """
-        projection = EventLog()
-        if traces is None:
-            raise RuntimeError("You must load a log before.")
-        for i, trace in enumerate(traces):
-            tmp_trace = Trace()
-            tmp_trace.attributes[self.config.XES_NAME] = str(i)
-            for parsed in trace:
-                if parsed.main_object == obj:
-                    if parsed.main_action != "":
-                        event = Event(
-                            {
-                                self.config.XES_NAME: parsed.main_action,
-                                self.config.DICTIONARY: parsed.dictionary_entries,
-                                self.config.DATA_OBJECT: parsed.data_objects,
-                            }
-                        )
-                        tmp_trace.append(event)
-            if len(tmp_trace) > 0:
-                projection.append(tmp_trace)
-        return projection
-
-    def object_log_projection(self, traces):
-        """
-        Return for each trace a time-ordered list of the actions for a given object type.
-
-        Returns
-        -------
-        projection
-            traces containing only actions applied to the same obj.
-        """
-        projection = EventLog()
-        if traces is None:
-            raise RuntimeError("You must load a log before.")
-        for i, trace in enumerate(traces):
-            tmp_trace = Trace()
-            tmp_trace.attributes[self.config.XES_NAME] = str(i)
-            last = ""
-            for parsed in trace:
-                if type(parsed.main_object) != str:
-                    _logger.warning("main_object is not a string: %s" % parsed.main_object)
-                    continue
-                if parsed.main_object not in self.config.TERMS_FOR_MISSING and parsed.main_object != last:
-                    event = Event(
-                        {
-                            self.config.XES_NAME: parsed.main_object,
-                            self.config.DICTIONARY: parsed.dictionary_entries,
-                            self.config.DATA_OBJECT: parsed.data_objects,
-                        }
-                    )
-                    tmp_trace.append(event)
-                last = parsed.main_object
-            projection.append(tmp_trace)
-        return projection
-
     def get_constraints_flat(self, res, associations=None):
         res = [{self.config.RECORD_ID: str(uuid.uuid4()),
                 self.config.LEVEL: self.config.ACTIVITY,
@@ -1,15 +1,22 @@
 import logging
-from os.path import exists
 
 import pandas as pd
 
 from semconstmining.mining.extraction.declareextractor import DeclareExtractor
 from semconstmining.mining.extraction.modelextractor import ModelExtractor
-from semconstmining.parsing.resource_handler import ResourceHandler
+from semconstmining.parsing.resource_handler import ResourceHandler, LOGS_STAGE, COMPONENTS_STAGE
 from semconstmining.parsing.label_parser.nlp_helper import sanitize_label
 
 _logger = logging.getLogger(__name__)
 
+# Names of the cached pipeline stages
+MP_OBSERVATIONS_STAGE = "bpmn_mp_observations"
+DECLARE_STAGE = "bpmn_declare_const"
+
+# Config fields that affect the extracted observations
+MODEL_EXTRACTION_FIELDS = ("TERMS_FOR_MISSING", "NON_TASKS", "IRRELEVANT_CONSTRAINTS", "CONSTRAINT_TYPES_TO_IGNORE")
+DECLARE_EXTRACTION_FIELDS = MODEL_EXTRACTION_FIELDS + ("DECLARE_SUPPORT", "BINARY_TEMPLATES")
+
 
 class ExtractionHandler:
     """
@@ -43,31 +50,44 @@ class ExtractionHandler:
         # Extraction of resource constraints and decision constraints from the models directly
         :return:
         """
-        if exists(self.config.DATA_INTERIM / self.mp_observations_ser_file):
-            _logger.info("Loading stored model-based observations.")
-            df_observations_mp = pd.read_pickle(self.mp_observations_ser_file)
-            _logger.info("Loaded stored model-based observations.")
-        else:
+        def extract_observations():
             df_observations_mp = self.model_extractor.get_perspectives_from_models()
             _logger.info(f"{len(df_observations_mp)} model-based records extracted.")
-            df_observations_mp.to_pickle(self.mp_observations_ser_file)
-        return df_observations_mp
+            return df_observations_mp
+
+        return self.resource_handler.cached_stage(MP_OBSERVATIONS_STAGE, extract_observations,
+                                                  legacy_path=self.mp_observations_ser_file,
+                                                  dependencies=(COMPONENTS_STAGE,),
+                                                  config_fields=MODEL_EXTRACTION_FIELDS)
+
+    def declare_stage_key(self):
+        return self.resource_handler.stage_cache.stage(
+            DECLARE_STAGE, params={"elements": self.resource_handler.elements_lineage},
+            dependencies=(LOGS_STAGE, COMPONENTS_STAGE), config=self.config, config_fields=DECLARE_EXTRACTION_FIELDS)
+
+    def resolve_declare_constraints(self):
+        """
+        # Makes sure the DECLARE constraints are extracted, without loading them if they are cached
+        :return:
+        """
+        self.resource_handler.stage_cache.resolve(self.declare_stage_key(), self._extract_declare_constraints,
+                                                  legacy_path=self.declare_ser_file)
 
     def extract_declare_constraints_from_logs(self):
         """
         # Extraction of 'semantic' DECLARE constraints from the model-generated logs
         :return:
         """
-        if exists(self.declare_ser_file):
-            _logger.info("Loading stored constraints.")
-            df_declare = pd.read_pickle(self.declare_ser_file)
-            _logger.info("Loaded stored constraints.")
-        else:
-            df_declare = self.declare_extractor.extract_declare_from_logs()
-            df_observations_mp = self.model_extractor.get_perspectives_from_models()
-            df_declare = pd.concat([df_declare, df_observations_mp])
-            _logger.info(f"{len(df_declare)} declare records extracted.")
-            df_declare.to_pickle(self.declare_ser_file)
+        return self.resource_handler.stage_cache.get_or_compute(self.declare_stage_key(),
+                                                                self._extract_declare_constraints,
+                                                                legacy_path=self.declare_ser_file)
+
+    def _extract_declare_constraints(self):
+        df_declare = self.declare_extractor.extract_declare_from_logs(
+            checkpoint_dir=self.config.DECLARE_CHUNKS_DIR / self.declare_stage_key().key)
+        df_observations_mp = self.model_extractor.get_perspectives_from_models()
+        df_declare = pd.concat([df_declare, df_observations_mp])
+        _logger.info(f"{len(df_declare)} declare records extracted.")
         return df_declare
 
     def aggregate_constraints(self, min_support=1):
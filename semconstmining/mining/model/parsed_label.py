@@ -1,10 +1,18 @@
 import logging
-
-from nltk.corpus import stopwords
+from functools import lru_cache
 
 _logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=None)
+def get_stopwords(lang):
+    """
+    The stopwords of the language, nltk is only imported (and its word list read) on first use.
+    """
+    from nltk.corpus import stopwords
+    return frozenset(stopwords.words(lang))
+
+
 def get_dummy(conf, label, lang):
     return ParsedLabel(conf, label, [label], ['X'], ['none'], ['none'], lang)
 
@@ -13,7 +21,7 @@ class ParsedLabel:
 
     def __init__(self, config, label, split, tags, bos, actions, lang, dictionary_entries=None, data_objects=None):
         self.config = config
-        self._stopwords = stopwords.words(lang)
+        self._stopwords = get_stopwords(lang)
         self.lang = lang
         self.label = label
         self.split_label = split
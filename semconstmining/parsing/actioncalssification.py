@@ -1,16 +1,26 @@
+import hashlib
 import json
 import logging
 import operator
+import os
+from os.path import exists
+
+import numpy as np
+
+from semconstmining.parsing.label_parser.verb_neighbours import unit_rows
+from semconstmining.util.io import read_pickle, write_pickle
 
 _logger = logging.getLogger(__name__)
 
 
 class ActionClassifier:
 
-    def __init__(self, config, actions, embeddings):
+    def __init__(self, config, actions, embeddings, categories_path=None):
         self.config = config
         self.actions = actions
         self.embeddings = embeddings
+        # Persistent table of the categories per action, it is discarded when the embeddings or the taxonomy change
+        self.categories_path = categories_path
         action_taxonomy = self.config.mitphb
         # all unique actions
         unique_actions_taxonomy = set()
@@ -25,7 +35,52 @@ class ActionClassifier:
         self.upper_acts = upper_acts
 
     def classify_actions(self):
-        return {act: self.get_action_type_for_action(act) for act in self.actions}
+        categories = self._load_categories()
+        missing = [act for act in dict.fromkeys(self.actions) if act not in categories]
+        if len(missing) > 0:
+            categories.update(self.categorize(missing))
+            self._save_categories(categories)
+        return {act: categories[act] for act in self.actions}
+
+    def categorize(self, actions):
+        """
+        Same as get_action_type_for_action for several actions, whose similarities to the actions of the taxonomy
+        are computed as one (actions x taxonomy) matrix.
+        """
+        taxonomy = [act for act in sorted(self.unique_actions_taxonomy) if act in self.embeddings.key_to_index]
+        known = [act for act in actions if len(act) >= 3 and act in self.embeddings.key_to_index]
+        categories = {act: "None" for act in actions}
+        if len(known) == 0 or len(taxonomy) == 0:
+            return categories
+        _logger.info("Categorizing %d actions" % len(known))
+        self.embeddings.fill_norms()
+        act_ids = [self.embeddings.key_to_index[act] for act in known]
+        tax_ids = [self.embeddings.key_to_index[act] for act in taxonomy]
+        sims = unit_rows(self.embeddings.vectors[act_ids], self.embeddings.norms[act_ids]) @ \
+            unit_rows(self.embeddings.vectors[tax_ids], self.embeddings.norms[tax_ids]).T
+        for act, row in zip(known, sims.tolist()):
+            act_sims = dict(zip(taxonomy, row))
+            categories[act] = self._most_similar(act_sims, {tax_action: act_sims[tax_action] for tax_action in taxonomy
+                                                            if tax_action in self.upper_acts},
+                                                 self.child_to_upper_level)
+        return categories
+
+    def _categories_key(self):
+        taxonomy = json.dumps(self.config.mitphb, sort_keys=True).encode("utf-8")
+        return self.config.WORD_EMBEDDINGS, hashlib.sha256(taxonomy).hexdigest()
+
+    def _load_categories(self):
+        if self.categories_path is not None and exists(self.categories_path):
+            stored = read_pickle(self.categories_path)
+            if stored["key"] == self._categories_key():
+                return stored["categories"]
+        return {}
+
+    def _save_categories(self, categories):
+        if self.categories_path is None:
+            return
+        write_pickle({"key": self._categories_key(), "categories": categories}, str(self.categories_path) + ".tmp")
+        os.replace(str(self.categories_path) + ".tmp", self.categories_path)
 
     def unique_actions_from_taxonomy(self, action_taxonomy, unique_actions, child_to_upper_level, upper_acts,
                                      upper_level=None):
@@ -82,6 +137,10 @@ class ActionClassifier:
                 _logger.warning("KeyError: " + str(e))
         if len(sims) == 0:
             return "None"
+        return self._most_similar(sims, upper_level_sims, child_to_upper_level)
+
+    @staticmethod
+    def _most_similar(sims, upper_level_sims, child_to_upper_level):
         max_sim = max(sims.items(), key=operator.itemgetter(1))[0]
         max_sim_upper = max(upper_level_sims.items(), key=operator.itemgetter(1))[0]
         max_sim_upper_ini = str(max_sim_upper)
@@ -0,0 +1,140 @@
+import io
+import json
+import logging
+import os
+from os.path import exists
+
+import numpy as np
+from numpy.lib import format as npy_format
+
+_logger = logging.getLogger(__name__)
+
+
+def to_numpy(embedding):
+    """
+    Converts an embedding (torch tensor or array-like) into a numpy array
+    """
+    if hasattr(embedding, "detach"):
+        return embedding.detach().cpu().numpy()
+    return np.asarray(embedding)
+
+
+class EmbeddingStore:
+    """
+    Append-only, persistent store of sentence embeddings. The embeddings are the rows of a .npy matrix that is
+    memory-mapped on first access, the index file holds one json-encoded sentence per line (line i belongs to row i).
+    Loading only reads the index, adding sentences appends rows and lines without rewriting existing data.
+    """
+
+    def __init__(self, path, index_path, dtype=np.float32):
+        self.path = path
+        self.index_path = index_path
+        self.dtype = np.dtype(dtype)
+        # Maps a sentence to its row in the matrix
+        self.index = {}
+        self._matrix = None
+        if exists(self.index_path):
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                for row, line in enumerate(f):
+                    self.index[json.loads(line)] = row
+        self._check_consistency()
+        _logger.info("Loaded index of %d known embeddings" % len(self.index))
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, sentence):
+        return sentence in self.index
+
+    def __getitem__(self, sentence):
+        return np.array(self.matrix[self.index[sentence]])
+
+    @property
+    def matrix(self):
+        if self._matrix is None:
+            self._matrix = np.load(self.path, mmap_mode="r")
+        return self._matrix
+
+    def get_matrix(self, sentences):
+        """
+        Gathers the embeddings of the given (known) sentences into a new matrix, one row per sentence
+        """
+        return np.asarray(self.matrix[[self.index[sentence] for sentence in sentences]])
+
+    def add(self, sentences, embeddings):
+        """
+        Appends the embeddings of all sentences that are not known yet
+        """
+        new_rows = {}
+        for sentence, embedding in zip(sentences, embeddings):
+            if sentence not in self.index and sentence not in new_rows:
+                new_rows[sentence] = to_numpy(embedding)
+        if len(new_rows) == 0:
+            return
+        self._append_rows(np.stack(list(new_rows.values())).astype(self.dtype))
+        with open(self.index_path, "a", encoding="utf-8") as f:
+            for sentence in new_rows:
+                f.write(json.dumps(sentence) + "\n")
+                self.index[sentence] = len(self.index)
+
+    def _read_header(self):
+        with open(self.path, "rb") as f:
+            npy_format.read_magic(f)
+            shape, _, dtype = npy_format.read_array_header_1_0(f)
+            return shape, dtype, f.tell()
+
+    def _header(self, shape):
+        header = io.BytesIO()
+        npy_format.write_array_header_1_0(header, {"descr": npy_format.dtype_to_descr(self.dtype),
+                                                   "fortran_order": False, "shape": shape})
+        return header.getvalue()
+
+    def _append_rows(self, rows):
+        self._matrix = None
+        if not exists(self.path):
+            np.save(self.path, rows)
+            return
+        shape, dtype, offset = self._read_header()
+        if dtype != self.dtype or shape[1] != rows.shape[1]:
+            raise ValueError("Embeddings of shape %s and type %s cannot be added to a store of shape %s and type %s"
+                             % (rows.shape, self.dtype, shape, dtype))
+        header = self._header((shape[0] + len(rows), shape[1]))
+        if len(header) != offset:
+            # the header does not fit anymore (should not happen as numpy reserves space for growing shapes)
+            _logger.warning("Rewriting embedding store %s" % self.path)
+            np.save(self.path, np.concatenate([np.load(self.path), rows]))
+            return
+        with open(self.path, "r+b") as f:
+            # rows after the ones the header counts are left overs of an interrupted add and are overwritten
+            f.seek(offset + shape[0] * shape[1] * self.dtype.itemsize)
+            f.write(rows.tobytes())
+            f.truncate()
+            f.seek(0)
+            f.write(header)
+
+    def _check_consistency(self):
+        """
+        Drops rows (or index entries) that were written by an interrupted add
+        """
+        if not exists(self.path):
+            if len(self.index) > 0:
+                self.index = {}
+                open(self.index_path, "w").close()
+            return
+        shape, _, offset = self._read_header()
+        size = offset + min(shape[0], len(self.index)) * shape[1] * self.dtype.itemsize
+        if shape[0] <= len(self.index) and os.path.getsize(self.path) > size:
+            # rows written by an add that was interrupted before the header was updated
+            _logger.warning("Dropping rows of an interrupted add from embedding store %s" % self.path)
+            with open(self.path, "r+b") as f:
+                f.truncate(size)
+        if shape[0] > len(self.index):
+            _logger.warning("Truncating embedding store %s to %d rows" % (self.path, len(self.index)))
+            with open(self.path, "r+b") as f:
+                f.write(self._header((len(self.index), shape[1])))
+                f.truncate(offset + len(self.index) * shape[1] * self.dtype.itemsize)
+        elif shape[0] < len(self.index):
+            self.index = {sentence: row for sentence, row in self.index.items() if row < shape[0]}
+            with open(self.index_path, "w", encoding="utf-8") as f:
+                for sentence in self.index:
+                    f.write(json.dumps(sentence) + "\n")
@@ -1,26 +1,24 @@
-import itertools
 import logging
-import multiprocessing
+import os
 import random
 import re
 import time
+from importlib.metadata import PackageNotFoundError, version
 from itertools import chain
 from os.path import exists
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
-import gensim.downloader as api
-from nltk.corpus import wordnet
-from sentence_transformers import SentenceTransformer, util
-from tqdm import tqdm
-import torch.multiprocessing as mp
 
 from semconstmining.mining.model.parsed_label import ParsedLabel
-from semconstmining.parsing.label_parser.bert_wrapper import BertWrapper
-from semconstmining.parsing.label_parser.bert_for_label_parsing import BertForLabelParsing
+from semconstmining.parsing.label_parser.embedding_store import EmbeddingStore
+from semconstmining.parsing.label_parser.verb_neighbours import top_neighbours, unit_rows
+from semconstmining.parsing.label_parser.word_analyses import WordAnalyses
 
 from semconstmining.config import Config
 from semconstmining.util.io import read_pickle, write_pickle
+from semconstmining.util.stage_cache import fingerprint
 
 _logger = logging.getLogger(__name__)
 
@@ -28,6 +26,9 @@ NON_ALPHANUM = re.compile('[^a-zA-Z]')
 CAMEL_PATTERN_1 = re.compile('(.)([A-Z][a-z]+)')
 CAMEL_PATTERN_2 = re.compile('([a-z0-9])([A-Z])')
 
+# Tags of the tokens that are actions
+ACTION_TAGS = ['A', 'ASTATE', 'BOSTATE']
+
 
 def sanitize_label(label):
     # handle some special cases
@@ -61,6 +62,20 @@ def split_label(label):
     return result
 
 
+def _package_version(package):
+    try:
+        return version(package)
+    except PackageNotFoundError:
+        return None
+
+
+def _verbs_of(analysis):
+    """
+    The lemmas of the verb tokens of a word analysis.
+    """
+    return {lemma for lemma, pos, tag in analysis if tag.startswith("VB")}
+
+
 def camel_to_white(label):
     label = CAMEL_PATTERN_1.sub(r'\1 \2', label)
     return CAMEL_PATTERN_2.sub(r'\1 \2', label)
@@ -75,29 +90,33 @@ class NlpHelper:
         self.model_id_to_unique_name = {}
         self.model_id_to_name = {}
         self.config = config
-        self.model = BertWrapper.load_serialized(config.MODEL_PATH, BertForLabelParsing)
+        # The models and stores are loaded on first use (see the properties below), the time each load took is kept
+        self.load_times = {}
+        self._model = None
+        self._nlp = None
+        self._glove_embeddings = None
+        self._word_analyses = None
+        self._embedding_store = None
         self.parse_map = {}
-        import spacy
-        self.nlp = spacy.load(self.config.SPACY_MODEL)
-        self.glove_embeddings = api.load(self.config.WORD_EMBEDDINGS)
+        # Persistent store of the parsed labels (split, tags, objects and actions per sanitized label), shared by all
+        # model collections, it is discarded when the parsing model changes
+        self.parsed_labels_path = self.config.DATA_INTERIM / self.config.PARSED_LABELS
+        self.parser_fingerprint = (fingerprint(self.config.MODEL_PATH), self.config.PARSER_QUANTIZE)
+        self._parsed_labels = None
+        self._parsed_labels_changed = False
+        # Pipes of the spaCy model that analyzing single words does not need (set when the model is loaded)
+        self.word_pipes_disabled = None
         # reference to the sentence model used (default SentenceTransformer)
         self._sent_model = None
-        self.known_embedding_map_ser = self.config.DATA_INTERIM / \
-                                       (self.config.MODEL_COLLECTION + "_" + self.config.EMB_MAP)
-        self.knowm_sim_ser = self.config.DATA_INTERIM / \
-                             (self.config.MODEL_COLLECTION + "_" + self.config.SIM_MAP)
         self.known_labels = dict()
         self.known_objects = dict()
         self.known_resources = dict()
-        self.known_embeddings = {} if not exists(self.known_embedding_map_ser) else read_pickle(
-            self.known_embedding_map_ser)
-        # Maps pairs of labels to their similarity
-        self.known_sims = {} if not exists(self.knowm_sim_ser) else read_pickle(self.knowm_sim_ser)
-        _logger.info("Loaded %d known embeddings and %d known similarities" % (len(self.known_embeddings),
-                                                                               len(self.known_sims)))
         # Maps a (partial) label to its synonyms
         self.synonym_map = {}
-        self.similar_actions = {}
+        # Persistent table of the similar actions per action (see get_similar_actions_bulk)
+        self._similar_actions = None
+        self._similar_actions_changed = False
+        self._verb_vocabulary = None
 
     def check_tok_for_object_type(self, split, pred):
         new_pred = []
@@ -111,17 +130,58 @@ class NlpHelper:
         return new_pred
 
     def parse_label(self, label, print_outcome=False):
-        label = sanitize_label(label)
-        if label in self.parse_map:
-            return self.parse_map[label]
-        split, tags = self.predict_single_label(label)
-        result = ParsedLabel(self.config, label, split, tags, self.find_objects(split, tags),
-                             self.find_actions(split, tags, lemmatize=True), self.config.LANGUAGE)
+        result = self.parse_labels_bulk([label], save=False)[0]
         if print_outcome:
-            print(label, ", act:", result.actions, ", bos:", result.bos, ', tags:', tags)
-        self.parse_map[label] = result
+            print(result.label, ", act:", result.actions, ", bos:", result.bos, ', tags:', result.tags)
         return result
 
+    def parse_labels_bulk(self, labels, save=True):
+        """
+        Parses the given labels. The labels that were not parsed before are tagged in one batch, and the actions of
+        all of them are lemmatized with one pass of spaCy. Their results are added to the store of parsed labels.
+
+        :param labels: the (raw) labels
+        :param save: whether the store of parsed labels is saved if it changed
+        :return: the parsed labels, in the order of the labels
+        """
+        sanitized = [sanitize_label(label) for label in labels]
+        unknown = []
+        for label in dict.fromkeys(sanitized):
+            if label in self.parse_map:
+                continue
+            if label in self.parsed_labels:
+                self.parse_map[label] = self._to_parsed_label(label)
+            else:
+                unknown.append(label)
+        if len(unknown) > 0:
+            _logger.info("Parsing %d labels" % len(unknown))
+            splits = [split_label(label) for label in unknown]
+            tags = self.model.predict(splits)[0]
+            words = list(dict.fromkeys(tok for split, label_tags in zip(splits, tags)
+                                       for tok, tag in zip(split, label_tags) if tag in ACTION_TAGS))
+            actions = dict(zip(words, self.transform_actions_w2v(words)))
+            for label, split, label_tags in zip(unknown, splits, tags):
+                label_actions = [actions[tok] for tok, tag in zip(split, label_tags) if tag in ACTION_TAGS]
+                self.parsed_labels[label] = (split, label_tags, self.find_objects(split, label_tags), label_actions)
+                self.parse_map[label] = self._to_parsed_label(label)
+            self._parsed_labels_changed = True
+        if save:
+            self.save_parsed_labels()
+            self.save_word_analyses()
+        return [self.parse_map[label] for label in sanitized]
+
+    def _to_parsed_label(self, label):
+        split, tags, objects, actions = self.parsed_labels[label]
+        return ParsedLabel(self.config, label, split, tags, objects, actions, self.config.LANGUAGE)
+
+    def save_parsed_labels(self):
+        if not self._parsed_labels_changed:
+            return
+        write_pickle({"parser": self.parser_fingerprint, "labels": self.parsed_labels},
+                     str(self.parsed_labels_path) + ".tmp")
+        os.replace(str(self.parsed_labels_path) + ".tmp", self.parsed_labels_path)
+        self._parsed_labels_changed = False
+
     def parse_labels(self, splits: list) -> list:
         processed = self.model.predict(splits)
         tagged_list = []
@@ -150,18 +210,39 @@ class NlpHelper:
 
     def find_actions(self, split, tags, lemmatize=False):
         return [self.transform_action_w2v(tok) if lemmatize else
-                tok for tok, a in zip(split, tags) if a in ['A', 'ASTATE', 'BOSTATE']]
+                tok for tok, a in zip(split, tags) if a in ACTION_TAGS]
 
     def split_and_lemmatize_label(self, label):
         words = split_label(label)
+        self.analyze_words([w for w in words if len(w) > 0])
         lemmas = [self.lemmatize_word(w) for w in words]
         return lemmas
 
+    def save_word_analyses(self):
+        if self._word_analyses is not None:
+            self._word_analyses.save()
+
+    def analyze_words(self, words):
+        """
+        Analyzes every word on its own. The words that were not analyzed before are run through spaCy's pipe in
+        batches, their analyses are added to the (persistent) table of word analyses.
+
+        :param words: the words
+        :return: per word, the (lemma, POS, tag) of each of its tokens
+        """
+        unknown = [word for word in dict.fromkeys(words) if word not in self.word_analyses]
+        if len(unknown) > 0:
+            for word, doc in zip(unknown, self.nlp.pipe(unknown, batch_size=self.config.WORD_ANALYSES_BATCH_SIZE,
+                                                        disable=self.word_pipes_disabled)):
+                self.word_analyses.put(word, tuple((token.lemma_, token.pos_, token.tag_) for token in doc))
+        res = [self.word_analyses.get(word) for word in words]
+        self.word_analyses.evict()
+        return res
+
     def lemmatize_word(self, word):
         if len(word) == 0:
             return word
-        doc = self.nlp(word)
-        lemma = doc[0].lemma_
+        lemma = self.analyze_words([word])[0][0][0]
         lemma = re.sub('ise$', 'ize', lemma)
         return lemma
 
@@ -173,8 +254,7 @@ class NlpHelper:
         return token1.similarity(token2)
 
     def check_propn(self, tok):
-        doc = self.nlp(tok)
-        pos = [tok.pos_ for tok in doc]
+        pos = [pos for lemma, pos, tag in self.analyze_words([tok])[0]]
         if all(p == 'PROPN' for p in pos):
             return True
         else:
@@ -182,11 +262,7 @@ class NlpHelper:
 
     def transform_action_w2v(self, word):
         word = word.lower()
-        doc = self.nlp(word)
-        present_tense_verbs = set()
-        for token in doc:
-            if token.tag_.startswith("VB"):
-                present_tense_verbs.add(token.lemma_)
+        present_tense_verbs = _verbs_of(self.analyze_words([word])[0])
         # if not present_tense_verbs:
         #     related_verbs = list()
         #     if word in self.glove_embeddings.key_to_index:
@@ -200,22 +276,195 @@ class NlpHelper:
         #         # present_tense_verbs.update(tok.lemma_ for tok in doc if tok.tag_.startswith("VB"))
         #         if len(present_tense_verbs) > 0:
         #             break
+        return self._action_of(word, present_tense_verbs)
+
+    def transform_actions_w2v(self, words):
+        """
+        Same as transform_action_w2v for several words, which are analyzed in bulk.
+        """
+        words = [word.lower() for word in words]
+        return [self._action_of(word, _verbs_of(analysis))
+                for word, analysis in zip(words, self.analyze_words(words))]
+
+    @staticmethod
+    def _action_of(word, present_tense_verbs):
         if present_tense_verbs:
             return " ".join(present_tense_verbs)
         else:
             print(f"Could not find a verb for {word}")
             return word
 
+    def _timed_load(self, resource, load):
+        start = time.time()
+        loaded = load()
+        self.load_times[resource] = time.time() - start
+        _logger.info("Loaded %s in %.2f seconds" % (resource, self.load_times[resource]))
+        return loaded
+
+    def get_load_report(self):
+        """
+        Lists the resources loaded so far with the seconds their loading took, in order of loading.
+        """
+        lines = ["%s: %.2f s" % (resource, seconds) for resource, seconds in self.load_times.items()]
+        lines.append("total: %.2f s" % sum(self.load_times.values()))
+        return "\n".join(lines)
+
+    @property
+    def model(self):
+        if self._model is None:
+            self._model = self._timed_load("label parser", self._load_model)
+        return self._model
+
+    def _load_model(self):
+        from semconstmining.parsing.label_parser.bert_wrapper import BertWrapper
+        from semconstmining.parsing.label_parser.bert_for_label_parsing import BertForLabelParsing
+        model = BertWrapper.load_serialized(self.config.MODEL_PATH, BertForLabelParsing)
+        if self.config.PARSER_CPU_INFERENCE:
+            model.enable_cpu_inference(quantize=self.config.PARSER_QUANTIZE, num_threads=self.config.PARSER_THREADS)
+        return model
+
+    @property
+    def nlp(self):
+        if self._nlp is None:
+            import spacy
+            self._nlp = self._timed_load("spaCy model", lambda: spacy.load(self.config.SPACY_MODEL))
+            self.word_pipes_disabled = [name for name in ("parser", "ner") if name in self._nlp.pipe_names]
+        return self._nlp
+
+    @property
+    def glove_embeddings(self):
+        if self._glove_embeddings is None:
+            self._glove_embeddings = self._timed_load("word embeddings", self._load_glove_embeddings)
+        return self._glove_embeddings
+
+    def _load_glove_embeddings(self):
+        """
+        Memory-maps the word embeddings from GLOVE_PATH. If they are not there yet, they are downloaded once and
+        saved there.
+        """
+        from gensim.models import KeyedVectors
+        if exists(self.config.GLOVE_PATH):
+            return KeyedVectors.load(str(self.config.GLOVE_PATH), mmap="r")
+        import gensim.downloader as api
+        _logger.info("Downloading %s to %s" % (self.config.WORD_EMBEDDINGS, self.config.GLOVE_PATH))
+        embeddings = api.load(self.config.WORD_EMBEDDINGS)
+        os.makedirs(os.path.dirname(self.config.GLOVE_PATH), exist_ok=True)
+        embeddings.save(str(self.config.GLOVE_PATH))
+        return KeyedVectors.load(str(self.config.GLOVE_PATH), mmap="r")
+
+    @property
+    def similar_actions(self):
+        if self._similar_actions is None:
+            self._similar_actions = self._timed_load("similar actions", self._load_similar_actions)
+        return self._similar_actions
+
+    def _similar_actions_key(self):
+        return (self.config.WORD_EMBEDDINGS, self.config.SPACY_MODEL, _package_version(self.config.SPACY_MODEL),
+                self.config.SIMILAR_ACTIONS_TOP_N, self.config.SIMILAR_ACTIONS_THRESHOLD)
+
+    def _load_similar_actions(self):
+        path = self.config.DATA_INTERIM / self.config.SIMILAR_ACTIONS
+        if exists(path):
+            stored = read_pickle(path)
+            if stored["key"] == self._similar_actions_key():
+                return stored["actions"]
+        return {}
+
+    @property
+    def verb_vocabulary(self):
+        """
+        The words of the word embeddings that are verbs, as their (sorted) rows in the embeddings, their vectors
+        scaled to unit length and the lemmas of their verb tokens. It is built once and kept in VERB_VOCABULARY.
+        """
+        if self._verb_vocabulary is None:
+            self._verb_vocabulary = self._timed_load("verb vocabulary", self._load_verb_vocabulary)
+        return self._verb_vocabulary
+
+    def _load_verb_vocabulary(self):
+        path = self.config.DATA_INTERIM / self.config.VERB_VOCABULARY
+        key = (self.config.WORD_EMBEDDINGS, self.config.SPACY_MODEL, _package_version(self.config.SPACY_MODEL))
+        stored = read_pickle(path) if exists(path) else None
+        if stored is None or stored["key"] != key:
+            stored = dict(self._build_verb_vocabulary(), key=key)
+            write_pickle(stored, str(path) + ".tmp")
+            os.replace(str(path) + ".tmp", path)
+        embeddings = self.glove_embeddings
+        embeddings.fill_norms()
+        ids = stored["ids"]
+        return ids, unit_rows(embeddings.vectors[ids], embeddings.norms[ids]), stored["lemmas"]
+
+    def _build_verb_vocabulary(self):
+        """
+        Analyzes every word of the word embeddings on its own, like analyze_words (but without keeping the
+        analyses), and keeps the words with verb tokens.
+        """
+        words = self.glove_embeddings.index_to_key
+        _logger.info("Building the verb vocabulary of %d words" % len(words))
+        ids = []
+        lemmas = []
+        for i, doc in enumerate(self.nlp.pipe(words, batch_size=self.config.WORD_ANALYSES_BATCH_SIZE,
+                                              disable=self.word_pipes_disabled)):
+            verbs = _verbs_of([(token.lemma_, token.pos_, token.tag_) for token in doc])
+            if len(verbs) > 0:
+                ids.append(i)
+                lemmas.append(tuple(sorted(verbs)))
+        return {"ids": np.array(ids, dtype=np.int64), "lemmas": lemmas}
+
+    @property
+    def parsed_labels(self):
+        if self._parsed_labels is None:
+            self._parsed_labels = self._timed_load("parsed labels", self._load_parsed_labels)
+        return self._parsed_labels
+
+    def _load_parsed_labels(self):
+        if exists(self.parsed_labels_path):
+            stored = read_pickle(self.parsed_labels_path)
+            if stored["parser"] == self.parser_fingerprint:
+                return stored["labels"]
+        return {}
+
+    @property
+    def word_analyses(self):
+        if self._word_analyses is None:
+            self._word_analyses = self._timed_load("word analyses", lambda: WordAnalyses(
+                self.config.DATA_INTERIM / self.config.WORD_ANALYSES,
+                model=(self.config.SPACY_MODEL, _package_version(self.config.SPACY_MODEL)),
+                max_entries=self.config.WORD_ANALYSES_MAX_ENTRIES))
+        return self._word_analyses
+
+    @property
+    def embedding_store(self):
+        if self._embedding_store is None:
+            self._embedding_store = self._timed_load("embedding store", self._load_embedding_store)
+        return self._embedding_store
+
+    def _load_embedding_store(self):
+        # Persistent store of the sentence embeddings, similarities are computed on demand from it
+        embedding_store = EmbeddingStore(
+            self.config.DATA_INTERIM / (self.config.MODEL_COLLECTION + "_" + self.config.EMB_STORE),
+            self.config.DATA_INTERIM / (self.config.MODEL_COLLECTION + "_" + self.config.EMB_STORE_INDEX),
+            dtype=self.config.EMB_STORE_DTYPE)
+        legacy_embedding_map_ser = self.config.DATA_INTERIM / \
+                                   (self.config.MODEL_COLLECTION + "_" + self.config.EMB_MAP)
+        if len(embedding_store) == 0 and exists(legacy_embedding_map_ser):
+            _logger.info("Importing known embeddings from %s" % legacy_embedding_map_ser)
+            legacy_embeddings = read_pickle(legacy_embedding_map_ser)
+            embedding_store.add(list(legacy_embeddings.keys()), list(legacy_embeddings.values()))
+        return embedding_store
+
     @property
     def sent_model(self):
         if self._sent_model is None:
-            self._sent_model = SentenceTransformer(self.config.DATA_ROOT / self.config.SENTENCE_TRANSFORMER)
+            from sentence_transformers import SentenceTransformer
+            self._sent_model = self._timed_load("sentence transformer", lambda: SentenceTransformer(
+                self.config.DATA_ROOT / self.config.SENTENCE_TRANSFORMER))
         return self._sent_model
 
     def get_synonyms(self, verb):
         lemma = self.lemmatize_word(verb)
         if lemma in self.synonym_map:
             return self.synonym_map[lemma]
+        from nltk.corpus import wordnet
         synsets = wordnet.synsets(lemma)
         synonyms = set(chain.from_iterable([word.lemma_names() for word in synsets]))
         synonyms.add(lemma)
@@ -223,51 +472,87 @@ class NlpHelper:
         return synonyms
 
     def get_similar_actions(self, act):
-        if act in self.similar_actions:
-            return self.similar_actions[act]
-        try:
-            related_words = self.glove_embeddings.most_similar(act, topn=100)
-        except KeyError:
-            return set()
-        related_words = set([w for w, score in related_words if score > 0.8])
-        similar_actions = set()
-        for verb in related_words:
-            doc = self.nlp(verb)
-            for tok in doc:
-                if tok.tag_.startswith("VB"):
-                    similar_actions.add(tok.lemma_)
-        self.similar_actions[act] = similar_actions
-        return similar_actions
+        return self.get_similar_actions_bulk([act])[0]
+
+    def get_similar_actions_bulk(self, acts, save=False):
+        """
+        Returns, per action, the verbs among its SIMILAR_ACTIONS_TOP_N nearest verbs in the word embeddings whose
+        similarity exceeds SIMILAR_ACTIONS_THRESHOLD. The results are kept in the (persistent) table of similar
+        actions, the neighbours of the actions missing there are computed together against the verb vocabulary.
+
+        :param acts: the actions
+        :param save: whether the table of similar actions is saved if it changed
+        :return: the sets of similar actions, in the order of the actions
+        """
+        missing = [act for act in dict.fromkeys(acts) if act not in self.similar_actions]
+        if len(missing) > 0:
+            embeddings = self.glove_embeddings
+            known = [act for act in missing if act in embeddings.key_to_index]
+            for act in missing:
+                self.similar_actions[act] = set()
+            if len(known) > 0:
+                verb_ids, verb_vectors, verb_lemmas = self.verb_vocabulary
+                embeddings.fill_norms()
+                act_ids = np.array([embeddings.key_to_index[act] for act in known])
+                # an action is not a neighbour of itself
+                positions = np.minimum(np.searchsorted(verb_ids, act_ids), max(len(verb_ids) - 1, 0))
+                exclude = np.where(verb_ids[positions] == act_ids, positions, -1) if len(verb_ids) > 0 else None
+                neighbours = top_neighbours(unit_rows(embeddings.vectors[act_ids], embeddings.norms[act_ids]),
+                                            verb_vectors, self.config.SIMILAR_ACTIONS_TOP_N,
+                                            self.config.SIMILAR_ACTIONS_THRESHOLD, exclude=exclude,
+                                            batch_size=self.config.GLOVE_NEIGHBOUR_BATCH_SIZE)
+                for act, rows in zip(known, neighbours):
+                    self.similar_actions[act] = set(chain.from_iterable(verb_lemmas[row] for row in rows))
+            self._similar_actions_changed = True
+        if save:
+            self.save_similar_actions()
+        return [self.similar_actions[act] for act in acts]
+
+    def save_similar_actions(self):
+        if not self._similar_actions_changed:
+            return
+        path = self.config.DATA_INTERIM / self.config.SIMILAR_ACTIONS
+        write_pickle({"key": self._similar_actions_key(), "actions": self._similar_actions}, str(path) + ".tmp")
+        os.replace(str(path) + ".tmp", path)
+        self._similar_actions_changed = False
 
     def get_sims(self, unique_combinations):
-        known_scores = [self.known_sims[combi]
-                        for combi in unique_combinations if combi in self.known_sims]
-        if len(known_scores) == len(unique_combinations):
-            return known_scores
-        sentences1 = [combi[0] for combi in unique_combinations if combi not in self.known_sims]
-        sentences2 = [combi[1] for combi in unique_combinations if combi not in self.known_sims]
-
-        if len(sentences1 + known_scores) < 1:
+        """
+        Computes the cosine similarity of each pair of sentences from the stored embeddings
+        :param unique_combinations: the pairs of sentences
+        :return: the similarities, in the order of the pairs
+        """
+        if len(unique_combinations) < 1:
             return []
-        # Compute embedding for both lists
-        sims = []
-        if len(sentences1) > 0:
-            embeddings1 = [self.known_embeddings[sent] if sent in self.known_embeddings else
-                           self.sent_model.encode(sent, convert_to_tensor=True, show_progress_bar=True)
-                           for sent in sentences1]
-            embeddings2 = [self.known_embeddings[sent] if sent in self.known_embeddings else
-                           self.sent_model.encode(sent, convert_to_tensor=True, show_progress_bar=True)
-                           for sent in sentences2]
-            # Compute cosine-similarities
-            cosine_scores = [float(util.cos_sim(embedding1, embedding2)) for embedding1, embedding2 in
-                             zip(embeddings1, embeddings2)]
-            for i, _ in enumerate(sentences1):
-                self.known_sims[(sentences1[i], sentences2[i])] = float(cosine_scores[i])
-            sims = [float(cosine_scores[i]) for i in range(len(sentences1))]
-        return sims + known_scores
-
-    def store_sims(self):
-        write_pickle(self.known_sims, self.knowm_sim_ser)
+        left = self.embedding_matrix([combi[0] for combi in unique_combinations])
+        right = self.embedding_matrix([combi[1] for combi in unique_combinations])
+        return np.einsum("ij,ij->i", left, right).tolist()
+
+    def embedding_matrix(self, terms):
+        """
+        Stacks the embeddings of the given terms into a contiguous, row-normalized float32 matrix
+        :param terms: the terms, embeddings that are not known yet are computed in one batch
+        :return: a matrix with one row per term
+        """
+        self.pre_compute_embeddings(terms)
+        matrix = self.embedding_store.get_matrix(terms).astype(np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return np.ascontiguousarray(matrix / np.maximum(norms, 1e-12))
+
+    def similarity_matrix(self, left_terms, right_terms):
+        """
+        Computes the cosine similarities between all left and all right terms with a single matrix product
+        :param left_terms: the terms corresponding to the rows of the matrix
+        :param right_terms: the terms corresponding to the columns of the matrix
+        :return: the similarity matrix and two dicts mapping each left term to its row and each right term to its column
+        """
+        row_index = {term: i for i, term in enumerate(dict.fromkeys(left_terms))}
+        col_index = {term: i for i, term in enumerate(dict.fromkeys(right_terms))}
+        if len(row_index) == 0 or len(col_index) == 0:
+            return np.zeros((len(row_index), len(col_index)), dtype=np.float32), row_index, col_index
+        left = self.embedding_matrix(list(row_index.keys()))
+        right = self.embedding_matrix(list(col_index.keys()))
+        return left @ right.T, row_index, col_index
 
     def prepare_labels(self, row):
         model_ids = [x.strip() for x in row[self.config.MODEL_ID].split("|")]
@@ -303,7 +588,7 @@ class NlpHelper:
         return [action for action in unique_actions if not pd.isna(action)
                 and action not in self.config.TERMS_FOR_MISSING]
 
-    def precompute_embeddings_and_sims(self, resource_handler, sims=False):
+    def precompute_embeddings(self, resource_handler):
         self.model_id_to_unique_labels = {
             model_id: [elm for elm in group[self.config.CLEANED_LABEL].dropna().unique() if elm != ''] for
             model_id, group in
@@ -320,105 +605,19 @@ class NlpHelper:
                         resources])
         # remove empty strings
         elements = [element for element in elements if element != ""]
-        # compute embeddings for all elements
-        embeddings = self.sent_model.encode(elements, convert_to_tensor=True, show_progress_bar=True)
-
-        self.known_embeddings = {element: embedding for element, embedding in zip(elements, embeddings)}
+        # compute embeddings for all elements, similarities are computed on demand from the embedding store
+        self.pre_compute_embeddings(elements)
         _logger.info("Number of elements: {}".format(len(elements)))
-        if sims:
-            # compute similarities between all labels across different models
-            label_pairs = set()
-
-            # Iterate over pairs of model IDs
-            for model_id1, model_id2 in itertools.combinations(self.model_id_to_unique_labels.keys(), 2):
-                labels1 = self.model_id_to_unique_labels[model_id1]
-                labels2 = self.model_id_to_unique_labels[model_id2]
-                # Compute the Cartesian product of the labels
-                label_product = itertools.product(labels1, labels2)
-                # Filter out redundant pairs and pairs with the same label
-                unique_pairs = {(label1, label2) for label1, label2 in label_product if label1 != label2}
-                new_pairs = unique_pairs - label_pairs
-                # Add the new pairs to the set of label pairs
-                label_pairs |= new_pairs
-            _logger.info("Number of label pairs: {}".format(len(label_pairs)))
-            label_pairs = list(label_pairs)
-            # compute similarities between all objects across different models
-            # sizeof the em
-            object_pairs = set()
-            # Iterate over pairs of model IDs
-            for model_id1, model_id2 in itertools.combinations(self.model_id_to_unique_objects.keys(), 2):
-                objects1 = self.model_id_to_unique_objects[model_id1]
-                objects2 = self.model_id_to_unique_objects[model_id2]
-                # Compute the Cartesian product of the objects
-                object_product = itertools.product(objects1, objects2)
-                # Filter out redundant pairs and pairs with the same object
-                unique_pairs = {(object1, object2) for object1, object2 in object_product if object1 != object2}
-                new_pairs = unique_pairs - object_pairs
-                # Add the new pairs to the set of object pairs
-                object_pairs |= new_pairs
-            _logger.info("Number of object pairs: {}".format(len(object_pairs)))
-            object_pairs = list(object_pairs)
-            # compute similarities between all resources across different models
-            resource_pairs = set()
-            # Iterate over pairs of model IDs
-            for model_id1, model_id2 in itertools.combinations(self.model_id_to_unique_resources.keys(), 2):
-                resources1 = self.model_id_to_unique_resources[model_id1]
-                resources2 = self.model_id_to_unique_resources[model_id2]
-                # Compute the Cartesian product of the resources
-                resource_product = itertools.product(resources1, resources2)
-                # Filter out redundant pairs and pairs with the same resource
-                unique_pairs = {(resource1, resource2) for resource1, resource2 in resource_product if
-                                resource1 != resource2}
-                new_pairs = unique_pairs - resource_pairs
-                # Add the new pairs to the set of resource pairs
-                resource_pairs |= new_pairs
-            _logger.info("Number of resource pairs: {}".format(len(resource_pairs)))
-            self.compute_sims_multi_processing(label_pairs)
-            self.compute_sims_multi_processing(object_pairs)
-            self.compute_sims_multi_processing(resource_pairs)
-            self.store_sims()
 
     def pre_compute_embeddings(self, sentences):
         """
-        Pre-computes the embeddings for all natural language components
+        Pre-computes the embeddings for all natural language components that are not in the embedding store yet
         :param sentences: the sentences to pre-compute embeddings for
         """
-        self.known_embeddings |= {sent: embedding for sent, embedding in
-                                  zip(sentences, self.sent_model.encode(sentences, convert_to_tensor=True,
-                                                                        show_progress_bar=True)) if
-                                  sent not in self.known_embeddings}
-
-    def compute_sims(self, params):
-        embeddings1 = [self.known_embeddings[sent] for sent in params[0]]
-        embeddings2 = [self.known_embeddings[sent] for sent in params[1]]
-        cosine_scores = [float(util.cos_sim(embedding1, embedding2)) for embedding1, embedding2 in
-                         zip(embeddings1, embeddings2)]
-        return cosine_scores
-
-    def compute_sims_multi_processing(self, params):
-        sentences1 = [combi[0] for combi in params]
-        sentences2 = [combi[1] for combi in params]
-        num_sentences = len(sentences1)
-        # Split the sentences into equal parts
-        batch_size = 70000
-        sentence_batches = [(sentences1[i:i + batch_size], sentences2[i:i + batch_size])
-                            for i in range(0, num_sentences, batch_size)]
-
-        # Compute cosine-similarities
-        from concurrent.futures import ProcessPoolExecutor
-        num_processes = multiprocessing.cpu_count() - 10
-        _logger.info("Number of processes: {}".format(num_processes))
-        mp.set_start_method('spawn')
-        with ProcessPoolExecutor(max_workers=num_processes) as executor:
-            futures = []
-            for batch in tqdm(sentence_batches):
-                futures.append(executor.submit(self.compute_sims, batch))
-            _logger.info("Number of futures: {}".format(len(futures)))
-            for future in tqdm(futures):
-                cosine_scores = future.result()
-                for batch in sentence_batches:
-                    for i, _ in enumerate(batch[0]):
-                        self.known_sims[(batch[0][i], batch[1][i])] = float(cosine_scores[i])
+        missing = list(dict.fromkeys(sent for sent in sentences if sent not in self.embedding_store))
+        if len(missing) > 0:
+            self.embedding_store.add(missing, self.sent_model.encode(missing, convert_to_numpy=True,
+                                                                     show_progress_bar=True))
 
     def replace_stuff(self, x):
         res = x[self.config.NAT_LANG_TEMPLATE].replace("{1}", x[self.config.LEFT_OPERAND]) if x[
@@ -441,6 +640,7 @@ class NlpHelper:
         # Two parameters to tune:
         # min_cluster_size: Only consider cluster that have at least 25 elements
         # threshold: Consider sentence pairs with a cosine-similarity larger than threshold as similar
+        from sentence_transformers import util
         clusters = util.community_detection(corpus_embeddings, min_community_size=50,
                                             threshold=0.6)
 
@@ -467,6 +667,7 @@ class NlpHelper:
         # Two parameters to tune:
         # min_cluster_size: Only consider cluster that have at least 25 elements
         # threshold: Consider sentence pairs with a cosine-similarity larger than threshold as similar
+        from sentence_transformers import util
         clusters = util.community_detection(corpus_embeddings, min_community_size=1000, threshold=0.75)
 
         _logger.info("Clustering done after {:.2f} sec".format(time.time() - start_time))
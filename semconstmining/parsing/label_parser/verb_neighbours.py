@@ -0,0 +1,41 @@
+import logging
+
+import numpy as np
+
+_logger = logging.getLogger(__name__)
+
+
+def unit_rows(vectors, norms=None):
+    """
+    Scales the rows of the matrix to unit length (rows of length 0 stay 0).
+
+    :param norms: the lengths of the rows if known
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if norms is None:
+        norms = np.linalg.norm(vectors, axis=1)
+    norms = np.asarray(norms, dtype=np.float32)
+    return vectors / np.where(norms > 0, norms, 1)[:, None]
+
+
+def top_neighbours(queries, candidates, topn, threshold, exclude=None, batch_size=64):
+    """
+    Finds the topn nearest candidates (by cosine similarity) of every query whose similarity exceeds the threshold.
+    The similarities are computed block-wise, batch_size queries at a time, as products with the candidate matrix.
+
+    :param queries: the query vectors as rows, scaled to unit length
+    :param candidates: the candidate vectors as rows, scaled to unit length
+    :param exclude: per query, the candidate to skip (e.g., the query itself), -1 for none
+    :return: per query, the array of its neighbours' rows in the candidate matrix
+    """
+    topn = min(topn, len(candidates))
+    res = []
+    for start in range(0, len(queries), batch_size):
+        sims = candidates @ queries[start:start + batch_size].T
+        for col in range(sims.shape[1]):
+            col_sims = sims[:, col]
+            if exclude is not None and exclude[start + col] >= 0:
+                col_sims[exclude[start + col]] = -np.inf
+            top = np.argpartition(-col_sims, topn - 1)[:topn] if topn > 0 else np.empty(0, dtype=np.int64)
+            res.append(top[col_sims[top] > threshold])
+    return res
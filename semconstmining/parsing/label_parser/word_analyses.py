@@ -0,0 +1,58 @@
+import logging
+import os
+from collections import OrderedDict
+from os.path import exists
+
+from semconstmining.util.io import read_pickle, write_pickle
+
+_logger = logging.getLogger(__name__)
+
+
+class WordAnalyses:
+    """
+    Persistent table of the spaCy analyses of single words, i.e., the (lemma, POS, tag) of each token of a word
+    analyzed on its own. The table belongs to a spaCy model, it is discarded when the model changes. The entries are
+    kept in order of their last access, the least recently used ones are evicted once the table exceeds its maximal
+    number of entries.
+    """
+
+    def __init__(self, path=None, model=None, max_entries=None):
+        self.path = path
+        self.model = model
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        if path is not None and exists(path):
+            stored = read_pickle(path)
+            if stored["model"] == model:
+                self.entries = stored["words"]
+                _logger.info("Loaded %d word analyses" % len(self.entries))
+        self._changed = False
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, word):
+        return word in self.entries
+
+    def get(self, word):
+        self.entries.move_to_end(word)
+        return self.entries[word]
+
+    def put(self, word, analysis):
+        self.entries[word] = analysis
+        self._changed = True
+
+    def evict(self):
+        if self.max_entries is not None:
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def save(self):
+        """
+        Writes the table to its file if it changed since it was loaded or saved.
+        """
+        if self.path is None or not self._changed:
+            return
+        write_pickle({"model": self.model, "words": self.entries}, str(self.path) + ".tmp")
+        os.replace(str(self.path) + ".tmp", self.path)
+        self._changed = False
@@ -2,8 +2,8 @@ import gc
 import json
 import logging
 import os
-import signal
 import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from copy import deepcopy
 from os.path import exists
 
@@ -34,6 +34,23 @@ def _get_json_from_row(row_tuple):
     return json.loads(row_tuple.model_json)
 
 
+# State of a log generation worker process, set once by _init_worker
+_worker_converter = None
+_worker_elements = None
+
+
+def _init_worker(config, model_elements):
+    global _worker_converter, _worker_elements
+    _worker_converter = Model2LogConverter(config)
+    _worker_elements = model_elements
+
+
+def _generate_chunk_logs(i, num_chunks, df):
+    loops_before = _worker_converter.loop_counter
+    _worker_converter.generate_chunk_logs(i, num_chunks, df, _worker_elements)
+    return _worker_converter.loop_counter - loops_before
+
+
 class Model2LogConverter:
 
     def __init__(self, config):
@@ -42,28 +59,40 @@ class Model2LogConverter:
         self.done = 0
         self.loop_counter = 0
 
-    def alarm_handler(self, signum, frame):
-        raise Exception("timeout")
-
     def generate_logs_lambda(self, df_petri, model_elements):
+        """
+        Checks the soundness of the Petri nets and plays out the sound ones. The nets are processed in chunks,
+        possibly by a pool of worker processes, each chunk is checkpointed in PETRI_LOGS_DIR such that an
+        interrupted run resumes with the chunks that are missing. The checkpoints are named by the number of chunks
+        as well, those of a split into a different number of chunks are not picked up.
+        """
         elms = model_elements.set_index(self.config.ELEMENT_ID_BACKUP)
         df_petri["sound"] = False
         df_petri["log"] = None
-        df_results = []
         if len(df_petri) > 1000:
-            split_df = np.array_split(df_petri, 100)
+            split_df = [df_petri.iloc[positions] for positions in
+                        np.array_split(np.arange(len(df_petri)), self.config.LOG_GENERATION_CHUNKS)]
         else:
             split_df = [df_petri]
+        os.makedirs(self.config.PETRI_LOGS_DIR, exist_ok=True)
+        missing = [i for i in range(len(split_df)) if not exists(self.chunk_file(i, len(split_df)))]
+        _logger.info(str(len(split_df) - len(missing)) + " of " + str(len(split_df)) + " chunks already done.")
+        workers = self.config.LOG_GENERATION_WORKERS or os.cpu_count()
+        df_results = {}
         start = time.time()
-        for i, df in enumerate(split_df):
-            file_name = "no_" + str(i) + self.config.LOGS_SER_FILE
-            if exists(self.config.PETRI_LOGS_DIR / file_name):
-                df = pd.read_pickle(self.config.PETRI_LOGS_DIR / file_name)
-            else:
-                df[self.config.SOUND] = df.apply(lambda x: self.soundness_check(x), axis=1)
-                df[self.config.LOG] = df.apply(lambda x: self.log_creation_check(x, elms), axis=1)
-                df.to_pickle(self.config.PETRI_LOGS_DIR / file_name)
-            df_results.append(df)
+        if workers > 1 and len(missing) > 1:
+            with ProcessPoolExecutor(max_workers=min(workers, len(missing)), initializer=_init_worker,
+                                     initargs=(self.config, elms)) as executor:
+                futures = {executor.submit(_generate_chunk_logs, i, len(split_df), split_df[i]): i for i in missing}
+                for done, future in enumerate(as_completed(futures)):
+                    self.loop_counter += future.result()
+                    _logger.info("Chunk " + str(futures[future]) + " done (" + str(done + 1) + " of " +
+                                 str(len(missing)) + ").")
+        else:
+            for i in missing:
+                df_results[i] = self.generate_chunk_logs(i, len(split_df), split_df[i], elms)
+        df_results = [df_results[i] if i in df_results else pd.read_pickle(self.chunk_file(i, len(split_df)))
+                      for i in range(len(split_df))]
         stop = time.time()
         completed_in = round(stop - start, 2)
         _logger.info("with loops " + str(self.loop_counter))
@@ -71,6 +100,18 @@ class Model2LogConverter:
         _logger.info("PPID %s Completed in %s" % (os.getpid(), completed_in))
         return pd.concat(df_results)
 
+    def chunk_file(self, i, num_chunks):
+        return self.config.PETRI_LOGS_DIR / ("no_" + str(i) + "_of_" + str(num_chunks) + self.config.LOGS_SER_FILE)
+
+    def generate_chunk_logs(self, i, num_chunks, df, elms):
+        df[self.config.SOUND] = df.apply(lambda x: self.soundness_check(x), axis=1)
+        df[self.config.LOG] = df.apply(lambda x: self.log_creation_check(x, elms), axis=1)
+        # the checkpoint only appears once it is completely written
+        tmp_file = str(self.chunk_file(i, num_chunks)) + ".tmp"
+        df.to_pickle(tmp_file)
+        os.replace(tmp_file, self.chunk_file(i, num_chunks))
+        return df
+
     def soundness_check(self, row):
         if row.pn:
             _logger.info("Soundness check. " + str(row.model_id) + "; Number " + str(self.done))
@@ -165,26 +206,28 @@ class Model2LogConverter:
                     already_counted_loop = True
         return variant_log
 
+    def play_out(self, net, im, fm, model_elements):
+        log = pm4py.play_out(net, im, fm, variant=Variants.EXTENSIVE)
+        self.replace_attributes(log, model_elements)
+        variant_log = self.create_variant_log(log)
+        if not self.config.LOOPS:
+            return create_log_without_loops(variant_log)
+        return variant_log
+
     def log_creation_check(self, row, model_elements):
         played_out_log = None
         if row.sound:
             start = time.time()
-            signal.signal(signal.SIGALRM, self.alarm_handler)
-            signal.alarm(self.config.TIMEOUT)
+            # the timeout is enforced by a thread, hence it also works outside the main thread of the main process
             try:
                 net, im, fm = row.pn
-                log = pm4py.play_out(net, im, fm, variant=Variants.EXTENSIVE)
-                played_out_log = self.replace_attributes(log, model_elements)
-                variant_log = self.create_variant_log(log)
-                if not self.config.LOOPS:
-                    played_out_log = create_log_without_loops(variant_log)
-                else:
-                    played_out_log = variant_log
+                played_out_log = func_timeout(self.config.TIMEOUT, self.play_out, args=(net, im, fm, model_elements))
+            except FunctionTimedOut:
+                _logger.warning("Time out during play-out.")
             except Exception as ex:
                 _logger.warning(str(ex))
                 _logger.warning(ex)
             finally:
-                signal.alarm(0)
                 stop = time.time()
                 completed_in = round(stop - start, 2)
                 if completed_in > 1.5 * self.config.TIMEOUT:
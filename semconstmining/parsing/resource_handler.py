@@ -1,7 +1,6 @@
 import logging
 import os
 import warnings
-from os.path import exists
 import pandas as pd
 from tqdm import tqdm
 import json
@@ -13,13 +12,21 @@ from semconstmining.parsing import parser
 from semconstmining.parsing import detector
 from semconstmining.parsing.components import Components
 from semconstmining.parsing.model_to_log import Model2LogConverter
-from semconstmining.util.io import read_pickle, write_pickle
+from semconstmining.util.stage_cache import StageCache, fingerprint
 
 warnings.simplefilter('ignore')
 warnings.filterwarnings("ignore", category=DeprecationWarning)
 
 _logger = logging.getLogger(__name__)
 
+# Names of the cached pipeline stages
+ELEMENTS_STAGE = "bpmn_elements"
+LANGUAGES_STAGE = "bpmn_languages"
+MODELS_STAGE = "bpmn_models"
+LOGS_STAGE = "bpmn_logs"
+TAGGED_STAGE = "bpmn_tagged"
+COMPONENTS_STAGE = "components"
+
 
 class ResourceHandler:
     """
@@ -39,6 +46,11 @@ class ResourceHandler:
         self.tagged_ser_file = config.DATA_INTERIM / (self.config.MODEL_COLLECTION + "_" + config.TAGGED_SER_FILE)
         self.comp_ser_file = config.DATA_INTERIM / (self.config.MODEL_COLLECTION + "_" + config.COMPONENTS_SER_FILE)
         self.dictionary_ser_file = config.DATA_DATASET_DICT
+        self.stage_cache = StageCache(config.STAGE_CACHE_DIR, code_version=config.STAGE_CACHE_CODE_VERSION,
+                                      max_bytes=config.STAGE_CACHE_MAX_BYTES,
+                                      adopt_legacy=config.STAGE_CACHE_ADOPT_LEGACY)
+        # How the current model elements were derived, i.e., the digests of the artifacts merged into them
+        self.elements_lineage = []
         self.bpmn_model_elements = None
         self.bpmn_models = None
         self.model_languages = None
@@ -63,6 +75,15 @@ class ResourceHandler:
             }
         return self.filter_options
 
+    def cached_stage(self, stage, compute, legacy_path=None, dependencies=(), config_fields=(), **params):
+        """
+        This method returns the artifact of a pipeline stage from the stage cache, it is computed if there is no
+        artifact for the current model elements, upstream artifacts, parameters, and config fields.
+        """
+        stage_key = self.stage_cache.stage(stage, params=dict(params, elements=self.elements_lineage),
+                                           dependencies=dependencies, config=self.config, config_fields=config_fields)
+        return self.stage_cache.get_or_compute(stage_key, compute, legacy_path=legacy_path)
+
     def get_parsed_task(self, t1):
         """
         This method returns the parsed label for a given label.
@@ -107,16 +128,20 @@ class ResourceHandler:
 
     def load_bpmn_model_elements(self):
         """
-        This method loads the model elements from the pickle file or parses them if the file does not exist.
+        This method loads the model elements from the stage cache or parses them if the model collection changed.
         """
-        if exists(self.config.DATA_INTERIM / self.elements_ser_file):
-            _logger.info("Loading elements from " + str(self.config.DATA_INTERIM / self.elements_ser_file) + ".")
-            self.bpmn_model_elements = pd.read_pickle(self.config.DATA_INTERIM / self.elements_ser_file)
-        else:
-            self.bpmn_model_elements = self.data_parser.parse_model_elements()
-            self.bpmn_model_elements[self.config.CLEANED_LABEL] = self.bpmn_model_elements[self.config.LABEL].apply(
+        def parse_model_elements():
+            elements = self.data_parser.parse_model_elements()
+            elements[self.config.CLEANED_LABEL] = elements[self.config.LABEL].apply(
                 lambda x: nlp_helper.sanitize_label(str(x or '')))
-            self.bpmn_model_elements.to_pickle(self.config.DATA_INTERIM / self.elements_ser_file)
+            return elements
+
+        self.elements_lineage = []
+        self.bpmn_model_elements = self.cached_stage(ELEMENTS_STAGE, parse_model_elements,
+                                                     legacy_path=self.elements_ser_file,
+                                                     config_fields=("MODEL_COLLECTION",),
+                                                     dataset=fingerprint(self.config.DATA_DATASET))
+        self.elements_lineage = [self.stage_cache.digest(ELEMENTS_STAGE)]
         self.referenced_data_objects = set(self.bpmn_model_elements[self.config.DATA_OBJECT].explode().unique())
         _logger.info("There are " + str(len(self.referenced_data_objects)) + " referenced data objects.")
         _logger.info("These have " + str(len(self.get_names_of_data_objects())) + " unique names.")
@@ -149,58 +174,54 @@ class ResourceHandler:
 
     def load_bpmn_models(self):
         """
-        This method loads the models from the pickle file or parses them if the file does not exist.
+        This method loads the models from the stage cache or parses them if the model elements changed.
         """
-        if exists(self.config.DATA_INTERIM / self.models_ser_file):
-            _logger.info("Loading models from " + str(self.config.DATA_INTERIM / self.models_ser_file) + ".")
-            self.bpmn_models = pd.read_pickle(self.config.DATA_INTERIM / self.models_ser_file)
-        else:
-            self.bpmn_models = self.data_parser.parse_models(filter_df=self.bpmn_model_elements)
-            self.bpmn_models[self.config.NAME] = self.bpmn_models[self.config.NAME].astype(str)
-            _logger.info("Remove example models from " + str(len(self.bpmn_models)))
+        def parse_models():
+            bpmn_models = self.data_parser.parse_models(filter_df=self.bpmn_model_elements)
+            bpmn_models[self.config.NAME] = bpmn_models[self.config.NAME].astype(str)
+            _logger.info("Remove example models from " + str(len(bpmn_models)))
             pattern = '|'.join(self.config.EXAMPLE_MODEL_NAMES)
-            df_no_example = self.bpmn_models[~self.bpmn_models[self.config.NAME].str.contains(pattern)]
-            df_example = self.bpmn_models[self.bpmn_models[self.config.NAME].str.contains(pattern)].drop_duplicates(
+            df_no_example = bpmn_models[~bpmn_models[self.config.NAME].str.contains(pattern)]
+            df_example = bpmn_models[bpmn_models[self.config.NAME].str.contains(pattern)].drop_duplicates(
                 subset=[self.config.NAME])
-            self.bpmn_models = pd.concat([df_example, df_no_example])
-            _logger.info(str(len(self.bpmn_models)) + " models remaining")
-            self.bpmn_models.to_pickle(self.config.DATA_INTERIM / self.models_ser_file)
+            bpmn_models = pd.concat([df_example, df_no_example])
+            _logger.info(str(len(bpmn_models)) + " models remaining")
+            return bpmn_models
+
+        self.bpmn_models = self.cached_stage(MODELS_STAGE, parse_models, legacy_path=self.models_ser_file,
+                                             config_fields=("EXAMPLE_MODEL_NAMES",))
 
     def determine_model_languages(self):
         """
         This method determines the natural language of the models.
         """
-        if exists(self.config.DATA_INTERIM / self.languages_ser_file):
-            _logger.info("Loading detected languages.")
-            self.model_languages = pd.read_pickle(self.config.DATA_INTERIM / self.languages_ser_file)
-            if self.config.DETECTED_NAT_LANG not in self.bpmn_model_elements.columns:
-                self.bpmn_model_elements = pd.merge(self.bpmn_model_elements, self.model_languages, how="left",
-                                                    on=self.config.MODEL_ID)
-                self.bpmn_model_elements.to_pickle(self.config.DATA_INTERIM / self.languages_ser_file)
-        else:
+        def detect_languages():
             _logger.info("Detect languages.")
             ld = detector.ModelLanguageDetector(self.config, 0.8)
-            self.model_languages = ld.get_detected_natural_language_from_bpmn_model(self.bpmn_model_elements)
-            self.model_languages.to_pickle(self.config.DATA_INTERIM / self.languages_ser_file)
-            if self.config.DETECTED_NAT_LANG not in self.bpmn_model_elements.columns:
-                self.bpmn_model_elements = pd.merge(self.bpmn_model_elements, self.model_languages, how="left",
-                                                    on=self.config.MODEL_ID)
-                self.bpmn_model_elements.to_pickle(self.config.DATA_INTERIM / self.elements_ser_file)
+            return ld.get_detected_natural_language_from_bpmn_model(self.bpmn_model_elements)
+
+        self.model_languages = self.cached_stage(LANGUAGES_STAGE, detect_languages,
+                                                 legacy_path=self.languages_ser_file, config_fields=("SPACY_MODEL",))
+        if self.config.DETECTED_NAT_LANG not in self.bpmn_model_elements.columns:
+            self.bpmn_model_elements = pd.merge(self.bpmn_model_elements, self.model_languages, how="left",
+                                                on=self.config.MODEL_ID)
+        self.elements_lineage.append(self.stage_cache.digest(LANGUAGES_STAGE))
 
     def get_logs_for_sound_models(self):
         """
         This method returns the logs for the sound models.
         """
-        # Parse and convert the JSON-BPMNs to Petri nets
-        if exists(self.config.DATA_INTERIM / self.logs_ser_file):
-            self.bpmn_logs = pd.read_pickle(self.config.DATA_INTERIM / self.logs_ser_file)
-        else:
+        def generate_logs():
+            # Parse and convert the JSON-BPMNs to Petri nets
             df_petri = self.model_to_log_converter.convert_models_to_pn_df(self.bpmn_models)
-            self.bpmn_logs = self.model_to_log_converter.generate_logs_lambda(df_petri, self.bpmn_model_elements)
-            self.bpmn_logs.to_pickle(self.config.DATA_INTERIM / self.logs_ser_file)
+            bpmn_logs = self.model_to_log_converter.generate_logs_lambda(df_petri, self.bpmn_model_elements)
             for (dir_path, dir_names, filenames) in os.walk(self.config.PETRI_LOGS_DIR):
                 for filename in filenames:
                     os.remove(dir_path + "/" + filename)
+            return bpmn_logs
+
+        self.bpmn_logs = self.cached_stage(LOGS_STAGE, generate_logs, legacy_path=self.logs_ser_file,
+                                           dependencies=(MODELS_STAGE,), config_fields=("LOOPS", "TIMEOUT"))
         _logger.info("Number of available logs: " + str(len(self.bpmn_logs[self.bpmn_logs[self.config.LOG].notna()])))
         _logger.info("Number of available models: " + str(len(self.bpmn_logs)))
         return
@@ -209,14 +230,7 @@ class ResourceHandler:
         """
         This method tags the labels of the tasks. It extracts actions and objects from the labels.
         """
-        if exists(self.config.DATA_INTERIM / self.tagged_ser_file):
-            _logger.info("Loading tagged labels.")
-            self.bpmn_task_labels = pd.read_pickle(self.config.DATA_INTERIM / self.tagged_ser_file)
-            if self.config.SPLIT_LABEL not in self.bpmn_model_elements.columns:
-                self.bpmn_model_elements = pd.merge(self.bpmn_model_elements, self.bpmn_task_labels, how='left',
-                                                    on=self.config.CLEANED_LABEL)
-                self.bpmn_model_elements.to_pickle(self.config.DATA_INTERIM / self.elements_ser_file)
-        else:
+        def tag_labels():
             _logger.info("Start tagging labels.")
             all_labs = list(
                 self.bpmn_model_elements[(self.bpmn_model_elements[self.config.ELEMENT_CATEGORY] == "Task")][
@@ -224,14 +238,17 @@ class ResourceHandler:
             _logger.info(str(len(all_labs)) + " labels cleaned. " + "Start parsing.")
             all_labs_split = [nlp_helper.split_label(lab) for lab in tqdm(all_labs)]
             tagged = self.nlp_helper.parse_labels(all_labs_split)
-            self.bpmn_task_labels = pd.DataFrame(
+            return pd.DataFrame(
                 {self.config.CLEANED_LABEL: all_labs, self.config.SPLIT_LABEL: all_labs_split, "tags": tagged,
                  "lang": ["english" for _ in range(len(all_labs))]})
-            self.bpmn_task_labels.to_pickle(self.config.DATA_INTERIM / self.tagged_ser_file)
-            if self.config.SPLIT_LABEL not in self.bpmn_model_elements.columns:
-                self.bpmn_model_elements = pd.merge(self.bpmn_model_elements, self.bpmn_task_labels, how='left',
-                                                    on=self.config.CLEANED_LABEL)
-                self.bpmn_model_elements.to_pickle(self.config.DATA_INTERIM / self.elements_ser_file)
+
+        self.bpmn_task_labels = self.cached_stage(TAGGED_STAGE, tag_labels, legacy_path=self.tagged_ser_file,
+                                                  config_fields=("PARSER_QUANTIZE",),
+                                                  tagging_model=fingerprint(self.config.MODEL_PATH))
+        if self.config.SPLIT_LABEL not in self.bpmn_model_elements.columns:
+            self.bpmn_model_elements = pd.merge(self.bpmn_model_elements, self.bpmn_task_labels, how='left',
+                                                on=self.config.CLEANED_LABEL)
+        self.elements_lineage.append(self.stage_cache.digest(TAGGED_STAGE))
         _logger.info("We have " + str(len(self.bpmn_task_labels)) + " labels.")
 
     def filter_only_english(self):
@@ -241,6 +258,7 @@ class ResourceHandler:
         _logger.info("Filtering for english labels.")
         self.bpmn_model_elements = self.bpmn_model_elements[self.bpmn_model_elements[self.config.DETECTED_NAT_LANG]
                                                             == self.config.EN]
+        self.elements_lineage.append("only_english")
 
     def load_dictionary_if_exists(self):
         """
@@ -255,7 +273,7 @@ class ResourceHandler:
             if self.config.DICTIONARY not in self.bpmn_model_elements.columns:
                 self.bpmn_model_elements[self.config.DICTIONARY] = self.bpmn_model_elements[self.config.GLOSSARY].apply(
                     lambda x: self.get_entries_from_dict(x))
-                self.bpmn_model_elements.to_pickle(self.config.DATA_INTERIM / self.elements_ser_file)
+                self.elements_lineage.append(fingerprint(paths[-1]))
             for entries in self.bpmn_model_elements[self.config.DICTIONARY]:
                 self.components.referenced_dict_entries.update(entries)
             self.dictionary[self.config.IS_REFERENCED] = \
@@ -268,11 +286,12 @@ class ResourceHandler:
         This method loads important components, i.e., actions, objects, referenced dictionary entries,
         data objects, and parsed labels, if they have been processed, otherwise creates and saves them.
         """
-        if exists(self.config.DATA_INTERIM / self.comp_ser_file):
-            self.components = read_pickle(self.config.DATA_INTERIM / self.comp_ser_file)
-        else:
+        def create_components():
             self.handle_all_actions_and_objects()
-            write_pickle(self.components, self.config.DATA_INTERIM / self.comp_ser_file)
+            return self.components
+
+        self.components = self.cached_stage(COMPONENTS_STAGE, create_components, legacy_path=self.comp_ser_file,
+                                            config_fields=("TERMS_FOR_MISSING", "SPACY_MODEL", "WORD_EMBEDDINGS"))
 
     def get_entries_from_dict(self, glossary_entries):
         """
@@ -284,8 +303,13 @@ class ResourceHandler:
         return entries
 
     def handle_all_actions_and_objects(self):
-        for index, row in self.bpmn_model_elements[
-            (~self.bpmn_model_elements[self.config.SPLIT_LABEL].isna())].iterrows():
+        parsed_elements = self.bpmn_model_elements[(~self.bpmn_model_elements[self.config.SPLIT_LABEL].isna())]
+        # the actions of all labels that were not parsed before are lemmatized in bulk
+        unparsed = ~parsed_elements[self.config.CLEANED_LABEL].isin(self.components.parsed_tasks.keys())
+        self.nlp_helper.analyze_words(list({tok.lower() for split, tags in zip(
+            parsed_elements[unparsed][self.config.SPLIT_LABEL], parsed_elements[unparsed][self.config.TAGS])
+                                            for tok, tag in zip(split, tags) if tag in nlp_helper.ACTION_TAGS}))
+        for index, row in parsed_elements.iterrows():
             if row[self.config.CLEANED_LABEL] in self.components.parsed_tasks:
                 parsed = self.components.parsed_tasks[row[self.config.CLEANED_LABEL]]
             else:
@@ -306,12 +330,16 @@ class ResourceHandler:
                 self.components.parsed_tasks[row[self.config.CLEANED_LABEL]] = parsed
             self.components.add_action(row[self.config.MODEL_ID], parsed.main_action)
             self.components.add_object(row[self.config.MODEL_ID], parsed.main_object)
+        self.nlp_helper.save_word_analyses()
+        # the similar actions of all actions are computed (and kept) up front
+        self.nlp_helper.get_similar_actions_bulk(list(self.components.all_actions), save=True)
         self.categorize_actions()
         _logger.info("Handled main components")
 
     def categorize_actions(self):
+        categories_path = self.config.DATA_INTERIM / self.config.ACTION_CATEGORIES_TABLE
         action_classifier = ActionClassifier(self.config, self.components.all_actions,
-                                             self.nlp_helper.glove_embeddings)
+                                             self.nlp_helper.glove_embeddings, categories_path=categories_path)
         self.components.action_to_category = action_classifier.classify_actions()
         for label in self.components.parsed_tasks:
             if label not in self.components.action_to_category:
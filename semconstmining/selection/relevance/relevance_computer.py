@@ -1,10 +1,11 @@
-import itertools
 import logging
 import pickle
 from os.path import exists
 
 import pandas as pd
 
+from semconstmining.selection.relevance.similarity_index import SimilarityIndex
+
 _logger = logging.getLogger(__name__)
 
 
@@ -16,6 +17,8 @@ class RelevanceComputer:
         self.sims = {}
         self.log_info = log_info
         self.counter = 0
+        # Maps an action to the log action it matches (see get_action_table)
+        self.action_table = None
 
     def compute_relevance(self, constraints, pre_compute=False, store_sims=False):
         _logger.info(f"Computing relevance for {len(constraints)} constraints")
@@ -51,7 +54,6 @@ class RelevanceComputer:
         constraints = constraints[~constraints[self.config.INDIVIDUAL_RELEVANCE_SCORES].isna()]
         constraints[self.config.SEMANTIC_BASED_RELEVANCE] = constraints.apply(lambda row: self.get_max_scores(row),
                                                                               axis=1)
-        # self.nlp_helper.store_sims()
         return constraints
     
     def _compute_relevance(self, level, left_op, right_op, obj):
@@ -82,36 +84,39 @@ class RelevanceComputer:
         
     def get_relevance_for_object_constraint(self, obj, left_op, right_op):
         object_sims = {self.config.OBJECT: {}, self.config.ACTION: {}}
-        for ext in self.log_info.objects:
-            combi = [(obj, ext)]
-            object_sims[self.config.OBJECT][ext] = self.nlp_helper.get_sims(combi)[0]
-        for ext in self.log_info.actions:
-            synonyms = self.nlp_helper.get_synonyms(ext)
-            similar_actions = self.nlp_helper.get_similar_actions(ext)
-            if left_op is not None and left_op not in self.config.TERMS_FOR_MISSING:
-                if left_op in synonyms or left_op in similar_actions:
-                    object_sims[self.config.ACTION][left_op] = ext
-            if right_op is not None and right_op not in self.config.TERMS_FOR_MISSING:
-                if right_op in synonyms or right_op in similar_actions:
-                    object_sims[self.config.ACTION][right_op] = ext
+        object_sims[self.config.OBJECT] = self.get_sims(self.config.OBJECT, obj, self.log_info.objects)
+        action_table = self.get_action_table()
+        for op in (left_op, right_op):
+            if op is not None and op not in self.config.TERMS_FOR_MISSING and op in action_table:
+                object_sims[self.config.ACTION][op] = action_table[op]
         return object_sims
 
+    def get_action_table(self):
+        """
+        Maps every action that is a synonym or a similar action of a log action to that log action (to the last
+        one in the log's order if there are several). The synonyms and similar actions of all log actions are
+        computed once per log, in bulk.
+        """
+        if self.action_table is None:
+            log_actions = list(self.log_info.actions)
+            self.nlp_helper.analyze_words([ext for ext in dict.fromkeys(log_actions) if len(ext) > 0])
+            self.action_table = {}
+            similar = self.nlp_helper.get_similar_actions_bulk(log_actions, save=True)
+            for ext, similar_actions in zip(log_actions, similar):
+                for action in self.nlp_helper.get_synonyms(ext) | similar_actions:
+                    self.action_table[action] = ext
+            _logger.info("Matched %d actions to %d log actions" % (len(self.action_table), len(log_actions)))
+        return self.action_table
+
     def get_relevance_for_object_constraint_row(self, row):
         object_sims = {self.config.OBJECT: {}, self.config.ACTION: {}}
         for ext in self.log_info.objects:
             combi = [(row[self.config.OBJECT], ext)]
             object_sims[self.config.OBJECT][ext] = self.nlp_helper.get_sims(combi)[0]
-        for ext in self.log_info.actions:
-            synonyms = self.nlp_helper.get_synonyms(ext)
-            similar_actions = self.nlp_helper.get_similar_actions(ext)
-            if not pd.isna(row[self.config.LEFT_OPERAND]) and not row[
-                                                                      self.config.LEFT_OPERAND] in self.config.TERMS_FOR_MISSING:
-                if row[self.config.LEFT_OPERAND] in synonyms or row[self.config.LEFT_OPERAND] in similar_actions:
-                    object_sims[self.config.ACTION][row[self.config.LEFT_OPERAND]] = ext
-            if not pd.isna(row[self.config.RIGHT_OPERAND]) and not row[
-                                                                       self.config.RIGHT_OPERAND] in self.config.TERMS_FOR_MISSING:
-                if row[self.config.RIGHT_OPERAND] in synonyms or row[self.config.RIGHT_OPERAND] in similar_actions:
-                    object_sims[self.config.ACTION][row[self.config.RIGHT_OPERAND]] = ext
+        action_table = self.get_action_table()
+        for op in (row[self.config.LEFT_OPERAND], row[self.config.RIGHT_OPERAND]):
+            if not pd.isna(op) and op not in self.config.TERMS_FOR_MISSING and op in action_table:
+                object_sims[self.config.ACTION][op] = action_table[op]
         return object_sims
     
     def get_relevance_for_multi_object_constraint(self, left_op, right_op):
@@ -121,13 +126,11 @@ class RelevanceComputer:
         if right_op is not None and not right_op in self.config.TERMS_FOR_MISSING:
             object_sims[self.config.RIGHT_OPERAND] = {}
 
-        for ext in self.log_info.objects:
-            if self.config.LEFT_OPERAND in object_sims:
-                combi = [(left_op, ext)]
-                object_sims[self.config.LEFT_OPERAND][ext] = self.nlp_helper.get_sims(combi)[0]
-            if self.config.RIGHT_OPERAND in object_sims:
-                combi = [(right_op, ext)]
-                object_sims[self.config.RIGHT_OPERAND][ext] = self.nlp_helper.get_sims(combi)[0]
+        if self.config.LEFT_OPERAND in object_sims:
+            object_sims[self.config.LEFT_OPERAND] = self.get_sims(self.config.OBJECT, left_op, self.log_info.objects)
+        if self.config.RIGHT_OPERAND in object_sims:
+            object_sims[self.config.RIGHT_OPERAND] = self.get_sims(self.config.OBJECT, right_op,
+                                                                   self.log_info.objects)
         return object_sims
 
     def get_relevance_for_multi_object_constraint_row(self, row):
@@ -153,13 +156,10 @@ class RelevanceComputer:
             label_sims[self.config.LEFT_OPERAND] = {}
         if right_op is not None and not right_op in self.config.TERMS_FOR_MISSING:
             label_sims[self.config.RIGHT_OPERAND] = {}
-        for ext in self.log_info.labels:
-            if self.config.LEFT_OPERAND in label_sims:
-                combi = [(left_op, ext)]
-                label_sims[self.config.LEFT_OPERAND][ext] = self.nlp_helper.get_sims(combi)[0]
-            if self.config.RIGHT_OPERAND in label_sims:
-                combi = [(right_op, ext)]
-                label_sims[self.config.RIGHT_OPERAND][ext] = self.nlp_helper.get_sims(combi)[0]
+        if self.config.LEFT_OPERAND in label_sims:
+            label_sims[self.config.LEFT_OPERAND] = self.get_sims(self.config.ACTIVITY, left_op, self.log_info.labels)
+        if self.config.RIGHT_OPERAND in label_sims:
+            label_sims[self.config.RIGHT_OPERAND] = self.get_sims(self.config.ACTIVITY, right_op, self.log_info.labels)
         return label_sims
     
     def get_relevance_for_activity_constraint_row(self, row):
@@ -183,13 +183,10 @@ class RelevanceComputer:
         label_sims = {self.config.LEFT_OPERAND: {}, self.config.RESOURCE: {}}
         if left_op is not None and not left_op in self.config.TERMS_FOR_MISSING:
             label_sims[self.config.LEFT_OPERAND] = {}
-        for ext in self.log_info.labels:
-            if self.config.LEFT_OPERAND in label_sims:
-                combi = [(left_op, ext)]
-                label_sims[self.config.LEFT_OPERAND][ext] = self.nlp_helper.get_sims(combi)[0]
-        for ext in self.log_info.resources_to_tasks:
-            combi = [(obj, ext)]
-            label_sims[self.config.RESOURCE][ext] = self.nlp_helper.get_sims(combi)[0]
+        if self.config.LEFT_OPERAND in label_sims:
+            label_sims[self.config.LEFT_OPERAND] = self.get_sims(self.config.ACTIVITY, left_op, self.log_info.labels)
+        label_sims[self.config.RESOURCE] = self.get_sims(self.config.RESOURCE, obj,
+                                                         list(self.log_info.resources_to_tasks.keys()))
         return label_sims
 
     def get_relevance_for_resource_constraint_row(self, row):
@@ -236,13 +233,60 @@ class RelevanceComputer:
         labels = list(set(labels))
         resources = list(
             constraints[constraints[self.config.LEVEL] == self.config.RESOURCE][self.config.OBJECT].dropna().unique())
-        object_combis = [(x, y) for x, y in itertools.product(objects, self.log_info.objects) if x != y]
-        label_combis = [(x, y) for x, y in itertools.product(labels, self.log_info.labels) if x != y]
-        resource_combis = [(x, y) for x, y in itertools.product(resources, self.log_info.resources_to_tasks) if x != y]
-        _logger.info(
-            "Precomputing similarities for {} object combinations, {} label combinations and {} resource combinations".format(
-                len(object_combis), len(label_combis), len(resource_combis)))
-        sims = self.nlp_helper.get_sims(object_combis)
-        sims += self.nlp_helper.get_sims(label_combis)
-        sims += self.nlp_helper.get_sims(resource_combis)
-        return {x: y for x, y in zip(object_combis + label_combis + resource_combis, sims)}
+        _logger.info("Precomputing similarities for {} objects, {} labels and {} resources".format(
+            len(objects), len(labels), len(resources)))
+        return {self.config.OBJECT: self.neighbour_sims(self.config.OBJECT, objects, self.log_info.objects),
+                self.config.ACTIVITY: self.neighbour_sims(self.config.ACTIVITY, labels, self.log_info.labels),
+                self.config.RESOURCE: self.neighbour_sims(self.config.RESOURCE, resources,
+                                                          list(self.log_info.resources_to_tasks.keys()))}
+
+    def get_similarity_index(self, kind, terms):
+        """
+        Returns the similarity index over the constraint operands of the given kind. The index is stored per model
+        collection and only rebuilt if it misses some of the terms.
+        """
+        return SimilarityIndex.load_or_build(
+            self.config.DATA_INTERIM / (self.config.MODEL_COLLECTION + "_" + kind + "_" + self.config.SIM_INDEX),
+            terms, self.nlp_helper.embedding_matrix)
+
+    def neighbour_sims(self, kind, terms, log_terms):
+        """
+        Maps every term to a dict holding its similarity to the log terms it is a neighbour of. Instead of comparing
+        all terms to all log terms, each log term is looked up in the similarity index of the constraint operands.
+        """
+        sims = {term: {} for term in terms}
+        log_terms = list(dict.fromkeys(log_terms))
+        if len(sims) == 0 or len(log_terms) == 0:
+            return sims
+        index = self.get_similarity_index(kind, list(sims.keys()))
+        query_ids, term_ids, values = index.search(self.nlp_helper.embedding_matrix(log_terms),
+                                                   threshold=self.config.SIM_INDEX_THRESHOLD,
+                                                   top_k=self.config.SIM_INDEX_TOP_K,
+                                                   n_probe=self.config.SIM_INDEX_N_PROBE)
+        for query_id, term_id, value in zip(query_ids.tolist(), term_ids.tolist(), values.tolist()):
+            term = index.terms[term_id]
+            if term in sims:
+                sims[term][log_terms[query_id]] = value
+        return sims
+
+    def sims_per_term(self, terms, log_terms):
+        """
+        Maps every term to a dict holding its similarity to each of the log terms that reaches the similarity
+        threshold. All similarities are computed as one similarity matrix, whose rows are turned into the dicts.
+        """
+        matrix, row_index, col_index = self.nlp_helper.similarity_matrix(terms, log_terms)
+        log_terms = list(col_index.keys())
+        threshold = self.config.SIM_INDEX_THRESHOLD
+        return {term: {log_term: sim for log_term, sim in zip(log_terms, matrix[row].tolist())
+                       if threshold is None or sim >= threshold}
+                for term, row in row_index.items()}
+
+    def get_sims(self, kind, term, log_terms):
+        """
+        Returns a fresh dict holding the similarities of the term to the log terms, similarities of terms that
+        were not precomputed are computed on demand.
+        """
+        sims = self.sims.setdefault(kind, {})
+        if term not in sims:
+            sims |= self.sims_per_term([term], log_terms)
+        return sims[term].copy()
@@ -0,0 +1,142 @@
+import logging
+from os.path import exists
+
+import numpy as np
+
+_logger = logging.getLogger(__name__)
+
+
+def normalize_rows(matrix):
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return np.ascontiguousarray(matrix / np.maximum(norms, 1e-12))
+
+
+class SimilarityIndex:
+    """
+    Approximate nearest-neighbour index (inverted file) over term embeddings for cosine similarity. The embeddings
+    are partitioned by spherical k-means, a query is only compared to the embeddings of the n_probe partitions whose
+    centroids are closest to it.
+    """
+
+    def __init__(self, terms, vectors, centroids, offsets):
+        # terms and vectors are sorted by partition, partition i spans the rows offsets[i] to offsets[i + 1]
+        self.terms = list(terms)
+        self.term_to_id = {term: idx for idx, term in enumerate(self.terms)}
+        self.vectors = vectors
+        self.centroids = centroids
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.terms)
+
+    def __contains__(self, term):
+        return term in self.term_to_id
+
+    @property
+    def n_lists(self):
+        return len(self.centroids)
+
+    @classmethod
+    def build(cls, terms, embeddings, n_lists=None, n_iter=10, seed=0):
+        """
+        Builds the index.
+
+        :param terms: the indexed terms
+        :param embeddings: the embeddings of the terms, one row per term
+        :param n_lists: the number of partitions, defaults to the square root of the number of terms
+        :param n_iter: the number of k-means iterations
+        :param seed: seed of the centroid initialization
+        :return: the index
+        """
+        vectors = normalize_rows(embeddings)
+        if len(terms) == 0:
+            return cls([], vectors, np.zeros((0, vectors.shape[1]), dtype=np.float32), np.zeros(1, dtype=np.int64))
+        if n_lists is None:
+            n_lists = int(np.sqrt(len(terms)))
+        n_lists = max(1, min(n_lists, len(terms)))
+        rng = np.random.default_rng(seed)
+        centroids = vectors[rng.choice(len(terms), size=n_lists, replace=False)]
+        assignment = np.zeros(len(terms), dtype=np.int64)
+        for _ in range(n_iter if n_lists > 1 else 0):
+            assignment = np.argmax(vectors @ centroids.T, axis=1)
+            counts = np.bincount(assignment, minlength=n_lists)
+            order = np.argsort(assignment, kind="stable")
+            non_empty = np.flatnonzero(counts)
+            starts = np.concatenate([[0], np.cumsum(counts)[:-1]])[non_empty]
+            # partitions that lost all their terms keep their previous centroid
+            centroids = centroids.copy()
+            centroids[non_empty] = normalize_rows(np.add.reduceat(vectors[order], starts, axis=0))
+        if n_lists > 1:
+            assignment = np.argmax(vectors @ centroids.T, axis=1)
+        order = np.argsort(assignment, kind="stable")
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(assignment, minlength=n_lists))]).astype(np.int64)
+        return cls([terms[i] for i in order], vectors[order], centroids, offsets)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["terms"].tolist(), data["vectors"], data["centroids"], data["offsets"])
+
+    def save(self, path):
+        np.savez(path, terms=np.array(self.terms, dtype=str), vectors=self.vectors, centroids=self.centroids,
+                 offsets=self.offsets)
+
+    def search(self, queries, threshold=None, top_k=None, n_probe=8):
+        """
+        Finds the neighbours of the queries among the indexed terms.
+
+        :param queries: the query embeddings, one row per query
+        :param threshold: only neighbours with at least this similarity are returned
+        :param top_k: at most this many (most similar) neighbours are returned per query
+        :param n_probe: the number of partitions that are searched per query
+        :return: three aligned arrays holding the query, the indexed term, and the similarity of each neighbour
+        """
+        queries = normalize_rows(queries)
+        query_ids, term_ids, sims = [np.zeros(0, dtype=np.int64)], [np.zeros(0, dtype=np.int64)], \
+            [np.zeros(0, dtype=np.float32)]
+        if len(self) > 0 and len(queries) > 0:
+            n_probe = max(1, min(n_probe, self.n_lists))
+            probes = np.argpartition(-(queries @ self.centroids.T), n_probe - 1, axis=1)[:, :n_probe]
+            for lst in np.unique(probes):
+                start, end = self.offsets[lst], self.offsets[lst + 1]
+                if start == end:
+                    continue
+                probing = np.flatnonzero((probes == lst).any(axis=1))
+                block = queries[probing] @ self.vectors[start:end].T
+                if threshold is not None:
+                    rows, cols = np.nonzero(block >= threshold)
+                else:
+                    rows, cols = np.indices(block.shape).reshape(2, -1)
+                query_ids.append(probing[rows])
+                term_ids.append(start + cols)
+                sims.append(block[rows, cols])
+        query_ids, term_ids, sims = np.concatenate(query_ids), np.concatenate(term_ids), np.concatenate(sims)
+        if top_k is not None and len(sims) > 0:
+            order = np.lexsort((-sims, query_ids))
+            query_ids, term_ids, sims = query_ids[order], term_ids[order], sims[order]
+            firsts = np.flatnonzero(np.concatenate([[True], query_ids[1:] != query_ids[:-1]]))
+            rank = np.arange(len(query_ids)) - np.repeat(firsts, np.diff(np.append(firsts, len(query_ids))))
+            keep = rank < top_k
+            query_ids, term_ids, sims = query_ids[keep], term_ids[keep], sims[keep]
+        return query_ids, term_ids, sims
+
+    @classmethod
+    def load_or_build(cls, path, terms, embed, **kwargs):
+        """
+        Loads the index stored at the given path if it covers all terms, otherwise (re)builds it for the union of
+        the stored and the given terms and stores it.
+
+        :param path: the location of the index
+        :param terms: the terms that need to be indexed
+        :param embed: function returning the embedding matrix of a list of terms
+        :return: the index
+        """
+        index = cls.load(path) if exists(path) else None
+        if index is not None and all(term in index for term in terms):
+            return index
+        all_terms = list(dict.fromkeys((index.terms if index is not None else []) + list(terms)))
+        _logger.info("Building similarity index over %d terms" % len(all_terms))
+        index = cls.build(all_terms, embed(all_terms), **kwargs)
+        index.save(path)
+        return index
@@ -0,0 +1,224 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import namedtuple
+from os.path import exists
+
+from semconstmining.util.io import read_pickle, write_pickle
+
+_logger = logging.getLogger(__name__)
+
+MANIFEST = "manifest.json"
+
+# Identifies the artifact of a stage computed from specific inputs, dependencies holds the keys of the upstream
+# artifacts the stage was computed from
+StageKey = namedtuple("StageKey", ["stage", "key", "dependencies"])
+
+
+def fingerprint(path):
+    """
+    Cheap fingerprint of a file or directory (relative names, sizes and modification times of all files)
+    """
+    if not exists(path):
+        return None
+    if os.path.isfile(path):
+        stat = os.stat(path)
+        return "%s:%d:%d" % (os.path.basename(path), stat.st_size, stat.st_mtime_ns)
+    sha = hashlib.sha256()
+    for dir_path, dir_names, filenames in sorted(os.walk(path)):
+        dir_names.sort()
+        for filename in sorted(filenames):
+            stat = os.stat(os.path.join(dir_path, filename))
+            sha.update(("%s:%d:%d\n" % (os.path.relpath(os.path.join(dir_path, filename), path), stat.st_size,
+                                        stat.st_mtime_ns)).encode("utf-8"))
+    return sha.hexdigest()
+
+
+def file_digest(path):
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+class StageCache:
+    """
+    Content-addressed cache of the artifacts of the pipeline stages. The key of an artifact is the hash of everything
+    the stage is computed from, i.e., the digests of the upstream artifacts, the relevant parameters and config fields,
+    and the code version. Changing any of them leads to a new key, hence to a recomputation of the stage and all
+    stages downstream of it, while artifacts of other inputs are kept until they are evicted (least recently used
+    first) once the cache exceeds its size limit.
+    """
+
+    def __init__(self, root, code_version="", max_bytes=None, adopt_legacy=False):
+        self.root = root
+        self.code_version = code_version
+        self.max_bytes = max_bytes
+        # Whether pickles written by former versions are adopted (without knowing the inputs they stem from)
+        self.adopt_legacy = adopt_legacy
+        os.makedirs(self.root, exist_ok=True)
+        self.manifest_path = os.path.join(self.root, MANIFEST)
+        self.entries = {}
+        if exists(self.manifest_path):
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+        # Keys of the artifacts of every stage that were resolved in this session
+        self.resolved = {}
+
+    def stage(self, stage, params=None, dependencies=(), config=None, config_fields=(), version=""):
+        """
+        Computes the key of a stage.
+
+        :param stage: the name of the stage
+        :param params: parameters the stage is computed with
+        :param dependencies: names of the upstream stages, they have to be resolved before
+        :param config: the config to read the config fields from
+        :param config_fields: names of the config fields the stage depends on
+        :param version: version of the code of the stage, bump it whenever the code changes its result
+        :return: the stage key
+        """
+        dependency_keys = []
+        for dependency in dependencies:
+            if dependency not in self.resolved:
+                raise ValueError("Stage " + dependency + " has to be resolved before stage " + stage + ".")
+            dependency_keys.append(self.resolved[dependency])
+        inputs = {
+            "stage": stage,
+            "params": {name: repr(value) for name, value in (params or {}).items()},
+            "config": {name: repr(getattr(config, name)) for name in config_fields},
+            "dependencies": {dependency: self.entries[key]["digest"]
+                             for dependency, key in zip(dependencies, dependency_keys)},
+            "code": [self.code_version, version]
+        }
+        key = hashlib.sha256(json.dumps(inputs, sort_keys=True).encode("utf-8")).hexdigest()
+        return StageKey(stage, key, tuple(dependency_keys))
+
+    def digest(self, stage):
+        """
+        The digest of the artifact of the given stage that was resolved in this session.
+        """
+        return self.entries[self.resolved[stage]]["digest"]
+
+    def __contains__(self, stage_key):
+        return stage_key.key in self.entries and exists(self._path(stage_key.key))
+
+    def get(self, stage_key):
+        if stage_key not in self:
+            raise KeyError(stage_key.stage)
+        _logger.info("Loading cached " + stage_key.stage + " (" + stage_key.key[:12] + ").")
+        artifact = read_pickle(self._path(stage_key.key))
+        self._touch(stage_key)
+        return artifact
+
+    def put(self, stage_key, artifact):
+        path = self._path(stage_key.key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        write_pickle(artifact, path + ".tmp")
+        os.replace(path + ".tmp", path)
+        self._register(stage_key, path)
+        self.evict()
+
+    def get_or_compute(self, stage_key, compute, legacy_path=None):
+        """
+        Returns the cached artifact of the stage key, computes and caches it if there is none.
+
+        :param stage_key: the stage key
+        :param compute: function without arguments computing the artifact
+        :param legacy_path: pickle written by former versions that is adopted instead of computing the artifact
+        :return: the artifact
+        """
+        if stage_key in self:
+            return self.get(stage_key)
+        if self.adopt_legacy and legacy_path is not None and exists(legacy_path):
+            _logger.warning("Adopting " + str(legacy_path) + " as cached " + stage_key.stage + ".")
+            artifact = read_pickle(legacy_path)
+        else:
+            _logger.info("Computing " + stage_key.stage + " (" + stage_key.key[:12] + ").")
+            artifact = compute()
+        self.put(stage_key, artifact)
+        return artifact
+
+    def resolve(self, stage_key, compute, legacy_path=None):
+        """
+        Makes sure that the artifact of the stage key exists, without loading it if it is cached. Afterwards,
+        stages depending on it can be keyed.
+        """
+        if stage_key in self:
+            self._touch(stage_key)
+        else:
+            self.get_or_compute(stage_key, compute, legacy_path=legacy_path)
+
+    def invalidate(self, stage):
+        """
+        Removes all artifacts of the given stage and, transitively, of the stages computed from them.
+        """
+        to_remove = {key for key, entry in self.entries.items() if entry["stage"] == stage}
+        while True:
+            dependents = {key for key, entry in self.entries.items()
+                          if key not in to_remove and to_remove.intersection(entry["dependencies"])}
+            if len(dependents) == 0:
+                break
+            to_remove |= dependents
+        self._remove(to_remove)
+        return len(to_remove)
+
+    def total_size(self):
+        return sum(entry["size"] for entry in self.entries.values())
+
+    def sizes_per_stage(self):
+        sizes = {}
+        for entry in self.entries.values():
+            sizes[entry["stage"]] = sizes.get(entry["stage"], 0) + entry["size"]
+        return sizes
+
+    def evict(self):
+        """
+        Removes the least recently used artifacts (except the ones resolved in this session) until the cache fits
+        its size limit.
+        """
+        if self.max_bytes is None:
+            return
+        total = self.total_size()
+        in_use = set(self.resolved.values())
+        to_remove = set()
+        for key, entry in sorted(self.entries.items(), key=lambda item: item[1]["last_access"]):
+            if total <= self.max_bytes:
+                break
+            if key not in in_use:
+                to_remove.add(key)
+                total -= entry["size"]
+        if len(to_remove) > 0:
+            _logger.info("Evicting " + str(len(to_remove)) + " cached artifacts.")
+            self._remove(to_remove)
+
+    def _path(self, key):
+        return os.path.join(self.root, key[:2], key + ".pkl")
+
+    def _register(self, stage_key, path):
+        now = time.time()
+        self.entries[stage_key.key] = {"stage": stage_key.stage, "dependencies": list(stage_key.dependencies),
+                                       "digest": file_digest(path), "size": os.path.getsize(path),
+                                       "created": now, "last_access": now}
+        self.resolved[stage_key.stage] = stage_key.key
+        self._write_manifest()
+
+    def _touch(self, stage_key):
+        self.entries[stage_key.key]["last_access"] = time.time()
+        self.resolved[stage_key.stage] = stage_key.key
+        self._write_manifest()
+
+    def _remove(self, keys):
+        for key in keys:
+            if exists(self._path(key)):
+                os.remove(self._path(key))
+            del self.entries[key]
+        self.resolved = {stage: key for stage, key in self.resolved.items() if key not in keys}
+        self._write_manifest()
+
+    def _write_manifest(self):
+        with open(self.manifest_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(self.entries, f)
+        os.replace(self.manifest_path + ".tmp", self.manifest_path)
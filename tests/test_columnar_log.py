@@ -0,0 +1,90 @@
+import pickle
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+from semconstmining.log.columnar_log import ColumnarLog, SharedColumnarLog
+
+CONFIG = SimpleNamespace(TERMS_FOR_MISSING=["", "none"], XES_NAME="concept:name", XES_ROLE="org:role",
+                         XES_CASE="case:concept:name", XES_TIME="time:timestamp",
+                         DICTIONARY="dictionary", DATA_OBJECT="data_object")
+
+
+def parsed(label, action, obj):
+    return SimpleNamespace(label=label, main_action=action, main_object=obj, dictionary_entries=[label],
+                           data_objects=[])
+
+
+def test_columnar_log_projections():
+    create, check, send, pay, tau = parsed("create order", "create", "order"), parsed("check order", "check", "order"), \
+        parsed("send invoice", "send", "invoice"), parsed("pay invoice", "pay", "invoice"), parsed("", "", "")
+    traces = [[create, check, send, pay], [tau], [send, tau, send, create], [pay, check, check]]
+    log = ColumnarLog.from_parsed_traces(CONFIG, traces)
+    assert log.business_objects == {"order", "invoice"}
+
+    clean = log.clean_log_projection()
+    assert clean.trace_names == ["0", "2", "3"]
+    assert clean.activity_lists() == [["create order", "check order", "send invoice", "pay invoice"],
+                                      ["send invoice", "send invoice", "create order"],
+                                      ["pay invoice", "check order", "check order"]]
+    assert clean.event(0) == {"concept:name": "create order", "dictionary": ["create order"], "data_object": []}
+
+    assert log.object_action_log_projection("invoice").activity_lists() == [["send", "pay"], ["send", "send"],
+                                                                            ["pay"]]
+    assert log.object_log_projection().activity_lists() == [["order", "invoice"], [], ["invoice", "invoice", "order"],
+                                                            ["invoice", "order"]]
+
+    selected = log.select(np.array([False, True, True, False]), case_ids=["0", "1"])
+    assert selected.clean_log_projection().activity_lists() == [["send invoice", "send invoice", "create order"]]
+
+
+def test_columnar_log_projection_with_roles():
+    create, check = parsed("create order", "create", "order"), parsed("check order", "check", "order")
+    log = ColumnarLog.from_parsed_traces(CONFIG, [[(create, "sales and marketing"), (check, None)]], case_ids=["a"],
+                                         with_roles=True)
+    clean = log.clean_log_projection(with_roles=True)
+    assert [trace[1]["org:role"] for trace in clean.traces] == ["unknown"]
+    assert clean.event(0)["org:role"] == "sales & marketing"
+
+
+def test_columnar_log_from_dataframe():
+    labels = {"create order": parsed("create order", "create", "order"),
+              "check order": parsed("check order", "check", "order")}
+    log = pd.DataFrame({"case:concept:name": ["b", "a", "a", "b", "b"],
+                        "concept:name": ["check order", "check order", "create order", "create order", "check order"],
+                        "org:role": ["clerk", None, "clerk", "clerk", "manager"],
+                        "time:timestamp": pd.to_datetime([3, 2, 1, 1, 2], unit="D")})
+    columnar_log = ColumnarLog.from_dataframe(CONFIG, log, labels.get, with_roles=True)
+    assert columnar_log.case_ids == ["a", "b"]
+    clean = columnar_log.clean_log_projection(with_roles=True)
+    assert clean.activity_lists() == [["create order", "check order"], ["create order", "check order", "check order"]]
+    assert [event["org:role"] for event in clean.traces[0]] == ["clerk", "unknown"]
+
+    without_loops = ColumnarLog.from_dataframe(CONFIG, log, labels.get, with_loops=False)
+    assert without_loops.case_ids == ["a"]
+
+
+def test_columnar_log_from_dataframe_with_string_timestamps():
+    labels = {label: parsed(label, label.split(" ")[0], "order") for label in ["create order", "check order",
+                                                                              "send order", "pay order"]}
+    # read from CSV, the timestamps are strings in another order than their times, one of them is missing
+    log = pd.DataFrame({"case:concept:name": ["a", "a", "a", "b", "b"],
+                        "concept:name": ["check order", "send order", "create order", "pay order", "create order"],
+                        "time:timestamp": ["2023-01-01T08:30:00+00:00", None, "2023-01-01T09:00:00+02:00",
+                                           "2023-01-02T08:00:00+00:00", "2023-01-01T10:00:00+00:00"]})
+    columnar_log = ColumnarLog.from_dataframe(CONFIG, log, labels.get)
+    assert columnar_log.clean_log_projection().activity_lists() == [["create order", "check order", "send order"],
+                                                                    ["create order", "pay order"]]
+
+
+def test_shared_columnar_log():
+    create, send = parsed("create order", "create", "order"), parsed("send invoice", "send", "invoice")
+    log = ColumnarLog.from_parsed_traces(CONFIG, [[(create, "clerk"), (send, None)], [(send, "clerk")]], with_roles=True)
+    shared_log = SharedColumnarLog(log)
+    try:
+        attached = pickle.loads(pickle.dumps(shared_log)).attach()
+        assert attached.object_action_log_projection("invoice").activity_lists() == [["send"], ["send"]]
+        assert attached.clean_log_projection(with_roles=True).event(1)["org:role"] == "unknown"
+    finally:
+        shared_log.release()
@@ -0,0 +1,147 @@
+import os
+import random
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+from pm4py.objects.log.obj import EventLog, Trace, Event
+
+from semconstmining.config import Config
+from semconstmining.mining.model import parsed_label
+from semconstmining.mining.model.parsed_label import ParsedLabel
+
+# the extractor is imported along with the resource handler and its NLP dependencies
+pytest.importorskip("spacy")
+from semconstmining.mining.extraction.declareextractor import DeclareExtractor, ParsedTaskTable  # noqa: E402
+
+LABELS = {"create order": ("create", "order"), "check order": ("check", "order"), "send invoice": ("send", "invoice"),
+          "pay invoice": ("pay", "invoice"), "ship goods": ("ship", "goods"), "archive order": ("archive", "order"),
+          "order": ("", "order"), "wait": ("wait", "none")}
+
+
+def get_bpmn_logs(config, num_models, seed):
+    rnd = random.Random(seed)
+    rows = []
+    for model in range(num_models):
+        log = EventLog()
+        # few variants per model such that constraints reach the support
+        variants = [[rnd.choice(list(LABELS) + ["Gateway"]) for _ in range(rnd.randint(1, 5))] for _ in range(2)]
+        for i in range(rnd.randint(1, 4)):
+            trace = Trace()
+            for label in variants[i % len(variants)]:
+                trace.append(Event({config.XES_NAME: label}))
+            log.append(trace)
+        rows.append({"model_id": "m%d" % model, "name": "model %d" % model, "log": log if model != 1 else None})
+    return pd.DataFrame(rows).set_index("model_id")
+
+
+class BaselineProjections:
+    """
+    The projections of the filtered traces of a model as event logs, as they were computed before the columnar log.
+    """
+
+    def __init__(self, config, traces):
+        self.config = config
+        self.traces = traces
+
+    def event(self, name, parsed):
+        return Event({self.config.XES_NAME: name, self.config.DICTIONARY: parsed.dictionary_entries,
+                      self.config.DATA_OBJECT: parsed.data_objects})
+
+    def projection(self, events_of, keep_empty=False):
+        projection = EventLog()
+        for i, trace in enumerate(self.traces):
+            tmp_trace = Trace()
+            tmp_trace.attributes[self.config.XES_NAME] = str(i)
+            for event in events_of(trace):
+                tmp_trace.append(event)
+            if keep_empty or len(tmp_trace) > 0:
+                projection.append(tmp_trace)
+        return projection
+
+    @property
+    def business_objects(self):
+        return {parsed.main_object for trace in self.traces for parsed in trace
+                if parsed.main_object not in self.config.TERMS_FOR_MISSING}
+
+    def clean_log_projection(self):
+        return self.projection(lambda trace: [self.event(parsed.label, parsed) for parsed in trace
+                                              if parsed.label not in self.config.TERMS_FOR_MISSING])
+
+    def object_action_log_projection(self, obj):
+        return self.projection(lambda trace: [self.event(parsed.main_action, parsed) for parsed in trace
+                                              if parsed.main_object == obj and parsed.main_action != ""])
+
+    def object_log_projection(self):
+        def events_of(trace):
+            events = []
+            last = ""
+            for parsed in trace:
+                if parsed.main_object not in self.config.TERMS_FOR_MISSING and parsed.main_object != last:
+                    events.append(self.event(parsed.main_object, parsed))
+                last = parsed.main_object
+            return events
+        return self.projection(events_of, keep_empty=True)
+
+
+def constraint_set(df, config):
+    return {(row[config.LEVEL], row[config.OBJECT], row[config.CONSTRAINT_STR], row["model_id"])
+            for row in df.to_dict("records")}
+
+
+@pytest.fixture
+def extraction_setup(tmp_path, monkeypatch):
+    monkeypatch.setattr(parsed_label, "get_stopwords", lambda lang: frozenset())
+    config = Config(tmp_path)
+    parsed_tasks = ParsedTaskTable({label: ParsedLabel(config, label, label.split(), ["A", "BO"], [obj], [action],
+                                                       config.EN) for label, (action, obj) in LABELS.items()})
+    resource_handler = SimpleNamespace(bpmn_logs=get_bpmn_logs(config, 8, 0),
+                                       get_parsed_task=parsed_tasks.get_parsed_task)
+    return config, resource_handler
+
+
+def test_extraction_with_workers_and_checkpoints_matches_serial_extraction(extraction_setup, tmp_path):
+    config, resource_handler = extraction_setup
+    config.DECLARE_EXTRACTION_CHUNKS = 3
+    config.DECLARE_EXTRACTION_WORKERS = 1
+    expected = constraint_set(DeclareExtractor(config, resource_handler).extract_declare_from_logs(), config)
+    assert {level for level, _, _, _ in expected} == {config.ACTIVITY, config.OBJECT, config.MULTI_OBJECT}
+
+    config.DECLARE_EXTRACTION_WORKERS = 2
+    extractor = DeclareExtractor(config, resource_handler)
+    assert constraint_set(extractor.extract_declare_from_logs(tmp_path / "parallel"), config) == expected
+    assert not os.path.exists(tmp_path / "parallel")
+
+    # resume with the checkpoint of the second chunk, checkpoints of a split into 2 chunks are not picked up
+    checkpoint_dir = str(tmp_path / "resumed")
+    logs = resource_handler.bpmn_logs.reset_index()[["model_id", "name", "log"]]
+    os.makedirs(checkpoint_dir)
+    extractor.discover_chunk(1, 3, logs.iloc[3:6], resource_handler, checkpoint_dir=checkpoint_dir)
+    pd.to_pickle(([], [], []), extractor.chunk_file(checkpoint_dir, 0, 2))
+    discovered = []
+    discover_chunk = extractor.discover_chunk
+    extractor.discover_chunk = lambda i, *args: discovered.append(i) or discover_chunk(i, *args)
+    config.DECLARE_EXTRACTION_WORKERS = 1
+    assert constraint_set(extractor.extract_declare_from_logs(checkpoint_dir), config) == expected
+    assert discovered == [0, 2]
+
+
+def test_single_pass_discovery_matches_per_projection_discovery(extraction_setup):
+    config, resource_handler = extraction_setup
+    extractor = DeclareExtractor(config, resource_handler)
+    for row_tuple in resource_handler.bpmn_logs.reset_index().itertuples():
+        actual = extractor.discover_all_declare_constraints(row_tuple, resource_handler)
+        if row_tuple.log is None:
+            assert actual == (None, None, None)
+            continue
+        parsed_tasks = extractor.get_parsed_tasks(row_tuple.log, resource_handler=resource_handler)
+        with_loops = BaselineProjections(config, extractor.get_filtered_traces(row_tuple.log, parsed_tasks,
+                                                                               with_loops=True))
+        without_loops = BaselineProjections(config, extractor.get_filtered_traces(row_tuple.log, parsed_tasks))
+        expected = (extractor.discover_declare_constraints(row_tuple, with_loops),
+                    extractor.discover_object_based_declare_constraints(row_tuple, without_loops),
+                    extractor.discover_multi_object_declare_constraints(row_tuple, without_loops))
+        for actual_df, expected_df in zip(actual, expected):
+            assert len(actual_df) == len(expected_df)
+            if len(expected_df) > 0:
+                assert constraint_set(actual_df, config) == constraint_set(expected_df, config)
@@ -0,0 +1,52 @@
+import numpy as np
+
+from semconstmining.parsing.label_parser.embedding_store import EmbeddingStore
+
+
+def test_embedding_store_appends_and_reloads(tmp_path):
+    path, index_path = tmp_path / "emb_store.npy", tmp_path / "emb_store_index.jsonl"
+    store = EmbeddingStore(path, index_path)
+    store.add(["create order", "check\ninvoice"], np.arange(8).reshape(2, 4))
+    store.add(["create order", "ship goods"], np.ones((2, 4)))
+    assert len(store) == 3
+    assert np.array_equal(store["ship goods"], np.ones(4))
+
+    reloaded = EmbeddingStore(path, index_path)
+    assert reloaded.matrix.shape == (3, 4)
+    assert np.array_equal(reloaded.get_matrix(["check\ninvoice", "create order"]),
+                          np.array([[4, 5, 6, 7], [0, 1, 2, 3]]))
+
+
+def test_embedding_store_drops_rows_of_interrupted_add(tmp_path):
+    path, index_path = tmp_path / "emb_store.npy", tmp_path / "emb_store_index.jsonl"
+    store = EmbeddingStore(path, index_path)
+    store.add(["a", "b", "c"], np.eye(3))
+    # the rows of "c" were written, its index entry was not
+    with open(index_path) as f:
+        lines = f.readlines()
+    with open(index_path, "w") as f:
+        f.writelines(lines[:2])
+    store = EmbeddingStore(path, index_path)
+    assert store.matrix.shape == (2, 3)
+    store.add(["d"], np.full((1, 3), 5))
+    assert np.array_equal(EmbeddingStore(path, index_path)["d"], np.full(3, 5))
+
+
+def test_embedding_store_drops_rows_written_before_the_header(tmp_path):
+    path, index_path = tmp_path / "emb_store.npy", tmp_path / "emb_store_index.jsonl"
+    store = EmbeddingStore(path, index_path)
+    store.add(["a", "b"], np.eye(2))
+    # an add was interrupted after writing its rows, the header and the index were not updated
+    with open(path, "ab") as f:
+        f.write(np.full(2, 9, dtype=np.float32).tobytes())
+    store = EmbeddingStore(path, index_path)
+    store.add(["c"], np.full((1, 2), 5))
+    assert np.array_equal(store["c"], np.full(2, 5))
+    assert np.array_equal(EmbeddingStore(path, index_path)["c"], np.full(2, 5))
+    assert EmbeddingStore(path, index_path).matrix.shape == (3, 2)
+
+    # same crash, but the store is not reloaded before the next add
+    with open(path, "ab") as f:
+        f.write(np.full(2, 9, dtype=np.float32).tobytes())
+    store.add(["d"], np.full((1, 2), 6))
+    assert np.array_equal(EmbeddingStore(path, index_path)["d"], np.full(2, 6))
@@ -0,0 +1,25 @@
+import json
+import subprocess
+import sys
+
+# Modules a worker checking pre-fitted constraints imports
+CHECKING_MODULES = ["semconstmining.declare.declare", "semconstmining.declare.monitoring",
+                    "semconstmining.log.loghandler", "semconstmining.log.loginfo",
+                    "semconstmining.checking.constraintchecking.declare_checker",
+                    "semconstmining.checking.constraintchecking.conformance_monitor"]
+# Packages that must only be imported once the label parsing or the embeddings are used
+HEAVY_PACKAGES = ["torch", "transformers", "sentence_transformers", "spacy", "gensim", "nltk", "mlxtend"]
+# Seconds importing the modules may take in a fresh interpreter
+IMPORT_TIME_BUDGET = 6
+
+
+def test_checking_modules_import_fast_and_without_heavy_packages():
+    script = "import json, sys, time\n" \
+             "start = time.perf_counter()\n" \
+             "%s\n" \
+             "print(json.dumps([time.perf_counter() - start, [m for m in %r if m in sys.modules]]))" \
+             % ("\n".join("import " + module for module in CHECKING_MODULES), HEAVY_PACKAGES)
+    out = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True).stdout
+    seconds, heavy = json.loads(out.strip().splitlines()[-1])
+    assert heavy == []
+    assert seconds < IMPORT_TIME_BUDGET
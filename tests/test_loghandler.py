@@ -0,0 +1,68 @@
+import os
+from types import SimpleNamespace
+
+import pandas as pd
+
+from semconstmining.log.loghandler import LogHandler
+
+XES = """<?xml version="1.0" encoding="UTF-8" ?>
+<log xes.version="1.0" xmlns="http://www.xes-standard.org/">
+<trace><string key="concept:name" value="1"/>
+<event><string key="concept:name" value="create order"/><string key="org:role" value="clerk"/>
+<date key="time:timestamp" value="2020-01-01T10:00:00.000+02:00"/></event>
+<event><string key="concept:name" value="check order"/><date key="time:timestamp" value="2020-01-02T10:00:00+02:00"/>
+<list key="items"><values><string key="concept:name" value="item"/></values></list></event>
+</trace>
+<trace><event><string key="concept:name" value="create order"/></event><string key="concept:name" value="2"/></trace>
+</log>"""
+
+
+def get_config(tmp_path):
+    return SimpleNamespace(XES_CASE="case:concept:name", XES_NAME="concept:name", XES_TIME="time:timestamp",
+                           XES_ROLE="org:role", LOG_CACHE_DIR=str(tmp_path / "log_cache"), LOG_CACHE_FORMAT="pickle",
+                           LOG_COLUMNS=["case:concept:name", "concept:name", "time:timestamp", "org:role"])
+
+
+def test_read_xes_log_streams_the_needed_attributes(tmp_path):
+    with open(tmp_path / "log.xes", "w") as f:
+        f.write(XES)
+    log = LogHandler(get_config(tmp_path)).read_log(str(tmp_path), "log.xes")
+    assert list(log["case:concept:name"]) == ["1", "1", "2"]
+    assert list(log["concept:name"]) == ["create order", "check order", "create order"]
+    assert list(log["org:role"].fillna("")) == ["clerk", "", ""]
+    assert log["time:timestamp"][1] == pd.Timestamp("2020-01-02T08:00:00", tz="UTC")
+
+
+def test_logs_are_cached_until_they_change(tmp_path, monkeypatch):
+    config = get_config(tmp_path)
+    pd.DataFrame({"case:concept:name": ["1", "1", "2"], "concept:name": ["a", "b", "a"],
+                  "time:timestamp": ["2020-01-01", "2020-01-02", "2020-01-01"], "other": [1, 2, 3]}) \
+        .to_csv(tmp_path / "log.csv", sep=";", index=False)
+    log = LogHandler(config).read_log(str(tmp_path), "log.csv")
+    assert list(log.columns) == ["case:concept:name", "concept:name", "time:timestamp"]
+    assert len(os.listdir(config.LOG_CACHE_DIR)) == 2
+
+    with monkeypatch.context() as patch:
+        patch.setattr(pd, "read_csv", None)
+        pd.testing.assert_frame_equal(LogHandler(config).read_log(str(tmp_path), "log.csv"), log)
+        stats = LogHandler(config).get_log_stats(str(tmp_path), "log.csv")
+    assert (stats.num_traces, stats.num_activities, stats.num_events) == (2, 2, 3)
+
+    pd.DataFrame({"case:concept:name": ["1"], "concept:name": ["c"], "time:timestamp": ["2020-01-01"]}) \
+        .to_csv(tmp_path / "log.csv", sep=";", index=False)
+    assert list(LogHandler(config).read_log(str(tmp_path), "log.csv")["concept:name"]) == ["c"]
+    assert len(os.listdir(config.LOG_CACHE_DIR)) == 2
+
+
+def test_logs_are_read_in_case_complete_chunks(tmp_path):
+    config = get_config(tmp_path)
+    with open(tmp_path / "log.xes", "w") as f:
+        f.write(XES)
+    chunks = list(LogHandler(config).iter_log_chunks(str(tmp_path), "log.xes", max_events=1))
+    assert [list(chunk["case:concept:name"]) for chunk in chunks] == [["1", "1"], ["2"]]
+
+    pd.DataFrame({"case:concept:name": ["1", "2", "1", "3", "2", "3"], "concept:name": ["a", "a", "b", "a", "b", "c"],
+                  "time:timestamp": ["2020-01-01"] * 6}).to_csv(tmp_path / "log.csv", sep=";", index=False)
+    chunks = list(LogHandler(config).iter_log_chunks(str(tmp_path), "log.csv", max_events=3))
+    assert [sorted(zip(chunk["case:concept:name"], chunk["concept:name"])) for chunk in chunks] == \
+           [[("1", "a"), ("1", "b"), ("2", "a"), ("2", "b")], [("3", "a"), ("3", "c")]]
@@ -0,0 +1,56 @@
+import pandas as pd
+
+from semconstmining.config import Config
+from semconstmining.parsing.model_to_log import Model2LogConverter
+
+
+def soundness_check(self, row):
+    return row.pn is not None and int(row.model_id) % 3 != 0
+
+
+def log_creation_check(self, row, model_elements):
+    # the play-out only depends on the model, such that chunks give the same logs in any process
+    return "log of " + row.model_id if row.sound else None
+
+
+def get_petri_nets(num_models):
+    return pd.DataFrame({"model_id": [str(i) for i in range(num_models)],
+                         "pn": [None if i % 7 == 0 else ("net", "im", "fm") for i in range(num_models)],
+                         "name": ["model " + str(i) for i in range(num_models)]})
+
+
+def generate_logs(config, workers, logs_dir):
+    config.LOG_GENERATION_WORKERS = workers
+    config.PETRI_LOGS_DIR = logs_dir
+    # more than 1000 models are split into chunks
+    model_elements = pd.DataFrame({config.ELEMENT_ID_BACKUP: []})
+    return Model2LogConverter(config).generate_logs_lambda(get_petri_nets(1200), model_elements)
+
+
+def test_log_generation_with_workers_and_checkpoints_matches_serial_generation(tmp_path, monkeypatch):
+    # woflan and the play-out are replaced, forked worker processes inherit the replacements
+    monkeypatch.setattr(Model2LogConverter, "soundness_check", soundness_check)
+    monkeypatch.setattr(Model2LogConverter, "log_creation_check", log_creation_check)
+    config = Config(tmp_path)
+    config.LOG_GENERATION_CHUNKS = 3
+    expected = generate_logs(config, 1, tmp_path / "serial")
+    assert list(expected["model_id"]) == [str(i) for i in range(1200)]
+    assert expected[config.SOUND].sum() == 686
+    assert expected.loc[expected[config.SOUND], config.LOG].str.startswith("log of ").all()
+    assert expected.loc[~expected[config.SOUND], config.LOG].isna().all()
+
+    parallel = generate_logs(config, 2, tmp_path / "parallel")
+    pd.testing.assert_frame_equal(parallel, expected)
+
+    # resume with the checkpoint of the second chunk, checkpoints of a split into 2 chunks are not picked up
+    resumed_dir = tmp_path / "resumed"
+    resumed_dir.mkdir()
+    expected.iloc[400:800].to_pickle(resumed_dir / ("no_1_of_3" + config.LOGS_SER_FILE))
+    expected.iloc[:600].assign(**{config.LOG: None}).to_pickle(resumed_dir / ("no_0_of_2" + config.LOGS_SER_FILE))
+    generated = []
+    generate_chunk_logs = Model2LogConverter.generate_chunk_logs
+    monkeypatch.setattr(Model2LogConverter, "generate_chunk_logs",
+                        lambda self, i, *args: generated.append(i) or generate_chunk_logs(self, i, *args))
+    resumed = generate_logs(config, 1, resumed_dir)
+    assert generated == [0, 2]
+    pd.testing.assert_frame_equal(resumed, expected)
@@ -0,0 +1,147 @@
+import random
+import time
+from types import SimpleNamespace
+
+import pandas as pd
+
+from semconstmining.checking.constraintchecking.conformance_monitor import ConformanceMonitor
+from semconstmining.checking.constraintchecking.declare_checker import DeclareChecker
+from semconstmining.config import Config
+from semconstmining.declare.models import EncodedLog
+from semconstmining.declare.monitoring import ModelMonitor
+from semconstmining.declare.parsers import parse_decl
+from semconstmining.declare.vectorized_checking import check_log_conformance
+from semconstmining.mining.model import parsed_label
+from semconstmining.mining.model.parsed_label import ParsedLabel
+from test_vectorized_checking import all_constraints, random_log
+
+
+def test_monitoring_matches_log_checking():
+    for seed, consider_vacuity in [(0, True), (1, False)]:
+        log = random_log(100, 12, seed)
+        model = parse_decl(all_constraints())
+        expected = check_log_conformance(EncodedLog.from_event_log(log), model, consider_vacuity)
+        monitor = ModelMonitor(model, consider_vacuity)
+        for trace in log:
+            case = monitor.start_case()
+            reported = []
+            for event in trace:
+                reported += monitor.step(case, event)
+            violations = monitor.finish(case)
+            assert violations == expected[trace.attributes["concept:name"]]
+            # violations are reported once, and only if they are permanent
+            assert len(reported) == len(set(reported)) and set(reported) <= violations
+
+
+def test_monitoring_reports_permanent_violations_immediately():
+    monitor = ModelMonitor(parse_decl(["Init[a] | |", "Response[a, b] | | |", "Chain Response[a, b] | | |",
+                                       "Not Responded Existence[a, c] | | |", "Absence2[c] | |"]), True)
+    case = monitor.start_case()
+    assert monitor.step(case, {"concept:name": "a"}) == []
+    assert monitor.step(case, {"concept:name": "c"}) == ["Chain Response[a, b] | | |",
+                                                         "Not Responded Existence[a, c] | | |"]
+    assert monitor.step(case, {"concept:name": "c"}) == ["Absence2[c] | |"]
+    assert monitor.finish(case) == {"Response[a, b] | | |", "Chain Response[a, b] | | |",
+                                    "Not Responded Existence[a, c] | | |", "Absence2[c] | |"}
+
+
+LABELS = {"create order": ("create", "order"), "check order": ("check", "order"), "send invoice": ("send", "invoice"),
+          "pay invoice": ("pay", "invoice"), "ship goods": ("ship", "goods"), "archive order": ("archive", "order"),
+          "order": ("", "order"), "wait": ("wait", "none")}
+
+
+class LabelParser:
+    """
+    Parses the labels above, instead of the NlpHelper
+    """
+
+    def __init__(self, config):
+        self.config = config
+
+    def parse_label(self, label):
+        action, obj = LABELS[label]
+        return ParsedLabel(self.config, label, label.split(), ["A", "BO"], [obj], [action], self.config.EN)
+
+    def parse_labels_bulk(self, labels):
+        return [self.parse_label(label) for label in labels]
+
+
+def get_constraints(config):
+    constraints = []
+
+    def add(level, constraint, obj=""):
+        constraints.append({config.LEVEL: level, config.CONSTRAINT_STR: constraint, config.OBJECT: obj,
+                            config.TEMPLATE: constraint.split("[")[0], config.FITTED_RECORD_ID: str(len(constraints))})
+
+    for template in ["Response", "Precedence", "Succession", "Not Succession", "Chain Precedence", "Choice"]:
+        for a, b in [("create order", "check order"), ("send invoice", "pay invoice"), ("ship goods", "create order")]:
+            add(config.ACTIVITY, "%s[%s, %s] | | |" % (template, a, b))
+        for a, b in [("order", "invoice"), ("invoice", "goods")]:
+            add(config.MULTI_OBJECT, "%s[%s, %s] | | |" % (template, a, b))
+        for a, b in [("create", "check"), ("check", "archive")]:
+            add(config.OBJECT, "%s[%s, %s] | | |" % (template, a, b), "order")
+    for activity in ["create order", "ship goods"]:
+        add(config.ACTIVITY, "Init[%s] | |" % activity)
+        add(config.RESOURCE, "Existence1[%s] |A.org:role is clerk |" % activity)
+        add(config.RESOURCE, "Absence2[%s] |A.org:role is not sales & marketing |" % activity)
+    return pd.DataFrame(constraints)
+
+
+def get_log(config, seed):
+    rnd = random.Random(seed)
+    rows = []
+    for case in range(100):
+        for i in range(rnd.randint(1, 7)):
+            rows.append({config.XES_CASE: "c%d" % case, config.XES_NAME: rnd.choice(list(LABELS)),
+                         config.XES_ROLE: rnd.choice(["clerk", "manager", "sales and marketing", None]),
+                         config.XES_TIME: pd.Timestamp("2020-01-01", tz="UTC") + pd.Timedelta(minutes=i)})
+    return pd.DataFrame(rows)
+
+
+def test_conformance_monitor_matches_unfiltered_log_checking(tmp_path, monkeypatch):
+    monkeypatch.setattr(parsed_label, "get_stopwords", lambda lang: frozenset(["the", "a"]))
+    config = Config(tmp_path)
+    config.OUTCOME_CACHE = None
+    constraints = get_constraints(config)
+    log = get_log(config, 0)
+    log_handler = SimpleNamespace(log=log, get_resources_to_tasks=lambda: {})
+    expected = DeclareChecker(config, log_handler, constraints, LabelParser(config), verify=False) \
+        .check_constraints(with_id=True)
+
+    monitor = ConformanceMonitor(config, constraints, LabelParser(config))
+    violations = monitor.add_events(log)
+    for case_id in list(monitor.cases):
+        violations += monitor.finish_case(case_id)
+    assert len(monitor.cases) == 0
+    assert len(set(violations)) == len(violations)
+    record_ids = dict(zip(constraints[config.CONSTRAINT_STR] + constraints[config.OBJECT],
+                          constraints[config.FITTED_RECORD_ID]))
+    assert all(violation.record_id == record_ids[violation.constraint + violation.object]
+               for violation in violations)
+    monitored = {}
+    for violation in violations:
+        monitored.setdefault((violation.level, violation.object), {}).setdefault(violation.case_id, set()) \
+            .add((violation.constraint, violation.record_id))
+    expected_per_level = [((level, ""), expected[level])
+                          for level in [config.ACTIVITY, config.RESOURCE, config.MULTI_OBJECT]]
+    expected_per_level += [((config.OBJECT, bo), res) for bo, res in expected[config.OBJECT].items()]
+    assert len(monitored) > 3
+    for key, res in expected_per_level:
+        assert monitored.pop(key, {}) == {case_id: found for case_id, found in res.items() if len(found) > 0}
+    assert monitored == {}
+
+
+def test_conformance_monitor_expires_idle_cases(tmp_path, monkeypatch):
+    monkeypatch.setattr(parsed_label, "get_stopwords", lambda lang: frozenset())
+    config = Config(tmp_path)
+    monitor = ConformanceMonitor(config, get_constraints(config), LabelParser(config))
+    early = monitor.add_events(pd.DataFrame({config.XES_CASE: ["1"], config.XES_NAME: ["check order"],
+                                     config.XES_TIME: [pd.Timestamp("2020-01-01", tz="UTC")]}))
+    monitor.add_event("2", "create order")
+    violations = monitor.expire_cases(time.time() - 60)
+    assert {violation.case_id for violation in violations} == {"1"}
+    reported = {(violation.constraint, violation.object) for violation in early + violations}
+    assert {("Init[create order] | |", ""), ("Response[check, archive] | | |", "order")} <= reported
+    assert list(monitor.cases) == ["2"]
+    assert monitor.expire_cases(pd.Timestamp.now(tz="UTC") + pd.Timedelta(minutes=1)) != []
+    assert monitor.cases == {}
@@ -0,0 +1,65 @@
+import os
+
+from semconstmining.checking.constraintchecking import outcome_cache
+from semconstmining.checking.constraintchecking.outcome_cache import OutcomeCache, canonical_constraint
+from semconstmining.declare.enums import TraceState
+
+
+def test_outcome_cache_persists_outcomes(tmp_path):
+    cache = OutcomeCache(str(tmp_path / "outcomes.pkl"))
+    key = ("v1", canonical_constraint("Response[a,  b] |  | |"))
+    assert cache.get(key) is None
+    cache.put(key, TraceState.VIOLATED)
+    cache.save()
+
+    cache = OutcomeCache(str(tmp_path / "outcomes.pkl"))
+    assert cache.get(("v1", "Response[a, b] | | |")) == TraceState.VIOLATED
+    assert cache.get(("v2", "Response[a, b] | | |")) is None
+    assert cache.hit_rate == 0.5
+
+
+def test_outcome_cache_evicts_least_recently_used_outcomes():
+    cache = OutcomeCache(max_entries=2)
+    cache.put(("v1", "Response[a, b] | | |"), TraceState.SATISFIED)
+    cache.put(("v2", "Response[a, b] | | |"), TraceState.VIOLATED)
+    assert cache.get(("v1", "Response[a, b] | | |")) == TraceState.SATISFIED
+    cache.put(("v3", "Response[a, b] | | |"), TraceState.SATISFIED)
+    assert ("v2", "Response[a, b] | | |") not in cache
+    assert cache.get(("v2", "Response[a, b] | | |")) is None
+    assert (cache.hits, cache.misses, len(cache)) == (1, 1, 2)
+
+
+def test_outcome_cache_discards_outcomes_of_other_versions(tmp_path, monkeypatch):
+    cache = OutcomeCache(str(tmp_path / "outcomes.pkl"))
+    cache.put(("v1", "Response[a, b] | | |"), TraceState.VIOLATED)
+    cache.save()
+    assert len(OutcomeCache(str(tmp_path / "outcomes.pkl"))) == 1
+    monkeypatch.setattr(outcome_cache, "OUTCOME_CACHE_VERSION", "changed")
+    assert len(OutcomeCache(str(tmp_path / "outcomes.pkl"))) == 0
+
+
+def test_outcomes_of_a_subset_are_merged_back():
+    cache = OutcomeCache()
+    cache.put(("v1", "Response[a, b] | | |"), TraceState.VIOLATED)
+    cache.put(("v1", "Init[a] | |"), TraceState.SATISFIED)
+    subset = cache.subset({"Response[a, b] | | |"})
+    assert len(subset) == 1 and subset.get(("v1", "Response[a, b] | | |")) == TraceState.VIOLATED
+    subset.put(("v2", "Response[a, b] | | |"), TraceState.SATISFIED)
+    cache.update(*subset.pop_changes())
+    # the hit of the subset makes its outcome more recently used than the one of Init
+    assert list(cache.entries) == [("v1", "Init[a] | |"), ("v1", "Response[a, b] | | |"),
+                                   ("v2", "Response[a, b] | | |")]
+    assert cache.get(("v2", "Response[a, b] | | |")) == TraceState.SATISFIED
+    assert subset.pop_changes() == ({}, [])
+
+
+def test_outcome_cache_is_not_written_again_after_hits_only(tmp_path):
+    path = str(tmp_path / "outcomes.pkl")
+    cache = OutcomeCache(path)
+    cache.put(("v1", "Response[a, b] | | |"), TraceState.VIOLATED)
+    cache.save()
+    modified = os.path.getmtime(path)
+    os.utime(path, (modified - 10, modified - 10))
+    assert cache.get(("v1", "Response[a, b] | | |")) == TraceState.VIOLATED
+    cache.save()
+    assert os.path.getmtime(path) == modified - 10
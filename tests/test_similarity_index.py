@@ -0,0 +1,32 @@
+import numpy as np
+
+from semconstmining.selection.relevance.similarity_index import SimilarityIndex, normalize_rows
+
+
+def clustered_embeddings(num_terms, dim, seed):
+    rng = np.random.default_rng(seed)
+    centers = np.random.default_rng(42).normal(size=(20, dim))
+    return centers[rng.integers(0, 20, size=num_terms)] + 0.4 * rng.normal(size=(num_terms, dim))
+
+
+def test_similarity_index_finds_neighbours_above_threshold(tmp_path):
+    terms = ["term %d" % i for i in range(2000)]
+    embeddings = clustered_embeddings(len(terms), 16, 0)
+    queries = clustered_embeddings(100, 16, 1)
+    expected = normalize_rows(queries) @ normalize_rows(embeddings).T >= 0.8
+
+    index = SimilarityIndex.build(terms, embeddings)
+    query_ids, term_ids, sims = index.search(queries, threshold=0.8, n_probe=index.n_lists)
+    found = np.zeros_like(expected)
+    found[query_ids, [int(index.terms[t].split()[1]) for t in term_ids]] = True
+    assert np.array_equal(found, expected)
+    assert np.all(sims >= 0.8)
+
+    # the stored index is reused as long as it covers the terms, probing a few partitions keeps most neighbours
+    index.save(tmp_path / "index.npz")
+    index = SimilarityIndex.load_or_build(tmp_path / "index.npz", terms[:10], embed=None)
+    query_ids, _, _ = index.search(queries, threshold=0.8, n_probe=8)
+    assert len(query_ids) >= 0.9 * expected.sum()
+
+    query_ids, _, sims = index.search(queries, top_k=3, n_probe=8)
+    assert np.array_equal(np.bincount(query_ids), np.full(len(queries), 3))
@@ -0,0 +1,41 @@
+from types import SimpleNamespace
+
+from semconstmining.util.stage_cache import StageCache
+
+
+def test_stage_cache_recomputes_downstream_of_changed_inputs(tmp_path):
+    config = SimpleNamespace(LOOPS=True)
+    calls = []
+
+    def run(cache):
+        logs = cache.get_or_compute(cache.stage("logs", config=config, config_fields=("LOOPS",)),
+                                    lambda: calls.append("logs") or ["log", config.LOOPS])
+        return cache.get_or_compute(cache.stage("constraints", params={"min_support": 2}, dependencies=("logs",)),
+                                    lambda: calls.append("constraints") or logs + ["constraints"])
+
+    assert run(StageCache(tmp_path)) == ["log", True, "constraints"]
+    assert run(StageCache(tmp_path)) == ["log", True, "constraints"]
+    assert calls == ["logs", "constraints"]
+
+    config.LOOPS = False
+    assert run(StageCache(tmp_path)) == ["log", False, "constraints"]
+    assert calls == ["logs", "constraints"] * 2
+
+    cache = StageCache(tmp_path)
+    assert cache.invalidate("logs") == 4
+    assert cache.total_size() == 0
+
+
+def test_stage_cache_evicts_least_recently_used_artifacts(tmp_path):
+    cache = StageCache(tmp_path)
+    for i in range(3):
+        cache.put(cache.stage("models", params={"i": i}), "x" * 1000)
+    max_bytes = cache.total_size() - 1
+
+    cache = StageCache(tmp_path, max_bytes=max_bytes)
+    cache.get(cache.stage("models", params={"i": 0}))
+    cache.put(cache.stage("logs"), "y")
+    assert cache.stage("models", params={"i": 0}) in cache
+    assert cache.stage("models", params={"i": 1}) not in cache
+    assert cache.stage("models", params={"i": 2}) in cache
+    assert cache.total_size() <= max_bytes
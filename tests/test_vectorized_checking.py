@@ -0,0 +1,120 @@
+import random
+from types import SimpleNamespace
+
+from pm4py.objects.log.obj import EventLog, Trace, Event
+
+from semconstmining.declare.api_functions import check_constraint, check_trace_conformance
+from semconstmining.declare.declare import Declare
+from semconstmining.declare.enums import Template
+from semconstmining.declare.models import EncodedLog
+from semconstmining.declare.parsers import parse_decl
+from semconstmining.declare.vectorized_checking import check_log_conformance, condition_attributes
+
+ACTIVITIES = ["a", "b", "c", "d"]
+ROLES = ["clerk", "manager", "sales & marketing"]
+
+
+def random_log(num_traces, max_length, seed):
+    rnd = random.Random(seed)
+    log = EventLog()
+    for i in range(num_traces):
+        trace = Trace()
+        trace.attributes["concept:name"] = str(i)
+        for _ in range(rnd.randint(1, max_length)):
+            event = Event({"concept:name": rnd.choice(ACTIVITIES)})
+            if rnd.random() < 0.8:
+                event["org:role"] = rnd.choice(ROLES)
+            trace.append(event)
+        log.append(trace)
+    return log
+
+
+def all_constraints():
+    constraints = []
+    for template in Template:
+        if template.supports_cardinality:
+            for n in range(1, 4):
+                for a in ACTIVITIES:
+                    constraints.append(template.templ_str + str(n) + "[" + a + "] | |")
+                    constraints.append(template.templ_str + str(n) + "[" + a + "] |A.org:role is not clerk |")
+        elif not template.is_binary:
+            for a in ACTIVITIES:
+                constraints.append(template.templ_str + "[" + a + "] | |")
+                constraints.append(template.templ_str + "[" + a + "] |A.org:role is manager |")
+        else:
+            for a in ACTIVITIES + ["x"]:
+                for b in ACTIVITIES + ["x"]:
+                    constraints.append(template.templ_str + "[" + a + ", " + b + "] | | |")
+            constraints.append(template.templ_str + "[a, b] |A.org:role is not sales & marketing | |")
+            constraints.append(template.templ_str + "[a, b] | |T.org:role is manager |")
+    return constraints
+
+
+def test_vectorized_checking_matches_plain_checking():
+    for seed, consider_vacuity in [(0, True), (1, False), (2, True)]:
+        d4py = Declare(None)
+        d4py.log = random_log(200, 12, seed)
+        d4py.model = parse_decl(all_constraints())
+        expected = d4py.conformance_checking(consider_vacuity=consider_vacuity)
+        actual = d4py.vectorized_conformance_checking(consider_vacuity=consider_vacuity)
+        assert actual == expected
+
+
+def full_dispatch(trace, model, consider_vacuity):
+    res = {}
+    for constraint, constraint_str in zip(model.constraints, model.serialized_constraints):
+        outcome = check_constraint(trace, constraint, consider_vacuity)
+        if outcome is not None:
+            res[constraint_str] = outcome
+    return res
+
+
+def test_indexed_checking_matches_full_dispatch():
+    model = parse_decl(all_constraints())
+    templates = {constraint["template"] for constraint in model.constraints}
+    assert {Template.INIT, Template.END, Template.EXISTENCE} <= templates
+    for seed, consider_vacuity in [(5, True), (6, False)]:
+        for trace in random_log(100, 8, seed):
+            expected = full_dispatch(trace, model, consider_vacuity)
+            actual = check_trace_conformance(trace, model, consider_vacuity)
+            assert list(actual) == list(expected)
+            assert {const: repr(res) for const, res in actual.items()} == \
+                   {const: repr(res) for const, res in expected.items()}
+
+
+def test_indexed_checking_follows_changed_constraints():
+    model = parse_decl(["Init[a] | |", "Existence1[b] | |"])
+    trace = random_log(1, 1, 7)[0]
+    trace[0]["concept:name"] = "c"
+    check_trace_conformance(trace, model, True)
+    # same number of constraints, but another activity
+    changed = parse_decl(["Init[c] | |"])
+    model.constraints[0] = changed.constraints[0]
+    model.serialized_constraints[0] = changed.serialized_constraints[0]
+    assert {const: repr(res) for const, res in check_trace_conformance(trace, model, True).items()} == \
+           {const: repr(res) for const, res in full_dispatch(trace, model, True).items()}
+
+
+def test_vectorized_discovery_matches_plain_discovery():
+    results = {}
+    for engine in ["plain", "vectorized"]:
+        config = SimpleNamespace(CONSTRAINT_TYPES_TO_IGNORE=[Template.CHAIN_RESPONSE.templ_str],
+                                 CHECKING_ENGINE=engine, VECTORIZED_CHECKING="vectorized")
+        d4py = Declare(config)
+        d4py.log = random_log(200, 12, 3)
+        d4py.compute_frequent_itemsets(min_support=0.0, len_itemset=2, algorithm="apriori")
+        discovered, _ = d4py.discovery(consider_vacuity=True, max_declare_cardinality=2, plain=True)
+        results[engine] = {const: {trace: repr(res) for trace, res in val.items()} for const, val in discovered.items()}
+    assert list(results["vectorized"]) == list(results["plain"])
+    assert results["vectorized"] == results["plain"]
+
+
+def test_variant_checking_matches_case_checking():
+    log = EncodedLog.from_event_log(random_log(500, 3, 4))
+    model = parse_decl(all_constraints())
+    assert condition_attributes(model) == {"org:role"}
+    variant_log, variant_of_trace, frequencies = log.variants(condition_attributes(model))
+    assert variant_log.num_traces < log.num_traces == frequencies.sum()
+    variant_res = check_log_conformance(variant_log, model, consider_vacuity=True)
+    expected = check_log_conformance(log, model, consider_vacuity=True)
+    assert {name: variant_res[variant] for name, variant in zip(log.trace_names, variant_of_trace)} == expected
@@ -0,0 +1,16 @@
+import numpy as np
+
+from semconstmining.parsing.label_parser.verb_neighbours import top_neighbours, unit_rows
+
+
+def test_top_neighbours_match_the_full_similarity_ranking():
+    rng = np.random.default_rng(0)
+    candidates = unit_rows(rng.normal(size=(200, 8)))
+    queries = candidates[[3, 50, 199]]
+    neighbours = top_neighbours(queries, candidates, topn=5, threshold=0.0, exclude=np.array([3, 50, -1]),
+                                batch_size=2)
+    sims = queries @ candidates.T
+    for query, (row, excluded) in enumerate(zip(neighbours, [3, 50, -1])):
+        ranking = [i for i in np.argsort(-sims[query]) if i != excluded and sims[query, i] > 0][:5]
+        assert sorted(row.tolist()) == sorted(ranking)
+    assert 199 in neighbours[2]
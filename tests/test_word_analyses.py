@@ -0,0 +1,14 @@
+from semconstmining.parsing.label_parser.word_analyses import WordAnalyses
+
+
+def test_word_analyses_are_kept_per_model_and_bounded(tmp_path):
+    path = tmp_path / "word_analyses.pkl"
+    analyses = WordAnalyses(path, model=("en_core_web_sm", "3.5"), max_entries=2)
+    for word in ["create", "check", "send"]:
+        analyses.put(word, ((word, "VERB", "VB"),))
+        analyses.evict()
+    assert "create" not in analyses and analyses.get("send") == (("send", "VERB", "VB"),)
+    analyses.save()
+
+    assert len(WordAnalyses(path, model=("en_core_web_sm", "3.5"))) == 2
+    assert len(WordAnalyses(path, model=("en_core_web_sm", "3.6"))) == 0